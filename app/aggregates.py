@@ -0,0 +1,280 @@
+"""
+Per-sensor running aggregates of the measurements table in hour, day and month buckets.
+
+Each bucket keeps count, sum, sum of squares, min/max with their timestamps and the sums needed for a
+least-squares trend (time in days since the epoch). Buckets touched by an ingest are recomputed
+inside the same transaction: hours from the raw points, days from hours and months from days, so a
+changed value is reflected exactly. range_stats answers a range query from the largest buckets that
+fit inside it plus the raw points at its edges.
+"""
+import math
+import calendar
+from datetime import datetime, timezone
+
+SECONDS_PER_DAY = 86400.0
+
+AGGREGATES_DDL = '''CREATE TABLE IF NOT EXISTS measurement_aggregates (
+                     sensorId INTEGER NOT NULL,
+                     grain TEXT NOT NULL,
+                     bucketTs INTEGER NOT NULL,
+                     count INTEGER NOT NULL,
+                     sum REAL NOT NULL,
+                     sumSq REAL NOT NULL,
+                     minValue REAL NOT NULL,
+                     minTs INTEGER NOT NULL,
+                     maxValue REAL NOT NULL,
+                     maxTs INTEGER NOT NULL,
+                     sumT REAL NOT NULL,
+                     sumTT REAL NOT NULL,
+                     sumTV REAL NOT NULL,
+                     PRIMARY KEY(sensorId, grain, bucketTs)) WITHOUT ROWID'''
+
+GRAINS = ('hour', 'day', 'month')
+# Grain -> (start of the bucket containing {ts}, start of the following bucket)
+_BUCKET_SQL = {
+    'hour': ('{ts} - {ts} % 3600', 'bucket + 3600'),
+    'day': ('{ts} - {ts} % 86400', 'bucket + 86400'),
+    'month': ("CAST(strftime('%s', {ts}, 'unixepoch', 'start of month') AS INTEGER)",
+              "CAST(strftime('%s', bucket, 'unixepoch', '+1 month') AS INTEGER)"),
+}
+# Hours are computed from the raw points
+_FROM_MEASUREMENTS = {
+    'source': 'measurements WHERE', 'ts': 'ts', 'count': 'COUNT(*)', 'sum': 'SUM(value)',
+    'sumSq': 'SUM(value * value)', 'minValue': 'MIN(value)', 'maxValue': 'MAX(value)',
+    'sumT': f'SUM(ts / {SECONDS_PER_DAY})', 'sumTT': f'SUM((ts / {SECONDS_PER_DAY}) * (ts / {SECONDS_PER_DAY}))',
+    'sumTV': f'SUM(ts / {SECONDS_PER_DAY} * value)',
+    'extremeTs': ('SELECT s.ts FROM measurements s WHERE s.sensorId = g.sensorId AND s.ts >= g.bucket '
+                  'AND s.ts < g.nextBucket AND s.value = g.{extreme} ORDER BY s.ts LIMIT 1'),
+}
+
+
+def _from_buckets(finer):
+    # Days and months are computed from the buckets of the next finer grain
+    return {
+        'source': f"measurement_aggregates WHERE grain = '{finer}' AND", 'ts': 'bucketTs', 'count': 'SUM(count)',
+        'sum': 'SUM(sum)', 'sumSq': 'SUM(sumSq)', 'minValue': 'MIN(minValue)', 'maxValue': 'MAX(maxValue)',
+        'sumT': 'SUM(sumT)', 'sumTT': 'SUM(sumTT)', 'sumTV': 'SUM(sumTV)',
+        'extremeTs': (f"SELECT s.{{extreme_ts}} FROM measurement_aggregates s WHERE s.sensorId = g.sensorId "
+                      f"AND s.grain = '{finer}' AND s.bucketTs >= g.bucket AND s.bucketTs < g.nextBucket "
+                      f"AND s.{{extreme}} = g.{{extreme}} ORDER BY s.{{extreme_ts}} LIMIT 1"),
+    }
+
+
+_SOURCES = {'hour': _FROM_MEASUREMENTS, 'day': _from_buckets('hour'), 'month': _from_buckets('day')}
+
+
+def _refresh_sql(grain):
+    columns = _SOURCES[grain]
+    bucket, next_bucket = _BUCKET_SQL[grain]
+    bucket = bucket.format(ts=columns['ts'])
+    min_ts = columns['extremeTs'].format(extreme='minValue', extreme_ts='minTs')
+    max_ts = columns['extremeTs'].format(extreme='maxValue', extreme_ts='maxTs')
+    return f'''
+        INSERT INTO measurement_aggregates (sensorId, grain, bucketTs, count, sum, sumSq, minValue, minTs,
+                                            maxValue, maxTs, sumT, sumTT, sumTV)
+        SELECT sensorId, '{grain}', bucket, count, sum, sumSq, minValue, ({min_ts}), maxValue, ({max_ts}),
+               sumT, sumTT, sumTV
+        FROM (SELECT *, {next_bucket} AS nextBucket
+              FROM (SELECT sensorId, {bucket} AS bucket, {columns['count']} AS count, {columns['sum']} AS sum,
+                           {columns['sumSq']} AS sumSq, {columns['minValue']} AS minValue,
+                           {columns['maxValue']} AS maxValue, {columns['sumT']} AS sumT,
+                           {columns['sumTT']} AS sumTT, {columns['sumTV']} AS sumTV
+                    FROM {columns['source']} sensorId = ? AND {columns['ts']} >= ? AND {columns['ts']} < ?
+                    GROUP BY sensorId, bucket)) g'''
+
+
+REFRESH_SQL = {grain: _refresh_sql(grain) for grain in GRAINS}
+
+
+def _floor(grain, ts):
+    if grain == 'hour':
+        return ts - ts % 3600
+    if grain == 'day':
+        return ts - ts % 86400
+    date = datetime.fromtimestamp(ts, timezone.utc)
+    return calendar.timegm((date.year, date.month, 1, 0, 0, 0))
+
+
+def _next(grain, ts):
+    """Return the start of the bucket after the one containing ts."""
+    if grain == 'hour':
+        return _floor(grain, ts) + 3600
+    if grain == 'day':
+        return _floor(grain, ts) + 86400
+    date = datetime.fromtimestamp(ts, timezone.utc)
+    year, month = (date.year + 1, 1) if date.month == 12 else (date.year, date.month + 1)
+    return calendar.timegm((year, month, 1, 0, 0, 0))
+
+
+def _ceil(grain, ts):
+    return ts if _floor(grain, ts) == ts else _next(grain, ts)
+
+
+def refresh_aggregates(conn, sensor_id, first_ts, last_ts):
+    """
+    Recompute every bucket of a sensor that contains a timestamp between first_ts and last_ts.
+
+    Runs inside the caller's transaction, so aggregates and measurements are always committed together.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        sensor_id (int): The sensor whose measurements changed.
+        first_ts (int): The earliest changed timestamp.
+        last_ts (int): The latest changed timestamp.
+    """
+    for grain in GRAINS:
+        lower, upper = _floor(grain, first_ts), _next(grain, last_ts)
+        conn.execute('DELETE FROM measurement_aggregates WHERE sensorId = ? AND grain = ? AND bucketTs >= ? AND bucketTs < ?',
+                     (sensor_id, grain, lower, upper))
+        conn.execute(REFRESH_SQL[grain], (sensor_id, lower, upper))
+
+
+def rebuild_aggregates(conn):
+    """
+    Recompute the aggregates of every sensor from the measurements table.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+    """
+    conn.execute('DELETE FROM measurement_aggregates')
+    spans = conn.execute('SELECT sensorId, MIN(ts), MAX(ts) FROM measurements GROUP BY sensorId').fetchall()
+    for sensor_id, first_ts, last_ts in spans:
+        refresh_aggregates(conn, sensor_id, first_ts, last_ts)
+
+
+def time_span(conn, sensor_id):
+    """
+    Return the first and last timestamp and the number of a sensor's values.
+
+    MIN and MAX are single lookups at either end of the sensor's primary key range and the count is the
+    sum of its month buckets, so the cost does not grow with the length of the history.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        sensor_id (int): The ID of the sensor.
+
+    Returns:
+        dict: 'first_ts', 'last_ts' and 'count', or None if the sensor has no values.
+    """
+    first_ts, last_ts = conn.execute('SELECT MIN(ts), MAX(ts) FROM measurements WHERE sensorId = ?',
+                                     (sensor_id,)).fetchone()
+    if first_ts is None:
+        return None
+    count = conn.execute("SELECT SUM(count) FROM measurement_aggregates WHERE sensorId = ? AND grain = 'month'",
+                         (sensor_id,)).fetchone()[0]
+    return {'first_ts': first_ts, 'last_ts': last_ts, 'count': count or 0}
+
+
+def bucket_starts(conn, sensor_id, grain, start_ts=None, end_ts=None):
+    """
+    List the buckets of a grain that hold values of a sensor, e.g. the days of one month that have data.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        sensor_id (int): The ID of the sensor.
+        grain (str): 'hour', 'day' or 'month'.
+        start_ts (int, optional): Only buckets starting at or after this timestamp.
+        end_ts (int, optional): Only buckets starting before this timestamp.
+
+    Returns:
+        list: The start timestamps of the buckets in ascending order.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+    query = 'SELECT bucketTs FROM measurement_aggregates WHERE sensorId = ? AND grain = ?'
+    params = [sensor_id, grain]
+    if start_ts is not None:
+        query += ' AND bucketTs >= ?'
+        params.append(start_ts)
+    if end_ts is not None:
+        query += ' AND bucketTs < ?'
+        params.append(end_ts)
+    return [row[0] for row in conn.execute(query + ' ORDER BY bucketTs', params)]
+
+
+def _cover(lower, upper, grains):
+    """Split [lower, upper) into whole buckets of the coarsest possible grain and raw edges (grain None)."""
+    if lower >= upper:
+        return []
+    if not grains:
+        return [(None, lower, upper)]
+    grain, finer = grains[0], grains[1:]
+    inner_lower, inner_upper = _ceil(grain, lower), _floor(grain, upper)
+    if inner_lower >= inner_upper:
+        return _cover(lower, upper, finer)
+    return _cover(lower, inner_lower, finer) + [(grain, inner_lower, inner_upper)] + _cover(inner_upper, upper, finer)
+
+
+def range_stats(conn, sensor_id, start_ts=None, end_ts=None):
+    """
+    Summarize a sensor's measurements between two timestamps from the pre-aggregated buckets.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        sensor_id (int): The ID of the sensor.
+        start_ts (int, optional): Inclusive lower bound in seconds since the epoch; defaults to the first value.
+        end_ts (int, optional): Inclusive upper bound in seconds since the epoch; defaults to the last value.
+
+    Returns:
+        dict: 'count', 'min_value', 'min_ts', 'max_value', 'max_ts', 'mean_value', 'std_value',
+              'slope_per_day', 'slope_p_value' and 'trend', or an empty dict if there are no values.
+    """
+    if start_ts is None or end_ts is None:
+        first_ts, last_ts = conn.execute('SELECT MIN(ts), MAX(ts) FROM measurements WHERE sensorId = ?',
+                                         (sensor_id,)).fetchone()
+        if first_ts is None:
+            return {}
+        start_ts = first_ts if start_ts is None else start_ts
+        end_ts = last_ts if end_ts is None else end_ts
+
+    parts = []
+    for grain, lower, upper in _cover(start_ts, end_ts + 1, ('month', 'day', 'hour')):
+        if grain is None:
+            parts.extend((1, value, value * value, value, ts, value, ts, ts / SECONDS_PER_DAY,
+                          (ts / SECONDS_PER_DAY) ** 2, ts / SECONDS_PER_DAY * value)
+                         for ts, value in conn.execute('SELECT ts, value FROM measurements '
+                                                       'WHERE sensorId = ? AND ts >= ? AND ts < ?',
+                                                       (sensor_id, lower, upper)))
+        else:
+            parts.extend(conn.execute('''SELECT count, sum, sumSq, minValue, minTs, maxValue, maxTs, sumT, sumTT, sumTV
+                                         FROM measurement_aggregates
+                                         WHERE sensorId = ? AND grain = ? AND bucketTs >= ? AND bucketTs < ?''',
+                                      (sensor_id, grain, lower, upper)))
+    if not parts:
+        return {}
+    return _combine(parts)
+
+
+def _combine(parts):
+    # Imported here so ingesting through db_manager does not load NumPy and pandas
+    from app.analysis_engine import trend_label
+
+    count = sum(part[0] for part in parts)
+    total, total_sq = sum(part[1] for part in parts), sum(part[2] for part in parts)
+    sum_t, sum_tt, sum_tv = (sum(part[i] for part in parts) for i in (7, 8, 9))
+    minimum = min(parts, key=lambda part: (part[3], part[4]))
+    maximum = max(parts, key=lambda part: (part[5], -part[6]))
+    mean = total / count
+    svv = max(total_sq - total * total / count, 0.0)
+    stt = sum_tt - sum_t * sum_t / count
+    stv = sum_tv - sum_t * total / count
+    slope, p_value = float('nan'), float('nan')
+    if count > 1 and stt > 0:
+        slope = stv / stt
+        if count > 2:
+            sse = max(svv - slope * stv, 0.0)
+            stderr = math.sqrt(sse / (count - 2) / stt)
+            t_stat = slope / stderr if stderr > 0 else (math.inf if slope else 0.0)
+            p_value = math.erfc(abs(t_stat) / math.sqrt(2))
+    return {
+        'count': count,
+        'min_value': minimum[3],
+        'min_ts': minimum[4],
+        'max_value': maximum[5],
+        'max_ts': maximum[6],
+        'mean_value': mean,
+        'std_value': math.sqrt(svv / count),
+        'slope_per_day': slope,
+        'slope_p_value': p_value,
+        'trend': trend_label(slope, p_value),
+    }
@@ -0,0 +1,182 @@
+import math
+import numpy as np
+import pandas as pd
+
+# Reference levels in µg/m3 (CO included) used to count exceedances of single measured values.
+# Based on the EU/Polish limit, target and information thresholds for each pollutant.
+NORMS = {
+    'PM10': 50.0,
+    'PM2.5': 25.0,
+    'NO2': 200.0,
+    'SO2': 350.0,
+    'O3': 120.0,
+    'CO': 10000.0,
+    'C6H6': 5.0,
+}
+# Polish parameter names as stored in the sensors table
+PARAM_ALIASES = {
+    'dwutlenek azotu': 'NO2',
+    'dwutlenek siarki': 'SO2',
+    'ozon': 'O3',
+    'tlenek węgla': 'CO',
+    'benzen': 'C6H6',
+}
+PERCENTILES = (5, 25, 75, 95)
+SIGNIFICANCE_LEVEL = 0.05
+SECONDS_PER_DAY = 86400.0
+
+
+def param_code(param):
+    """
+    Return the parameter code for a parameter code or name.
+
+    Args:
+        param (str): A parameter code such as 'PM10' or a name such as 'pył zawieszony PM2.5'.
+
+    Returns:
+        str: A key of NORMS, or None if the parameter is not recognised.
+    """
+    if not param:
+        return None
+    if param in NORMS:
+        return param
+    lowered = param.lower()
+    for name, code in PARAM_ALIASES.items():
+        if name in lowered:
+            return code
+    for code in sorted(NORMS, key=len, reverse=True):
+        if code.lower() in lowered.replace(' ', ''):
+            return code
+    return None
+
+
+def norm_for(param):
+    """
+    Return the reference level for a parameter code or name.
+
+    Args:
+        param (str): A parameter code such as 'PM10' or a name such as 'pył zawieszony PM2.5'.
+
+    Returns:
+        float: The reference level, or None if the parameter has no norm.
+    """
+    code = param_code(param)
+    return NORMS[code] if code else None
+
+
+def trend_label(slope, p_value):
+    if np.isnan(slope):
+        return 'Unknown'
+    if p_value >= SIGNIFICANCE_LEVEL:
+        return 'No significant trend'
+    return 'Increasing' if slope > 0 else 'Decreasing'
+
+
+def analyze_arrays(sensor_ids, timestamps, values, norms=None):
+    """
+    Compute summary statistics for one or more sensors with vectorized NumPy reductions.
+
+    Points are grouped by sensor (a no-op when they already arrive ordered by sensor); counts, sums, extremes, the least-squares slope and exceedance counts
+    are then segmented reductions over all sensors at once. Median and percentiles use one
+    partition-based np.percentile call per sensor.
+
+    Args:
+        sensor_ids (array-like): Sensor ID of every point.
+        timestamps (array-like): Seconds since the epoch of every point.
+        values (array-like): Measured values; NaN values are ignored.
+        norms (dict, optional): A mapping of sensor ID to the reference level used for exceedances.
+
+    Returns:
+        DataFrame: One row per sensor with columns sensor_id, count, min_value, min_ts, max_value, max_ts,
+                   mean_value, std_value, median_value, p5 ... p95, slope_per_day, slope_p_value, trend,
+                   norm and exceedances.
+    """
+    sensor_ids = np.asarray(sensor_ids, dtype=np.int64)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    if not valid.all():
+        sensor_ids, timestamps, values = sensor_ids[valid], timestamps[valid], values[valid]
+    if not len(values):
+        return pd.DataFrame(columns=['sensor_id', 'count'])
+    if (np.diff(sensor_ids) < 0).any():
+        order = np.argsort(sensor_ids, kind='stable')
+        sensor_ids, timestamps, values = sensor_ids[order], timestamps[order], values[order]
+
+    starts = np.flatnonzero(np.r_[True, sensor_ids[1:] != sensor_ids[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+    group = np.repeat(np.arange(len(starts)), counts)
+
+    def first_where(mask):
+        positions = np.flatnonzero(mask)
+        _, first = np.unique(group[positions], return_index=True)
+        return positions[first]
+
+    minimum = np.minimum.reduceat(values, starts)
+    maximum = np.maximum.reduceat(values, starts)
+    min_ts = timestamps[first_where(values == minimum[group])]
+    max_ts = timestamps[first_where(values == maximum[group])]
+    mean = np.add.reduceat(values, starts) / counts
+    deviation = values - mean[group]
+    std = np.sqrt(np.add.reduceat(deviation * deviation, starts) / counts)
+    quantiles = np.array([np.percentile(values[start:start + count], (50,) + PERCENTILES)
+                          for start, count in zip(starts, counts)])
+
+    # Least-squares slope of value over time, with time centred per sensor for numerical stability
+    days = timestamps / SECONDS_PER_DAY
+    x = days - (np.add.reduceat(days, starts) / counts)[group]
+    sxx = np.add.reduceat(x * x, starts)
+    sxy = np.add.reduceat(x * deviation, starts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = np.where(sxx > 0, sxy / sxx, np.nan)
+        # Residual sum of squares from the centred sums, avoiding another pass over the points
+        sse = np.maximum(np.add.reduceat(deviation * deviation, starts) - slope * sxy, 0.0)
+        stderr = np.sqrt(sse / (counts - 2) / sxx)
+        t_stat = np.where(stderr > 0, slope / stderr, np.where(slope != 0, np.inf, 0.0))
+    t_stat = np.where(counts > 2, t_stat, np.nan)
+    # Two-sided p-value from the normal approximation of the t distribution
+    p_value = np.array([math.erfc(abs(t) / math.sqrt(2)) if not np.isnan(t) else np.nan for t in t_stat])
+
+    unique_ids = sensor_ids[starts]
+    norm = np.array([(norms or {}).get(int(sensor_id), np.nan) for sensor_id in unique_ids], dtype=np.float64)
+    exceedances = np.add.reduceat((values > norm[group]).astype(np.int64), starts)
+
+    result = pd.DataFrame({
+        'sensor_id': unique_ids,
+        'count': counts,
+        'min_value': minimum,
+        'min_ts': min_ts,
+        'max_value': maximum,
+        'max_ts': max_ts,
+        'mean_value': mean,
+        'std_value': std,
+        'median_value': quantiles[:, 0],
+    })
+    for column, percentile in enumerate(PERCENTILES, start=1):
+        result[f'p{percentile}'] = quantiles[:, column]
+    result['slope_per_day'] = slope
+    result['slope_p_value'] = p_value
+    result['trend'] = [trend_label(s, p) for s, p in zip(slope, p_value)]
+    result['norm'] = norm
+    result['exceedances'] = np.where(np.isnan(norm), 0, exceedances)
+    return result
+
+
+def analyze_frame(df, norms=None):
+    """
+    Compute summary statistics for every sensor in a long DataFrame, see analyze_arrays.
+
+    Args:
+        df (DataFrame): Columns 'sensor_id', 'date' and 'value'.
+        norms (dict, optional): A mapping of sensor ID to the reference level used for exceedances.
+
+    Returns:
+        DataFrame: One row per sensor; min_ts and max_ts are converted to 'min_date' and 'max_date'.
+    """
+    timestamps = df['date'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    result = analyze_arrays(df['sensor_id'].to_numpy(), timestamps, df['value'].to_numpy(), norms)
+    for column in ('min', 'max'):
+        if f'{column}_ts' in result:
+            result.insert(result.columns.get_loc(f'{column}_ts'), f'{column}_date',
+                          pd.to_datetime(result.pop(f'{column}_ts'), unit='s'))
+    return result
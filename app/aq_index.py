@@ -0,0 +1,179 @@
+"""
+Storage and queries of the GIOŚ air quality index.
+
+The index is calculated by GIOŚ for every station about once an hour, overall and per pollutant, as a level
+from 0 (very good) to 5 (very bad). Each calculation is kept as one row of the aq_index table keyed on the
+station and the calculation time, so fetching the same calculation again is a no-op and the table grows
+into a per-station history that dashboards and analysis read locally.
+"""
+import sqlite3
+import logging
+from app.connection_manager import get_manager
+from app.db_manager import _transaction, from_epoch, to_epoch
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POLLUTANTS = ('so2', 'no2', 'co', 'pm10', 'pm25', 'o3', 'c6h6')
+INDEX_LEVELS = {0: 'Bardzo dobry', 1: 'Dobry', 2: 'Umiarkowany', 3: 'Dostateczny', 4: 'Zły', 5: 'Bardzo zły'}
+LEVEL_COLUMNS = ('indexLevel',) + tuple(f'{pollutant}Level' for pollutant in POLLUTANTS)
+COLUMNS = ('stationId', 'calcTs', 'sourceTs', 'indexLevel', 'critParam') + LEVEL_COLUMNS[1:]
+INSERT_INDEX_SQL = f'''INSERT OR IGNORE INTO aq_index ({', '.join(COLUMNS)})
+                       VALUES ({', '.join('?' * len(COLUMNS))})'''
+
+
+def _timestamp(value):
+    # The API has published dates both as 'YYYY-MM-DD HH:MM:SS' strings and as epoch milliseconds
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return int(value // 1000) if value > 1e11 else int(value)
+    return to_epoch(value)
+
+
+def _level(level):
+    # A missing pollutant is null; 'Brak indeksu' (no index) has the id -1
+    if not isinstance(level, dict) or level.get('id') is None:
+        return None
+    level_id = int(level['id'])
+    return level_id if level_id >= 0 else None
+
+
+def index_row(station_id, index):
+    """
+    Convert an index from the API to an aq_index row.
+
+    Args:
+        station_id (int): The ID of the station.
+        index (dict): The index as returned by get_air_quality_index.
+
+    Returns:
+        tuple: The COLUMNS of the row, or None if the index has no calculation date.
+    """
+    try:
+        calc_ts = _timestamp(index.get('stCalcDate'))
+        if calc_ts is None:
+            return None
+        return (int(station_id), calc_ts, _timestamp(index.get('stSourceDataDate')), _level(index.get('stIndexLevel')),
+                index.get('stIndexCrParam')) + tuple(_level(index.get(f'{pollutant}IndexLevel')) for pollutant in POLLUTANTS)
+    except (AttributeError, TypeError, ValueError) as e:
+        logger.warning(f"Skipping malformed air quality index of station {station_id}: {e}")
+        return None
+
+
+def store_indexes(conn, indexes):
+    """
+    Store air quality indexes in a single transaction, skipping calculations that are already stored.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        indexes (iterable): (station_id, index) pairs, index as returned by get_air_quality_index.
+
+    Returns:
+        dict: Counts of indexes 'inserted', 'skipped' (already stored) and 'invalid', or None if the
+              transaction was rolled back.
+    """
+    rows, invalid = [], 0
+    for station_id, index in indexes:
+        row = index_row(station_id, index) if index else None
+        if row is None:
+            invalid += 1
+        else:
+            rows.append(row)
+    try:
+        with _transaction(conn):
+            before = conn.total_changes
+            conn.executemany(INSERT_INDEX_SQL, rows)
+            inserted = conn.total_changes - before
+    except sqlite3.Error as e:
+        logger.error(f"Error storing air quality indexes: {e}")
+        return None
+    return {'inserted': inserted, 'skipped': len(rows) - inserted, 'invalid': invalid}
+
+
+def _record(row, names=COLUMNS):
+    record = dict(zip(names, row))
+    record['calcDate'] = from_epoch(record['calcTs'])
+    record['sourceDate'] = from_epoch(record['sourceTs']) if record['sourceTs'] is not None else None
+    record['indexLevelName'] = INDEX_LEVELS.get(record['indexLevel'])
+    return record
+
+
+def latest_indexes(conn, station_ids=None):
+    """
+    Return the most recent stored index of every station, or of the given stations.
+
+    The latest calculation times come from one ordered pass over the (stationId, calcTs) primary key,
+    or one key range per station when station_ids is given, so no history is read into Python.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        station_ids (iterable, optional): Only these stations.
+
+    Returns:
+        list: Dictionaries with the COLUMNS, 'calcDate', 'sourceDate', 'indexLevelName', 'stationName' and
+              'city', ordered by station ID.
+    """
+    where, params = '', []
+    if station_ids is not None:
+        params = [int(station_id) for station_id in station_ids]
+        where = f"WHERE stationId IN ({', '.join('?' * len(params))})"
+    columns = ', '.join(f'a.{column}' for column in COLUMNS)
+    rows = conn.execute(f'''
+    SELECT {columns}, s.stationName, s.city
+    FROM (SELECT stationId, MAX(calcTs) AS calcTs FROM aq_index {where} GROUP BY stationId) latest
+    JOIN aq_index a ON a.stationId = latest.stationId AND a.calcTs = latest.calcTs
+    LEFT JOIN stations s ON s.id = a.stationId
+    ORDER BY a.stationId
+    ''', params).fetchall()
+    return [_record(row, COLUMNS + ('stationName', 'city')) for row in rows]
+
+
+def index_history(conn, station_id, start_ts=None, end_ts=None):
+    """
+    Return a station's stored index calculations in time order.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        station_id (int): The ID of the station.
+        start_ts (int, optional): Only calculations at or after this timestamp.
+        end_ts (int, optional): Only calculations at or before this timestamp.
+
+    Returns:
+        list: Dictionaries with the COLUMNS, 'calcDate', 'sourceDate' and 'indexLevelName'.
+    """
+    query = f"SELECT {', '.join(COLUMNS)} FROM aq_index WHERE stationId = ?"
+    params = [int(station_id)]
+    if start_ts is not None:
+        query += ' AND calcTs >= ?'
+        params.append(start_ts)
+    if end_ts is not None:
+        query += ' AND calcTs <= ?'
+        params.append(end_ts)
+    return [_record(row) for row in conn.execute(query + ' ORDER BY calcTs', params)]
+
+
+def read_index(db_path, station_id, start=None, end=None):
+    """
+    Read a station's index history as a time series, like data_analyzer.read_data does for measurements.
+
+    Args:
+        db_path (str): Path to the database file.
+        station_id (int): The ID of the station.
+        start (str or datetime, optional): Only calculations at or after this date.
+        end (str or datetime, optional): Only calculations at or before this date.
+
+    Returns:
+        DataFrame: A pandas DataFrame with a 'date' column (the calculation time), the LEVEL_COLUMNS as
+                   nullable integers and 'critParam', sorted by date.
+    """
+    import pandas as pd
+
+    with get_manager(db_path).reader() as conn:
+        history = index_history(conn, station_id, to_epoch(start) if start else None, to_epoch(end) if end else None)
+    df = pd.DataFrame(history, columns=list(COLUMNS))
+    df.insert(0, 'date', pd.to_datetime(df.pop('calcTs'), unit='s'))
+    for column in LEVEL_COLUMNS:
+        df[column] = df[column].astype('Int64')
+    return df[['date', *LEVEL_COLUMNS, 'critParam']]
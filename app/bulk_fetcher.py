@@ -0,0 +1,254 @@
+import collections
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from app.data_fetcher import get_sensors_for_station, get_measurement_data, get_air_quality_index
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_RATE = 10.0  # Requests per second; keeps a full national fan-out polite towards the GIOŚ API
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how many requests are started per second.
+    """
+    def __init__(self, rate, burst=None, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize the rate limiter.
+
+        Args:
+            rate (float): Sustained number of requests per second; None or 0 disables limiting.
+            burst (int, optional): Number of requests that may start back to back; defaults to one second's worth.
+            clock (callable): Monotonic clock returning seconds.
+            sleep (callable): Function used to wait for a token.
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate or 1))
+        self._tokens = float(self.capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Block until a request may be started.
+        """
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_time = (1 - self._tokens) / self.rate
+            self._sleep(wait_time)
+
+
+class BulkFetchReport:
+    """
+    Counters and failures collected while a bulk fetch runs.
+    """
+    def __init__(self):
+        self.stations_ok = 0
+        self.stations_failed = 0
+        self.sensors_ok = 0
+        self.sensors_failed = 0
+        self.indexes_ok = 0
+        self.indexes_failed = 0
+        self.failures = []
+
+    def add_failure(self, kind, item_id):
+        self.failures.append({'kind': kind, 'id': item_id})
+        if kind == 'station':
+            self.stations_failed += 1
+        elif kind == 'aq_index':
+            self.indexes_failed += 1
+        else:
+            self.sensors_failed += 1
+
+    def as_dict(self):
+        return {
+            'stations_ok': self.stations_ok,
+            'stations_failed': self.stations_failed,
+            'sensors_ok': self.sensors_ok,
+            'sensors_failed': self.sensors_failed,
+            'indexes_ok': self.indexes_ok,
+            'indexes_failed': self.indexes_failed,
+            'failures': list(self.failures),
+        }
+
+
+class BulkFetcher:
+    """
+    Fetches sensors and measurements for many stations concurrently with a bounded worker pool and rate limit.
+    Per-request connect/read timeouts and retries come from the shared FetcherClient in app.data_fetcher.
+    """
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, rate=DEFAULT_RATE):
+        """
+        Initialize the bulk fetcher.
+
+        Args:
+            max_workers (int): Maximum number of requests in flight at once.
+            rate (float): Maximum number of requests started per second; None disables limiting.
+        """
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(rate)
+
+    def iter_station_measurements(self, stations, param_codes=None, report=None, sensor_ids=None):
+        """
+        Fetch measurements for every sensor of the given stations, yielding each sensor's data as soon as it arrives.
+
+        Args:
+            stations (iterable): Station IDs or station dictionaries from the station catalog.
+            param_codes (iterable, optional): Only fetch sensors measuring these parameters, e.g. {'PM10', 'NO2'}.
+            report (BulkFetchReport, optional): Collects counts and failed station/sensor IDs.
+            sensor_ids (iterable, optional): Only fetch these sensors of the given stations.
+
+        Yields:
+            dict: Keys 'station_id', 'station' (the station dictionary, or None if only an ID was given),
+                  'sensor' and 'data' (as returned by get_measurement_data).
+        """
+        report = report if report is not None else BulkFetchReport()
+        param_codes = set(param_codes) if param_codes else None
+        sensor_ids = set(sensor_ids) if sensor_ids else None
+        work = collections.deque()
+        for station in stations:
+            station_id, station_dict = (station['id'], station) if isinstance(station, dict) else (int(station), None)
+            work.append(('station', station_id, station_dict, None))
+
+        def submit(item):
+            kind, station_id, _, sensor = item
+            if kind == 'station':
+                return self._call, get_sensors_for_station, station_id
+            return self._call, get_measurement_data, sensor['id']
+
+        def handle(item, result, error):
+            kind, station_id, station_dict, sensor = item
+            item_id = station_id if kind == 'station' else sensor['id']
+            if error is not None:
+                logger.error(f"Fetching {kind} {item_id} failed: {error}")
+                report.add_failure(kind, item_id)
+            elif kind == 'station':
+                if result is None:
+                    report.add_failure('station', item_id)
+                    return
+                report.stations_ok += 1
+                for sensor_dict in result:
+                    if param_codes is not None and sensor_dict.get('param', {}).get('paramCode') not in param_codes:
+                        continue
+                    if sensor_ids is not None and sensor_dict['id'] not in sensor_ids:
+                        continue
+                    work.append(('sensor', station_id, station_dict, sensor_dict))
+            elif result is None:
+                report.add_failure('sensor', item_id)
+            else:
+                report.sensors_ok += 1
+                yield {'station_id': station_id, 'station': station_dict, 'sensor': sensor, 'data': result}
+
+        try:
+            yield from self._run(work, submit, handle)
+        finally:
+            logger.info(f"Bulk fetch finished: {report.as_dict()}")
+
+    def iter_air_quality_indexes(self, stations, report=None):
+        """
+        Fetch the current air quality index of many stations, yielding each index as soon as it arrives.
+
+        Args:
+            stations (iterable): Station IDs or station dictionaries from the station catalog.
+            report (BulkFetchReport, optional): Collects counts and failed station IDs.
+
+        Yields:
+            dict: Keys 'station_id', 'station' (the station dictionary, or None if only an ID was given)
+                  and 'index' (as returned by get_air_quality_index).
+        """
+        report = report if report is not None else BulkFetchReport()
+        work = collections.deque(
+            (station['id'], station) if isinstance(station, dict) else (int(station), None) for station in stations)
+
+        def submit(item):
+            return self._call, get_air_quality_index, item[0]
+
+        def handle(item, result, error):
+            station_id, station_dict = item
+            if error is not None:
+                logger.error(f"Fetching aq_index {station_id} failed: {error}")
+            if result is None:
+                report.add_failure('aq_index', station_id)
+                return
+            report.indexes_ok += 1
+            yield {'station_id': station_id, 'station': station_dict, 'index': result}
+
+        try:
+            yield from self._run(work, submit, handle)
+        finally:
+            logger.info(f"Air quality index fetch finished: {report.as_dict()}")
+
+    def iter_city(self, catalog, city_name, param_codes=None, report=None):
+        """
+        Fetch measurements for all stations of a city, see iter_station_measurements.
+
+        Args:
+            catalog (StationCatalog): The station catalog used to resolve the city.
+            city_name (str): The city name, matched like the Look Up button does.
+            param_codes (iterable, optional): Only fetch sensors measuring these parameters.
+            report (BulkFetchReport, optional): Collects counts and failures.
+        """
+        stations = catalog.find_by_city(city_name) or []
+        return self.iter_station_measurements(stations, param_codes, report)
+
+    def iter_all(self, catalog, param_codes=None, report=None):
+        """
+        Fetch measurements for every station in Poland, see iter_station_measurements.
+
+        Args:
+            catalog (StationCatalog): The station catalog listing all stations.
+            param_codes (iterable, optional): Only fetch sensors measuring these parameters.
+            report (BulkFetchReport, optional): Collects counts and failures.
+        """
+        stations = catalog.get_stations() or []
+        return self.iter_station_measurements(stations, param_codes, report)
+
+    def _run(self, work, submit, handle):
+        """
+        Run queued requests on a bounded worker pool, handing each result over as soon as it arrives.
+
+        Args:
+            work (collections.deque): Items still to request; handle may append follow-up items.
+            submit (callable): Maps an item to the (function, *args) to run on the pool.
+            handle (callable): Called as handle(item, result, error) with either the result or the exception
+                               raised; a generator whose values are yielded to the caller.
+
+        Yields:
+            The values yielded by handle.
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bulk-fetch')
+        pending = {}
+        try:
+            while work or pending:
+                while work and len(pending) < self.max_workers * 2:
+                    item = work.popleft()
+                    pending[executor.submit(*submit(item))] = item
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        result, error = future.result(), None
+                    except Exception as e:
+                        result, error = None, e
+                    yield from handle(item, result, error)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _call(self, function, item_id):
+        self.rate_limiter.acquire()
+        return function(item_id)
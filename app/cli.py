@@ -0,0 +1,518 @@
+"""
+Command-line interface for scripting the app without the GUI.
+
+Usage:
+    python -m app search kraków
+    python -m app nearest 50.06 19.94 --count 5
+    python -m app fetch --city kraków --param PM10 --output series.json
+    python -m app ingest --input series.json
+    python -m app ingest --station 400 --station 401
+    python -m app analyze 3584 3585 --start 2024-06-01 --end 2024-06-30 --format csv
+    python -m app plot 3584 --output pm10.png
+    python -m app compare --param PM10 --city kraków --resample day --plot pm10_krakow.png
+    python -m app interpolate PM2.5 --start '2024-06-01 00:00' --end '2024-06-01 23:00' --npz pm25.npz --png-dir pm25
+    python -m app interpolate PM2.5 --start '2024-06-01 14:00' --at 50.06 19.94
+    python -m app aqi --city kraków --fetch
+    python -m app aqi --city kraków
+    python -m app aqi --history 400 --start 2024-06-01 --format csv
+    python -m app export /mnt/exports/air_quality
+    python -m app import /mnt/exports/air_quality
+
+Results are written to stdout (or --output) as JSON or CSV; log messages go to stderr.
+Matplotlib is only imported by the plot subcommand, compare --plot and interpolate --png-dir.
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import sys
+import logging
+from datetime import date, datetime
+from app.bulk_fetcher import BulkFetcher, BulkFetchReport
+from app.connection_manager import get_manager
+from app.db_manager import create_tables, insert_bulk
+from app.harvester import DEFAULT_DB_PATH, harvest_once, select_stations
+from app.station_catalog import StationCatalog
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = ('json', 'csv')
+STATION_COLUMNS = ('id', 'stationName', 'city', 'commune', 'province', 'addressStreet', 'gegrLat', 'gegrLon')
+MEASUREMENT_COLUMNS = ('station_id', 'sensor_id', 'param', 'date', 'value')
+AQI_COLUMNS = ('stationId', 'stationName', 'city', 'calcDate', 'sourceDate', 'indexLevel', 'indexLevelName', 'critParam',
+               'so2Level', 'no2Level', 'coLevel', 'pm10Level', 'pm25Level', 'o3Level', 'c6h6Level')
+
+
+def _plain(value):
+    """Convert a value to something json and csv can write: NaN becomes None, dates become ISO strings."""
+    if hasattr(value, 'item'):  # NumPy scalars
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def write_records(records, fmt, out, columns=None):
+    """
+    Write a list of flat dictionaries as a JSON array or as CSV with a header row.
+
+    Args:
+        records (list): The dictionaries to write.
+        fmt (str): 'json' or 'csv'.
+        out (file): The text stream to write to.
+        columns (iterable, optional): CSV columns; defaults to the keys of all records in first-seen order.
+    """
+    records = [{key: _plain(value) for key, value in record.items()} for record in records]
+    if fmt == 'json':
+        json.dump(records, out, ensure_ascii=False, indent=2)
+        out.write('\n')
+        return
+    if columns is None:
+        columns = list(dict.fromkeys(key for record in records for key in record))
+    writer = csv.DictWriter(out, fieldnames=list(columns), extrasaction='ignore', lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def station_record(station):
+    """
+    Flatten a station dictionary from the GIOŚ API.
+
+    Args:
+        station (dict): A station dictionary as returned by get_station_list.
+
+    Returns:
+        dict: The STATION_COLUMNS of the station.
+    """
+    city = station.get('city') or {}
+    commune = city.get('commune') or {}
+    return {
+        'id': station.get('id'),
+        'stationName': station.get('stationName'),
+        'city': city.get('name'),
+        'commune': commune.get('communeName'),
+        'province': commune.get('provinceName'),
+        'addressStreet': station.get('addressStreet'),
+        'gegrLat': station.get('gegrLat'),
+        'gegrLon': station.get('gegrLon'),
+    }
+
+
+def measurement_records(series):
+    """
+    Flatten fetched series to one record per value.
+
+    Args:
+        series (iterable): Dictionaries with 'station_id', 'sensor' and 'data' keys, as yielded by BulkFetcher.
+
+    Yields:
+        dict: The MEASUREMENT_COLUMNS of every value.
+    """
+    for item in series:
+        sensor = item['sensor']
+        param = (sensor.get('param') or {}).get('paramCode')
+        for value in (item['data'] or {}).get('values') or []:
+            yield {'station_id': item['station_id'], 'sensor_id': sensor['id'], 'param': param,
+                   'date': value.get('date'), 'value': value.get('value')}
+
+
+def _catalog(db_path):
+    return StationCatalog(os.path.join(os.path.dirname(os.path.abspath(db_path)), 'station_catalog.json'))
+
+
+def _selected_stations(args):
+    stations = select_stations(_catalog(args.db), args.stations, args.cities)
+    if not stations:
+        raise SystemExit('No stations selected; check the --station and --city arguments.')
+    return stations
+
+
+def _open_output(args):
+    if getattr(args, 'writes_image', False) or args.output in (None, '-'):
+        # The plot subcommand's --output names the image; its summary record goes to stdout
+        return sys.stdout, False
+    return open(args.output, 'w', encoding='utf-8', newline=''), True
+
+
+def cmd_search(args, out):
+    stations = _catalog(args.db).find_by_city(args.city)
+    if stations is None:
+        logger.error("Could not download the list of measurement stations.")
+        return 1
+    write_records([station_record(station) for station in stations], args.format, out, STATION_COLUMNS)
+    return 0
+
+
+def cmd_nearest(args, out):
+    catalog = _catalog(args.db)
+    if args.bbox:
+        index = catalog.get_spatial_index()
+        stations = index.within_bbox(*args.bbox) if index is not None else None
+    else:
+        stations = catalog.find_nearest(args.lat, args.lon, args.count, args.radius)
+    if stations is None:
+        logger.error("Could not download the list of measurement stations.")
+        return 1
+    write_records([dict(station_record(station), distance_km=station.get('distance_km')) for station in stations],
+                  args.format, out, STATION_COLUMNS + ('distance_km',))
+    return 0
+
+
+def cmd_fetch(args, out):
+    report = BulkFetchReport()
+    fetcher = BulkFetcher(max_workers=args.workers)
+    series = fetcher.iter_station_measurements(_selected_stations(args), args.params, report, args.sensors)
+    if args.format == 'csv':
+        write_records(list(measurement_records(series)), 'csv', out, MEASUREMENT_COLUMNS)
+    else:
+        # Whole station and sensor dictionaries are kept, so the output can be fed to `ingest --input`
+        json.dump([{'station': item['station'], 'sensor': item['sensor'], 'data': dict(item['data'])} for item in series],
+                  out, ensure_ascii=False, indent=2)
+        out.write('\n')
+    logger.info(f"Fetch report: {report.as_dict()}")
+    return 1 if report.failures else 0
+
+
+def cmd_ingest(args, out):
+    db = get_manager(args.db)
+    with db.writer() as conn:
+        create_tables(conn)
+    if args.input:
+        with open(args.input, encoding='utf-8') if args.input != '-' else sys.stdin as source:
+            series = [(item['station'], item['sensor'], item['data']) for item in json.load(source)]
+        with db.writer() as conn:
+            counts = insert_bulk(conn, series=series)
+        if counts is None:
+            logger.error(f"Ingesting {args.input} failed.")
+            return 1
+        result = dict(counts, series=len(series))
+    else:
+        result = harvest_once(db, BulkFetcher(max_workers=args.workers), _selected_stations(args), args.params,
+                              args.sensors)
+        result.update(result.pop('fetch'))
+    write_records([result], args.format, out)
+    return 0
+
+
+def _store(args):
+    if not args.store:
+        return None
+    from app.columnar_store import ColumnarStore
+    return ColumnarStore(args.store)
+
+
+def cmd_analyze(args, out):
+    from app.data_analyzer import analyze_data, read_data, summarize_range
+
+    store = _store(args)
+    records = []
+    for sensor_id in args.sensor_ids:
+        if args.aggregates:
+            analysis = summarize_range(args.db, sensor_id, args.start, args.end)
+        else:
+            analysis = analyze_data(read_data(args.db, sensor_id, args.start, args.end, args.resample, store))
+        if not analysis:
+            logger.warning(f"No data found for sensor {sensor_id}")
+            continue
+        records.append(dict(sensor_id=sensor_id, **analysis))
+    write_records(records, args.format, out)
+    return 0 if records else 1
+
+
+def cmd_plot(args, out):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from app.data_analyzer import SeriesPlot, analyze_data, plot_title, read_data
+
+    df = read_data(args.db, args.sensor_id, args.start, args.end, args.resample, _store(args))
+    if df.empty:
+        logger.error(f"No data found for sensor {args.sensor_id}")
+        return 1
+    figure = Figure(figsize=(args.width, args.height), dpi=args.dpi)
+    FigureCanvasAgg(figure)
+    series_plot = SeriesPlot(figure, args.db)
+    series_plot.update(df, analyze_data(df), plot_title(args.db, args.sensor_id), args.sensor_id)
+    figure.tight_layout()
+    series_plot.save(args.output)
+    write_records([{'sensor_id': args.sensor_id, 'output': args.output, 'points': len(df)}], args.format, out)
+    return 0
+
+
+def cmd_compare(args, out):
+    from app.comparison import compare_sensors, find_sensors
+
+    sensor_ids = list(args.sensor_ids)
+    if args.param or args.cities or args.stations:
+        with get_manager(args.db).reader() as conn:
+            for city in args.cities or [None]:
+                sensor_ids += [sensor['id'] for sensor in find_sensors(conn, args.param, city, args.stations)]
+    if not sensor_ids:
+        raise SystemExit('No sensors selected; pass sensor IDs or --param, --city or --station.')
+    result = compare_sensors(args.db, sensor_ids, args.start, args.end, args.resample)
+    if args.plot:
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from app.comparison import plot_comparison
+
+        figure = Figure(figsize=(args.width, args.height), dpi=args.dpi)
+        FigureCanvasAgg(figure)
+        plot_comparison(figure, result['wide'], result['labels'], args.small_multiples)
+        figure.savefig(args.plot)
+    if args.correlation:
+        correlation = result['correlation']
+        records = [dict(sensor_id=sensor_id, **{str(other): correlation.loc[sensor_id, other] for other in correlation.columns})
+                   for sensor_id in correlation.index]
+    else:
+        records = result['stats'].to_dict('records')
+    write_records(records, args.format, out)
+    return 0 if not result['stats'].empty else 1
+
+
+def cmd_interpolate(args, out):
+    import numpy as np
+    from app.interpolation import (MAX_TIMESTEPS, POLAND_BBOX, interpolate_grids, interpolate_points, save_grids,
+                                   save_heatmaps)
+
+    max_timesteps = args.max_timesteps or MAX_TIMESTEPS
+    try:
+        if args.at:
+            estimates = interpolate_points(args.db, args.param, [args.at[0]], [args.at[1]], args.start, args.end,
+                                           args.power, args.max_km, args.resample, max_timesteps)
+            records = [{'date': timestep, 'lat': args.at[0], 'lon': args.at[1], 'value': value}
+                       for timestep, value in estimates[0].items()]
+            write_records(records, args.format, out)
+            return 0 if records else 1
+        result = interpolate_grids(args.db, args.param, args.start, args.end, args.bbox or POLAND_BBOX, args.cell_km,
+                                   args.power, args.max_km, args.resample, max_timesteps)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    if args.npz:
+        save_grids(args.npz, result)
+    if args.png_dir:
+        save_heatmaps(args.png_dir, result, args.param)
+    records = []
+    for timestep, grid in zip(result['times'].astype('datetime64[s]'), result['grids']):
+        covered = np.isfinite(grid)
+        records.append({'date': timestep, 'cells': int(covered.sum()),
+                        'min': grid[covered].min() if covered.any() else None,
+                        'mean': grid[covered].mean() if covered.any() else None,
+                        'max': grid[covered].max() if covered.any() else None})
+    write_records(records, args.format, out)
+    return 0 if records else 1
+
+
+def cmd_aqi(args, out):
+    from app.aq_index import index_history, latest_indexes, store_indexes
+    from app.db_manager import to_epoch
+
+    db = get_manager(args.db)
+    with db.writer() as conn:
+        create_tables(conn)
+    if args.history is not None:
+        with db.reader() as conn:
+            records = index_history(conn, args.history, to_epoch(args.start) if args.start else None,
+                                    to_epoch(args.end) if args.end else None)
+        write_records(records, args.format, out, AQI_COLUMNS)
+        return 0 if records else 1
+    if args.fetch:
+        stations = _selected_stations(args)
+        report = BulkFetchReport()
+        indexes = [(result['station_id'], result['index'])
+                   for result in BulkFetcher(max_workers=args.workers).iter_air_quality_indexes(stations, report)]
+        with db.writer() as conn:
+            insert_bulk(conn, stations=stations)
+            counts = store_indexes(conn, indexes)
+        if counts is None:
+            logger.error("Storing the air quality indexes failed.")
+            return 1
+        result = dict(counts, indexes_ok=report.indexes_ok, indexes_failed=report.indexes_failed)
+        write_records([result], args.format, out)
+        return 1 if report.failures else 0
+    with db.reader() as conn:
+        records = latest_indexes(conn, args.stations)
+    if args.cities:
+        cities = [city.casefold() for city in args.cities]
+        records = [record for record in records
+                   if any(city in (record['city'] or '').casefold() for city in cities)]
+    write_records(records, args.format, out, AQI_COLUMNS)
+    return 0 if records else 1
+
+
+def cmd_export(args, out):
+    from app.columnar_store import export_store
+
+    with get_manager(args.db).reader() as conn:
+        counts = export_store(conn, args.directory, args.sensors)
+    write_records([dict(counts, directory=args.directory)], args.format, out)
+    return 0
+
+
+def cmd_import(args, out):
+    from app.columnar_store import import_store
+
+    db = get_manager(args.db)
+    with db.writer() as conn:
+        create_tables(conn)
+        counts = import_store(conn, args.directory, args.sensors)
+    write_records([dict(counts, directory=args.directory)], args.format, out)
+    return 0
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--db', default=DEFAULT_DB_PATH, help='path to the SQLite database')
+    common.add_argument('--format', choices=FORMATS, default='json', help='output format')
+
+    stations = argparse.ArgumentParser(add_help=False)
+    stations.add_argument('--station', type=int, action='append', dest='stations', help='station ID (repeatable)')
+    stations.add_argument('--city', action='append', dest='cities', help='all stations of a city (repeatable)')
+    stations.add_argument('--sensor', type=int, action='append', dest='sensors', help='only these sensor IDs (repeatable)')
+    stations.add_argument('--param', action='append', dest='params', help='only these parameter codes, e.g. PM10 (repeatable)')
+    stations.add_argument('--workers', type=int, default=8, help='concurrent requests')
+
+    date_range = argparse.ArgumentParser(add_help=False)
+    date_range.add_argument('--start', help='only values at or after this date, e.g. 2024-06-01')
+    date_range.add_argument('--end', help='only values at or before this date')
+    date_range.add_argument('--resample', choices=('hour', 'day', 'month'), help='average values per period first')
+    date_range.add_argument('--store', help="read from a columnar export directory written by 'export' instead of the database")
+
+    parser = argparse.ArgumentParser(prog='python -m app', description='Air quality data from GIOŚ without the GUI.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    search = subparsers.add_parser('search', parents=[common], help='find stations by city name')
+    search.add_argument('city', help='full or partial city name')
+    search.add_argument('--output', help='write to this file instead of stdout')
+    search.set_defaults(handler=cmd_search)
+
+    nearest = subparsers.add_parser('nearest', parents=[common], help='find the stations nearest to a point')
+    nearest.add_argument('lat', type=float, nargs='?', help='latitude in degrees')
+    nearest.add_argument('lon', type=float, nargs='?', help='longitude in degrees')
+    nearest.add_argument('--count', type=int, default=10, help='maximum number of stations')
+    nearest.add_argument('--radius', type=float, help='only stations within this many kilometres')
+    nearest.add_argument('--bbox', type=float, nargs=4, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                         help='all stations inside this box instead')
+    nearest.add_argument('--output', help='write to this file instead of stdout')
+    nearest.set_defaults(handler=cmd_nearest)
+
+    fetch = subparsers.add_parser('fetch', parents=[common, stations], help='download measurement series')
+    fetch.add_argument('--output', help='write to this file instead of stdout')
+    fetch.set_defaults(handler=cmd_fetch)
+
+    ingest = subparsers.add_parser('ingest', parents=[common, stations],
+                                   help='store measurement series in the database')
+    ingest.add_argument('--input', help="a JSON file written by 'fetch' ('-' for stdin) instead of downloading")
+    ingest.add_argument('--output', help='write the counts to this file instead of stdout')
+    ingest.set_defaults(handler=cmd_ingest)
+
+    analyze = subparsers.add_parser('analyze', parents=[common, date_range], help='summarize stored series')
+    analyze.add_argument('sensor_ids', type=int, nargs='+', metavar='sensor_id')
+    analyze.add_argument('--aggregates', action='store_true',
+                         help='answer from the hour/day/month aggregates (no median or percentiles)')
+    analyze.add_argument('--output', help='write to this file instead of stdout')
+    analyze.set_defaults(handler=cmd_analyze)
+
+    plot = subparsers.add_parser('plot', parents=[common, date_range], help='plot a stored series to an image file')
+    plot.add_argument('sensor_id', type=int)
+    plot.add_argument('--output', required=True, help='image path; the format follows the extension')
+    plot.add_argument('--width', type=float, default=12, help='figure width in inches')
+    plot.add_argument('--height', type=float, default=8, help='figure height in inches')
+    plot.add_argument('--dpi', type=int, default=100)
+    plot.set_defaults(handler=cmd_plot, writes_image=True)
+
+    compare = subparsers.add_parser('compare', parents=[common],
+                                    help='compare several sensors on a common time grid')
+    compare.add_argument('sensor_ids', type=int, nargs='*', metavar='sensor_id')
+    compare.add_argument('--param', help='add the stored sensors of this parameter, e.g. PM10')
+    compare.add_argument('--city', action='append', dest='cities', help='add the stored sensors of a city (repeatable)')
+    compare.add_argument('--station', type=int, action='append', dest='stations', help='add the stored sensors of a station (repeatable)')
+    compare.add_argument('--start', help='only values at or after this date, e.g. 2024-06-01')
+    compare.add_argument('--end', help='only values at or before this date')
+    compare.add_argument('--resample', choices=('hour', 'day', 'month'), default='hour', help='the common time grid')
+    compare.add_argument('--correlation', action='store_true', help='write the correlation matrix instead of the statistics')
+    compare.add_argument('--plot', help='also draw the series to this image file')
+    compare.add_argument('--small-multiples', action='store_true', help='one panel per sensor instead of one overlaid plot')
+    compare.add_argument('--width', type=float, default=12, help='figure width in inches')
+    compare.add_argument('--height', type=float, default=8, help='figure height in inches')
+    compare.add_argument('--dpi', type=int, default=100)
+    compare.add_argument('--output', help='write to this file instead of stdout')
+    compare.set_defaults(handler=cmd_compare)
+
+    interpolate = subparsers.add_parser('interpolate', parents=[common],
+                                        help='interpolate a parameter between stations onto a grid or a point')
+    interpolate.add_argument('param', help='parameter code, e.g. PM2.5')
+    interpolate.add_argument('--start', required=True, help='the first timestep, e.g. "2024-06-01 14:00"')
+    interpolate.add_argument('--end', help='the last timestep; defaults to the timestep of --start')
+    interpolate.add_argument('--max-timesteps', type=int,
+                             help='refuse ranges longer than this many timesteps; defaults to a month of hours')
+    interpolate.add_argument('--resample', choices=('hour', 'day', 'month'), default='hour', help='the timestep')
+    interpolate.add_argument('--at', type=float, nargs=2, metavar=('LAT', 'LON'), help='estimate this point only')
+    interpolate.add_argument('--bbox', type=float, nargs=4, metavar=('MIN_LAT', 'MIN_LON', 'MAX_LAT', 'MAX_LON'),
+                             help='the grid area; defaults to Poland')
+    interpolate.add_argument('--cell-km', type=float, default=5.0, help='grid cell size in kilometres')
+    interpolate.add_argument('--power', type=float, default=2.0, help='inverse distance weighting exponent')
+    interpolate.add_argument('--max-km', type=float, help='ignore stations farther than this from a cell')
+    interpolate.add_argument('--npz', help='write the grids to this NumPy archive')
+    interpolate.add_argument('--png-dir', help='write one heatmap per timestep to this directory')
+    interpolate.add_argument('--output', help='write the summary to this file instead of stdout')
+    interpolate.set_defaults(handler=cmd_interpolate)
+
+    aqi = subparsers.add_parser('aqi', parents=[common], help='fetch, store and show air quality indexes')
+    aqi.add_argument('--station', type=int, action='append', dest='stations', help='station ID (repeatable)')
+    aqi.add_argument('--city', action='append', dest='cities', help='all stations of a city (repeatable)')
+    aqi.add_argument('--fetch', action='store_true',
+                     help="download the selected stations' current index and store the new calculations")
+    aqi.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    aqi.add_argument('--history', type=int, metavar='STATION_ID', help="write a station's stored index history")
+    aqi.add_argument('--start', help='with --history, only calculations at or after this date')
+    aqi.add_argument('--end', help='with --history, only calculations at or before this date')
+    aqi.add_argument('--output', help='write to this file instead of stdout')
+    aqi.set_defaults(handler=cmd_aqi)
+
+    export = subparsers.add_parser('export', parents=[common], help='write stored series as columnar .npy files')
+    export.add_argument('directory', help='export directory; existing sensors in it are overwritten')
+    export.add_argument('--sensor', type=int, action='append', dest='sensors', help='only these sensor IDs (repeatable)')
+    export.add_argument('--output', help='write the counts to this file instead of stdout')
+    export.set_defaults(handler=cmd_export)
+
+    import_ = subparsers.add_parser('import', parents=[common], help='load a columnar export into the database')
+    import_.add_argument('directory', help="a directory written by 'export'")
+    import_.add_argument('--sensor', type=int, action='append', dest='sensors', help='only these sensor IDs (repeatable)')
+    import_.add_argument('--output', help='write the counts to this file instead of stdout')
+    import_.set_defaults(handler=cmd_import)
+    return parser
+
+
+def main(argv=None):
+    """
+    Run a subcommand.
+
+    Args:
+        argv (list, optional): The arguments; defaults to sys.argv[1:].
+
+    Returns:
+        int: The exit status, 0 on success.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == 'nearest' and not args.bbox and (args.lat is None or args.lon is None):
+        parser.error('nearest needs a latitude and longitude, or --bbox')
+    out, close = _open_output(args)
+    try:
+        return args.handler(args, out)
+    finally:
+        if close:
+            out.close()
+        get_manager(args.db).close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,251 @@
+"""
+Columnar export and import of the measurement store as NumPy .npy files.
+
+An export directory holds one subdirectory per sensor with two sorted columns, ts.npy (int64 epoch
+seconds) and value.npy (float64), plus manifest.json listing the exported stations and sensors with their
+row counts and time spans. The files can be copied between machines, loaded into notebooks with
+np.load(..., mmap_mode='r') and imported into another database. ColumnarStore memory-maps them, so a range
+read is a binary search and a slice of the mapped file, without copying or parsing.
+"""
+import json
+import os
+import logging
+import numpy as np
+from app.db_manager import insert_bulk, to_epoch
+from app.measurement_series import MeasurementSeries
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+SECONDS_PER_BUCKET = {'hour': 3600, 'day': 86400}
+
+
+def _sensor_dir(root, sensor_id):
+    return os.path.join(root, f'sensor_{int(sensor_id)}')
+
+
+def _save_atomic(path, array):
+    # Written next to the target and renamed, so a reader never maps a half-written column
+    temporary = f'{path}.tmp.npy'
+    np.save(temporary, array)
+    os.replace(temporary, path)
+
+
+def export_store(conn, root, sensor_ids=None):
+    """
+    Write the measurements of the given sensors to a columnar export directory.
+
+    Sensors already present in the directory are overwritten, others are kept, so exports can be
+    updated sensor by sensor.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        root (str): The export directory; it is created if missing.
+        sensor_ids (iterable, optional): The sensors to export; defaults to every sensor with measurements.
+
+    Returns:
+        dict: The number of exported 'sensors' and 'rows'.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest = _read_manifest(root) or {'version': FORMAT_VERSION, 'stations': {}, 'sensors': {}}
+    if sensor_ids is None:
+        sensor_ids = [row[0] for row in conn.execute('SELECT DISTINCT sensorId FROM measurements')]
+    exported, rows = 0, 0
+    for sensor_id in sensor_ids:
+        sensor_id = int(sensor_id)
+        # The primary key returns the points already sorted by time. The count is taken from what this single
+        # query read, so a write landing during the export cannot make the files and manifest disagree
+        cursor = conn.execute('SELECT ts, value FROM measurements WHERE sensorId = ? ORDER BY ts', (sensor_id,))
+        points = np.fromiter(cursor, dtype=[('ts', np.int64), ('value', np.float64)])
+        timestamps, values = points['ts'].copy(), points['value'].copy()
+        count = len(timestamps)
+        directory = _sensor_dir(root, sensor_id)
+        os.makedirs(directory, exist_ok=True)
+        _save_atomic(os.path.join(directory, 'ts.npy'), timestamps)
+        _save_atomic(os.path.join(directory, 'value.npy'), values)
+
+        sensor = conn.execute('SELECT stationId, paramName FROM sensors WHERE id = ?', (sensor_id,)).fetchone()
+        station_id, param_name = sensor if sensor else (None, None)
+        manifest['sensors'][str(sensor_id)] = {
+            'stationId': station_id, 'paramName': param_name, 'count': count,
+            'firstTs': int(timestamps[0]) if count else None, 'lastTs': int(timestamps[-1]) if count else None,
+        }
+        station = conn.execute('SELECT stationName, city, longitude, latitude FROM stations WHERE id = ?',
+                               (station_id,)).fetchone()
+        if station:
+            manifest['stations'][str(station_id)] = dict(zip(('stationName', 'city', 'longitude', 'latitude'), station))
+        exported += 1
+        rows += count
+    _write_manifest(root, manifest)
+    logger.info(f"Exported {exported} sensors, {rows} rows to {root}")
+    return {'sensors': exported, 'rows': rows}
+
+
+def import_store(conn, root, sensor_ids=None):
+    """
+    Load a columnar export directory into the database.
+
+    Points go through the same upsert as fetched data, so importing into a database that already holds
+    part of the series only writes new or changed values and keeps the aggregates up to date.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        root (str): The export directory.
+        sensor_ids (iterable, optional): Only import these sensors.
+
+    Returns:
+        dict: Counts of measurement rows 'inserted', 'updated' and 'skipped'.
+
+    Raises:
+        FileNotFoundError: If root holds no export.
+    """
+    store = ColumnarStore(root)
+    totals = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    for sensor_id in sensor_ids or store.sensor_ids():
+        sensor_id = int(sensor_id)
+        info = store.manifest['sensors'][str(sensor_id)]
+        station = store.manifest['stations'].get(str(info['stationId']), {})
+        station_dict = {'id': info['stationId'], 'stationName': station.get('stationName'),
+                        'city': {'name': station.get('city')}, 'gegrLon': station.get('longitude'),
+                        'gegrLat': station.get('latitude')}
+        sensor_dict = {'id': sensor_id, 'stationId': info['stationId'], 'param': {'paramName': info['paramName']}}
+        timestamps, values = store.read(sensor_id)
+        counts = insert_bulk(conn, series=[(station_dict, sensor_dict, MeasurementSeries.from_arrays(timestamps, values))])
+        if counts is None:
+            raise RuntimeError(f"Importing sensor {sensor_id} from {root} failed")
+        for key, count in counts.items():
+            totals[key] += count
+    return totals
+
+
+def _read_manifest(root):
+    path = os.path.join(root, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported export format version {manifest.get('version')} in {root}")
+    return manifest
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST)
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+
+class ColumnarStore:
+    """
+    Read access to a columnar export directory through memory-mapped columns.
+    """
+    def __init__(self, root):
+        """
+        Open an export directory.
+
+        Args:
+            root (str): The export directory written by export_store.
+
+        Raises:
+            FileNotFoundError: If root holds no export.
+        """
+        self.root = root
+        self.manifest = _read_manifest(root)
+        if self.manifest is None:
+            raise FileNotFoundError(f"No columnar export found at {root}")
+        self._columns = {}
+
+    def sensor_ids(self):
+        return [int(sensor_id) for sensor_id in self.manifest['sensors']]
+
+    def columns(self, sensor_id):
+        """
+        Return a sensor's memory-mapped columns; the files are mapped once and shared by later reads.
+
+        Args:
+            sensor_id (int): The ID of the sensor.
+
+        Returns:
+            tuple: The read-only (timestamps, values) arrays; empty if the sensor was not exported.
+        """
+        sensor_id = int(sensor_id)
+        if sensor_id not in self._columns:
+            directory = _sensor_dir(self.root, sensor_id)
+            info = self.manifest['sensors'].get(str(sensor_id))
+            # An empty column cannot be memory-mapped
+            if not info or not info['count'] or not os.path.isdir(directory):
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+            self._columns[sensor_id] = (np.load(os.path.join(directory, 'ts.npy'), mmap_mode='r'),
+                                        np.load(os.path.join(directory, 'value.npy'), mmap_mode='r'))
+        return self._columns[sensor_id]
+
+    def read(self, sensor_id, start_ts=None, end_ts=None):
+        """
+        Return a sensor's points between two timestamps as views of the mapped files.
+
+        Args:
+            sensor_id (int): The ID of the sensor.
+            start_ts (int, optional): Inclusive lower bound in seconds since the epoch.
+            end_ts (int, optional): Inclusive upper bound in seconds since the epoch.
+
+        Returns:
+            tuple: The (timestamps, values) arrays; only the pages of the range are read from disk.
+        """
+        timestamps, values = self.columns(sensor_id)
+        lower = 0 if start_ts is None else int(np.searchsorted(timestamps, start_ts, side='left'))
+        upper = len(timestamps) if end_ts is None else int(np.searchsorted(timestamps, end_ts, side='right'))
+        return timestamps[lower:upper], values[lower:upper]
+
+    def read_frame(self, sensor_id, start=None, end=None, resample=None):
+        """
+        Read a sensor's values like data_analyzer.read_data does from SQLite.
+
+        Args:
+            sensor_id (int): The ID of the sensor.
+            start (str or datetime, optional): Only read values at or after this date.
+            end (str or datetime, optional): Only read values at or before this date.
+            resample (str, optional): 'hour', 'day' or 'month' to return the mean value per period instead of raw values.
+
+        Returns:
+            DataFrame: A pandas DataFrame with 'date' and 'value' columns, sorted by date.
+        """
+        import pandas as pd
+
+        timestamps, values = self.read(sensor_id, to_epoch(start) if start else None, to_epoch(end) if end else None)
+        if resample is not None:
+            timestamps, values = resample_columns(timestamps, values, resample)
+        return pd.DataFrame({'date': pd.to_datetime(np.asarray(timestamps), unit='s'), 'value': values})
+
+
+def resample_columns(timestamps, values, resample):
+    """
+    Average sorted columns per hour, day or month.
+
+    Args:
+        timestamps (ndarray): Sorted epoch seconds.
+        values (ndarray): The values.
+        resample (str): 'hour', 'day' or 'month'.
+
+    Returns:
+        tuple: The bucket start timestamps and the mean value of each bucket.
+
+    Raises:
+        ValueError: If the granularity is unknown.
+    """
+    if resample in SECONDS_PER_BUCKET:
+        size = SECONDS_PER_BUCKET[resample]
+        buckets = timestamps // size * size
+    elif resample == 'month':
+        buckets = np.asarray(timestamps).astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype(np.int64)
+    else:
+        raise ValueError(f"Unknown resample granularity: {resample}")
+    if not len(buckets):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    # The input is sorted, so each bucket is a contiguous run
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    sums = np.add.reduceat(np.asarray(values, dtype=np.float64), starts)
+    return buckets[starts], sums / np.diff(np.r_[starts, len(buckets)])
@@ -0,0 +1,234 @@
+"""
+Comparative analysis of several sensors, e.g. PM10 at every station of a city.
+
+The series are read with one query over the (sensorId, ts) primary key and aligned on a common time grid as
+a wide frame with one column per sensor, from which side-by-side statistics, pairwise correlations and a
+single overlaid or small-multiples plot are produced.
+"""
+import logging
+import numpy as np
+import pandas as pd
+from app.analysis_engine import analyze_frame, norm_for, param_code
+from app.connection_manager import get_manager
+from app.data_analyzer import RESAMPLE_BUCKETS
+from app.db_manager import to_epoch
+from app.downsampling import downsample
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+GRID_FREQUENCIES = {'hour': 'h', 'day': 'D', 'month': 'MS'}
+MIN_OVERLAP = 3  # Common time steps needed before a correlation is reported
+
+
+def find_sensors(conn, param=None, city=None, station_ids=None):
+    """
+    Find stored sensors by parameter, city and station.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        param (str, optional): A parameter code or name, e.g. 'PM10' or 'dwutlenek azotu'.
+        city (str, optional): Case-insensitive part of the city name.
+        station_ids (iterable, optional): Only sensors of these stations.
+
+    Returns:
+        list: Dictionaries with 'id', 'stationId', 'stationName', 'city', 'paramName', 'latitude' and
+              'longitude', ordered by station.
+    """
+    query = '''
+    SELECT sensors.id, sensors.stationId, stations.stationName, stations.city, sensors.paramName,
+           stations.latitude, stations.longitude
+    FROM sensors
+    JOIN stations ON sensors.stationId = stations.id
+    '''
+    conditions, params = [], []
+    if station_ids:
+        station_ids = [int(station_id) for station_id in station_ids]
+        conditions.append(f"sensors.stationId IN ({', '.join('?' * len(station_ids))})")
+        params.extend(station_ids)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    rows = conn.execute(query + ' ORDER BY stations.stationName, sensors.id', params).fetchall()
+    sensors = [dict(zip(('id', 'stationId', 'stationName', 'city', 'paramName', 'latitude', 'longitude'), row))
+               for row in rows]
+    # Names are Polish ('pył zawieszony PM10'), so parameters are matched by code rather than in SQL
+    if param:
+        code = param_code(param)
+        sensors = [sensor for sensor in sensors
+                   if (param_code(sensor['paramName']) == code if code
+                       else param.lower() in (sensor['paramName'] or '').lower())]
+    if city:
+        sensors = [sensor for sensor in sensors if city.casefold() in (sensor['city'] or '').casefold()]
+    return sensors
+
+
+def sensor_labels(conn, sensor_ids):
+    """
+    Return a short label per sensor for legends and tables, e.g. 'PM10, Kraków, Aleja Krasińskiego'.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        sensor_ids (list): The IDs of the sensors.
+
+    Returns:
+        dict: A mapping of sensor ID to (label, paramName); unknown sensors are labelled by ID.
+    """
+    sensor_ids = [int(sensor_id) for sensor_id in sensor_ids]
+    rows = conn.execute(f'''
+    SELECT sensors.id, sensors.paramName, stations.stationName
+    FROM sensors
+    LEFT JOIN stations ON sensors.stationId = stations.id
+    WHERE sensors.id IN ({', '.join('?' * len(sensor_ids))})
+    ''', sensor_ids).fetchall()
+    known = {sensor_id: (f"{param_code(name) or name}, {station}", name) for sensor_id, name, station in rows}
+    return {sensor_id: known.get(sensor_id, (f"Sensor {sensor_id}", None)) for sensor_id in sensor_ids}
+
+
+def read_sensors(db_path, sensor_ids, start=None, end=None, resample='hour'):
+    """
+    Read several sensors' values with a single query.
+
+    Args:
+        db_path (str): Path to the database file.
+        sensor_ids (list): The IDs of the sensors.
+        start (str or datetime, optional): Only read values at or after this date.
+        end (str or datetime, optional): Only read values at or before this date.
+        resample (str, optional): 'hour', 'day' or 'month' to read the mean value per period; None for raw values.
+
+    Returns:
+        DataFrame: A long pandas DataFrame with 'sensor_id', 'date' and 'value' columns, sorted by sensor and date.
+    """
+    sensor_ids = [int(sensor_id) for sensor_id in sensor_ids]
+    conditions = [f"sensorId IN ({', '.join('?' * len(sensor_ids))})"]
+    params = list(sensor_ids)
+    if start:
+        conditions.append('ts >= ?')
+        params.append(to_epoch(start))
+    if end:
+        conditions.append('ts <= ?')
+        params.append(to_epoch(end))
+    where = ' AND '.join(conditions)
+    if resample is None:
+        query = f'SELECT sensorId, ts, value FROM measurements WHERE {where} ORDER BY sensorId, ts'
+    elif resample in RESAMPLE_BUCKETS:
+        query = f'''
+        SELECT sensorId, {RESAMPLE_BUCKETS[resample]} AS bucket, AVG(value) AS value
+        FROM measurements
+        WHERE {where}
+        GROUP BY sensorId, bucket
+        ORDER BY sensorId, bucket
+        '''
+    else:
+        raise ValueError(f"Unknown resample granularity: {resample}")
+    with get_manager(db_path).reader() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    df.columns = ['sensor_id', 'date', 'value']
+    df['date'] = pd.to_datetime(df['date'], unit='s')
+    return df
+
+
+def to_wide(df, sensor_ids=None, resample='hour'):
+    """
+    Pivot a long frame to one column per sensor on a common time grid.
+
+    Args:
+        df (DataFrame): Columns 'sensor_id', 'date' and 'value', as returned by read_sensors.
+        sensor_ids (list, optional): Column order; sensors without values become empty columns.
+        resample (str, optional): The grid of the values; with 'hour', 'day' or 'month' missing steps are
+            added as NaN so the rows are evenly spaced.
+
+    Returns:
+        DataFrame: Indexed by date, one float column per sensor ID.
+    """
+    wide = df.pivot(index='date', columns='sensor_id', values='value')
+    if sensor_ids is not None:
+        wide = wide.reindex(columns=[int(sensor_id) for sensor_id in sensor_ids])
+    if resample in GRID_FREQUENCIES and len(wide.index):
+        wide = wide.reindex(pd.date_range(wide.index[0], wide.index[-1], freq=GRID_FREQUENCIES[resample]))
+    wide.index.name = 'date'
+    wide.columns.name = 'sensor_id'
+    return wide
+
+
+def compare_sensors(db_path, sensor_ids, start=None, end=None, resample='hour'):
+    """
+    Compare several sensors over a date range.
+
+    Args:
+        db_path (str): Path to the database file.
+        sensor_ids (list): The IDs of the sensors.
+        start (str or datetime, optional): Only include values at or after this date.
+        end (str or datetime, optional): Only include values at or before this date.
+        resample (str, optional): The common grid, 'hour' by default; None to align raw timestamps.
+
+    Returns:
+        dict: 'wide' (see to_wide), 'stats' (one analyze_frame row per sensor with its 'label'),
+              'correlation' (Pearson correlation of the sensors over their common time steps) and
+              'labels' (sensor ID to label).
+    """
+    sensor_ids = list(dict.fromkeys(int(sensor_id) for sensor_id in sensor_ids))
+    if not sensor_ids:
+        raise ValueError("No sensors to compare")
+    with get_manager(db_path).reader() as conn:
+        info = sensor_labels(conn, sensor_ids)
+    labels = {sensor_id: label for sensor_id, (label, _) in info.items()}
+    norms = {sensor_id: norm_for(name) for sensor_id, (_, name) in info.items() if norm_for(name) is not None}
+
+    df = read_sensors(db_path, sensor_ids, start, end, resample)
+    wide = to_wide(df, sensor_ids, resample)
+    stats = analyze_frame(df, norms) if not df.empty else pd.DataFrame(columns=['sensor_id'])
+    stats.insert(1, 'label', stats['sensor_id'].map(labels))
+    correlation = wide.corr(min_periods=MIN_OVERLAP)
+    logger.info(f"Compared {len(sensor_ids)} sensors over {len(wide)} time steps")
+    return {'wide': wide, 'stats': stats, 'correlation': correlation, 'labels': labels}
+
+
+def plot_comparison(figure, wide, labels=None, small_multiples=False, title=None):
+    """
+    Draw the sensors of a wide frame on one figure.
+
+    Each series is reduced to about one point per horizontal pixel before drawing.
+
+    Args:
+        figure (Figure): The figure to draw on; it is cleared first.
+        wide (DataFrame): One column per sensor, indexed by date, as returned by to_wide.
+        labels (dict, optional): Legend labels by sensor ID.
+        small_multiples (bool): One axes per sensor with a shared time axis instead of one overlaid axes.
+        title (str, optional): The figure title.
+
+    Returns:
+        list: The axes.
+    """
+    import matplotlib.dates as mdates
+
+    labels = labels or {}
+    figure.clear()
+    columns = list(wide.columns)
+    if small_multiples and columns:
+        axes = list(np.atleast_1d(figure.subplots(len(columns), 1, sharex=True, squeeze=False)[:, 0]))
+    else:
+        axes = [figure.add_subplot()]
+    width = figure.get_figwidth() * figure.dpi
+    x = mdates.date2num(wide.index.to_pydatetime()) if len(wide.index) else np.empty(0)
+    for position, sensor_id in enumerate(columns):
+        ax = axes[position] if small_multiples else axes[0]
+        y = wide[sensor_id].to_numpy(dtype=np.float64)
+        present = ~np.isnan(y)
+        label = labels.get(sensor_id, str(sensor_id))
+        ax.plot(*downsample(x[present], y[present], width), linewidth=1, label=label, color=f'C{position % 10}')
+        if small_multiples:
+            ax.set_ylabel('Value', fontsize=9)
+            ax.legend(loc='upper right', fontsize=8)
+    for ax in axes:
+        ax.grid(True)
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+    if not small_multiples:
+        axes[0].set_ylabel('Value', fontsize=12)
+        if columns:
+            axes[0].legend(loc='upper right', fontsize=9)
+    axes[-1].set_xlabel('Date', fontsize=12)
+    figure.suptitle(title or 'Comparison', fontsize=14)
+    return axes
@@ -0,0 +1,197 @@
+import contextlib
+import os
+import queue
+import sqlite3
+import threading
+import time
+import logging
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_READ_POOL_SIZE = 4
+DEFAULT_CACHE_SIZE_KIB = 16 * 1024
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+BUSY_TIMEOUT_MS = 5000
+SLOW_HOLD_SECONDS = 1.0  # Connections held longer than this are logged as a warning
+
+
+class _HoldStats:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def record(self, waited, held):
+        self.count += 1
+        self.wait_seconds += waited
+        self.total_seconds += held
+        self.max_seconds = max(self.max_seconds, held)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total_seconds': self.total_seconds,
+            'max_seconds': self.max_seconds,
+            'mean_seconds': self.total_seconds / self.count if self.count else 0.0,
+            'wait_seconds': self.wait_seconds,
+        }
+
+
+class ConnectionManager:
+    """
+    Hands out tuned SQLite connections for one database file: a pool of read-only connections and a
+    single write connection. The database runs in WAL mode, so readers never wait for the writer.
+    """
+    def __init__(self, db_path, read_pool_size=DEFAULT_READ_POOL_SIZE, cache_size_kib=DEFAULT_CACHE_SIZE_KIB,
+                 mmap_size=DEFAULT_MMAP_SIZE):
+        """
+        Initialize the connection manager.
+
+        Args:
+            db_path (str): Path to the database file.
+            read_pool_size (int): Maximum number of pooled read connections.
+            cache_size_kib (int): Page cache size per connection in KiB.
+            mmap_size (int): Number of bytes of the database file to memory-map.
+        """
+        self.db_path = db_path
+        self.read_pool_size = read_pool_size
+        self.cache_size_kib = cache_size_kib
+        self.mmap_size = mmap_size
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._pool_lock = threading.Lock()
+        self._wal_enabled = False
+        self._writer = None
+        self._writer_lock = threading.Lock()
+        self._stats = {'reader': _HoldStats(), 'writer': _HoldStats()}
+        self._stats_lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def reader(self):
+        """
+        Borrow a read-only connection from the pool.
+
+        Yields:
+            sqlite3.Connection: A connection with PRAGMA query_only enabled.
+        """
+        requested = time.perf_counter()
+        conn = self._acquire_reader()
+        acquired = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+            self._record('reader', acquired - requested, time.perf_counter() - acquired)
+
+    @contextlib.contextmanager
+    def writer(self):
+        """
+        Take the write connection; other writers wait until it is returned.
+        A pending transaction is committed on exit, or rolled back if the block raised.
+
+        Yields:
+            sqlite3.Connection: The write connection.
+        """
+        requested = time.perf_counter()
+        with self._writer_lock:
+            acquired = time.perf_counter()
+            if self._writer is None:
+                self._writer = self._connect(read_only=False)
+            conn = self._writer
+            try:
+                yield conn
+            except BaseException:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            else:
+                if conn.in_transaction:
+                    conn.commit()
+            finally:
+                self._record('writer', acquired - requested, time.perf_counter() - acquired)
+
+    def stats(self):
+        """
+        Return how often and for how long connections were held.
+
+        Returns:
+            dict: Hold and wait statistics for 'reader' and 'writer' connections.
+        """
+        with self._stats_lock:
+            return {kind: stats.as_dict() for kind, stats in self._stats.items()}
+
+    def close(self):
+        """
+        Close every pooled connection.
+        """
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._pool_lock:
+            while True:
+                try:
+                    self._readers.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._reader_count = 0
+
+    def _acquire_reader(self):
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if self._reader_count < self.read_pool_size:
+                self._reader_count += 1
+                if not self._wal_enabled:
+                    # WAL is a property of the file; switch it before the first reader opens it
+                    self._connect(read_only=False).close()
+                return self._connect(read_only=True)
+        return self._readers.get()
+
+    def _connect(self, read_only):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=BUSY_TIMEOUT_MS / 1000)
+        if not read_only:
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._wal_enabled = True
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA cache_size=-{int(self.cache_size_kib)}')
+        conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+        if read_only:
+            conn.execute('PRAGMA query_only=ON')
+        return conn
+
+    def _record(self, kind, waited, held):
+        if held > SLOW_HOLD_SECONDS:
+            logger.warning(f"{kind.capitalize()} connection to {self.db_path} held for {held:.2f} s")
+        with self._stats_lock:
+            self._stats[kind].record(waited, held)
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_manager(db_path):
+    """
+    Return the shared ConnectionManager for a database file, creating it on first use.
+
+    Args:
+        db_path (str): Path to the database file.
+
+    Returns:
+        ConnectionManager: The manager for that file.
+    """
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ConnectionManager(db_path)
+        return _managers[key]
@@ -1,34 +1,65 @@
-import sqlite3
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+# matplotlib is imported where it is used, so headless callers such as app.cli do not load it
+from app.aggregates import range_stats
+from app.analysis_engine import analyze_frame, norm_for
+from app.connection_manager import get_manager
+from app.db_manager import to_epoch
+from app.downsampling import downsample
 
-def read_data(db_path, sensor_id):
+RAW_ANALYSIS_LIMIT = 100_000  # Ranges with at most this many values are analysed from the raw series
+MARKER_SPACING_PX = 8  # Markers are drawn only when visible points are at least this far apart
+
+# Bucket start for each resample granularity, computed in SQL from the epoch timestamp
+RESAMPLE_BUCKETS = {
+    'hour': '(ts / 3600) * 3600',
+    'day': '(ts / 86400) * 86400',
+    'month': "CAST(strftime('%s', ts, 'unixepoch', 'start of month') AS INTEGER)",
+}
+
+def read_data(db_path, sensor_id, start=None, end=None, resample=None, store=None):
     """
     Read data from the database for a specific sensor.
 
+    The bounds are applied in SQL on the (sensorId, ts) primary key, so only the requested range is read.
+
     Args:
         db_path (str): Path to the database file.
         sensor_id (int): The ID of the sensor.
+        start (str or datetime, optional): Only read values at or after this date.
+        end (str or datetime, optional): Only read values at or before this date.
+        resample (str, optional): 'hour', 'day' or 'month' to return the mean value per period instead of raw values.
+        store (ColumnarStore, optional): Read from this memory-mapped columnar export instead of the database.
 
     Returns:
-        DataFrame: A pandas DataFrame containing combined current and historical data.
+        DataFrame: A pandas DataFrame with 'date' and 'value' columns, sorted by date.
     """
-    conn = sqlite3.connect(db_path)
-    query = f'''
-    SELECT date, value, historical_value, historical_value_date
-    FROM measurements
-    WHERE sensorId = {sensor_id}
-    '''
-    df = pd.read_sql_query(query, conn, parse_dates=['date', 'historical_value_date'])
-    conn.close()
-
-    historical_df = df[['historical_value_date', 'historical_value']].rename(
-        columns={'historical_value_date': 'date', 'historical_value': 'value'}
-    ).dropna()
+    if store is not None:
+        return store.read_frame(sensor_id, start, end, resample)
+    conditions, params = ['sensorId = ?'], [int(sensor_id)]
+    if start:
+        conditions.append('ts >= ?')
+        params.append(to_epoch(start))
+    if end:
+        conditions.append('ts <= ?')
+        params.append(to_epoch(end))
+    where = ' AND '.join(conditions)
+    if resample is None:
+        query = f'SELECT ts, value FROM measurements WHERE {where} ORDER BY ts'
+    elif resample in RESAMPLE_BUCKETS:
+        query = f'''
+        SELECT {RESAMPLE_BUCKETS[resample]} AS bucket, AVG(value) AS value
+        FROM measurements
+        WHERE {where}
+        GROUP BY bucket
+        ORDER BY bucket
+        '''
+    else:
+        raise ValueError(f"Unknown resample granularity: {resample}")
+    with get_manager(db_path).reader() as conn:
+        df = pd.read_sql_query(query, conn, params=params)
 
-    combined_df = pd.concat([df[['date', 'value']], historical_df], ignore_index=True).dropna().sort_values(by='date')
-    return combined_df
+    df['date'] = pd.to_datetime(df.pop(df.columns[0]), unit='s')
+    return df[['date', 'value']]
 
 def get_sensor_info(db_path, sensor_id):
     """
@@ -41,40 +72,259 @@ def get_sensor_info(db_path, sensor_id):
     Returns:
         tuple: A tuple containing the parameter name and station name.
     """
-    conn = sqlite3.connect(db_path)
     query = '''
     SELECT sensors.paramName, stations.stationName
     FROM sensors
     JOIN stations ON sensors.stationId = stations.id
     WHERE sensors.id = ?
     '''
-    result = conn.execute(query, (sensor_id,)).fetchone()
-    conn.close()
-    return result
+    with get_manager(db_path).reader() as conn:
+        return conn.execute(query, (sensor_id,)).fetchone()
 
-def analyze_data(df):
+def analyze_data(df, norm=None):
     """
     Analyze the data to extract minimum, maximum, and mean values, as well as the trend.
 
     Args:
         df (DataFrame): A pandas DataFrame containing the data to be analyzed.
+        norm (float, optional): Reference level; values above it are counted as exceedances.
 
     Returns:
-        dict: A dictionary containing analysis results.
+        dict: A dictionary containing analysis results: the min/max values and dates, mean, median,
+              standard deviation, percentiles, the least-squares trend and the exceedance count.
     """
     analysis = {}
     if not df.empty:
-        analysis['min_value'] = df['value'].min()
-        analysis['min_date'] = df.loc[df['value'] == analysis['min_value'], 'date'].iloc[0]
-        analysis['max_value'] = df['value'].max()
-        analysis['max_date'] = df.loc[df['value'] == analysis['max_value'], 'date'].iloc[0]
-        analysis['mean_value'] = df['value'].mean()
-        analysis['trend'] = 'Increasing' if df['value'].iloc[-1] > df['value'].iloc[0] else 'Decreasing'
+        result = analyze_frame(df.assign(sensor_id=0), {0: norm} if norm is not None else None)
+        if not result.empty:
+            analysis = result.iloc[0].drop('sensor_id').to_dict()
     return analysis
 
+def summarize_range(db_path, sensor_id, start=None, end=None):
+    """
+    Summarize a sensor's values in a date range from the pre-aggregated buckets, without reading the raw series.
+
+    Args:
+        db_path (str): Path to the database file.
+        sensor_id (int): The ID of the sensor.
+        start (str or datetime, optional): Only include values at or after this date.
+        end (str or datetime, optional): Only include values at or before this date.
+
+    Returns:
+        dict: The count, min/max values and dates, mean, standard deviation and trend, or an empty dict if there are no values.
+    """
+    with get_manager(db_path).reader() as conn:
+        summary = range_stats(conn, int(sensor_id), to_epoch(start) if start else None, to_epoch(end) if end else None)
+    for extreme in ('min', 'max'):
+        if f'{extreme}_ts' in summary:
+            summary[f'{extreme}_date'] = pd.to_datetime(summary.pop(f'{extreme}_ts'), unit='s')
+    return summary
+
+def analyze_range(db_path, sensor_id, start=None, end=None, raw_limit=RAW_ANALYSIS_LIMIT):
+    """
+    Analyze a sensor's values in a date range, reading the raw series only when the range is small enough.
+
+    The pre-aggregated summary is computed first. If the range holds at most raw_limit values, the raw
+    series is also read and analysed in full, adding the median, percentiles and the exceedances of the
+    parameter's norm; larger ranges return the aggregate summary only.
+
+    Args:
+        db_path (str): Path to the database file.
+        sensor_id (int): The ID of the sensor.
+        start (str or datetime, optional): Only include values at or after this date.
+        end (str or datetime, optional): Only include values at or before this date.
+        raw_limit (int): The largest number of values analysed from the raw series.
+
+    Returns:
+        dict: The analyze_data results for small ranges, otherwise the summarize_range results; an empty dict
+              if there are no values.
+    """
+    summary = summarize_range(db_path, sensor_id, start, end)
+    if not summary or summary['count'] > raw_limit:
+        return summary
+    info = get_sensor_info(db_path, sensor_id)
+    return analyze_data(read_data(db_path, sensor_id, start, end), norm_for(info[0]) if info else None) or summary
+
+class LevelOfDetail:
+    """
+    Keeps a plotted line downsampled to the width of its axes and re-reads the visible range from the
+    database when the user zooms or pans, so drawing time does not grow with the length of the history.
+    """
+    def __init__(self, ax, line, db_path=None, sensor_id=None, method='lttb', redraw=None):
+        """
+        Initialize the level-of-detail controller and start following the axes' x limits.
+
+        Args:
+            ax (Axes): The axes showing the line.
+            line (Line2D): The line to keep updated.
+            db_path (str, optional): Path to the database file.
+            sensor_id (int, optional): The ID of the sensor being plotted; nothing is re-read until it is set.
+            method (str): Downsampling method, 'lttb' or 'minmax'.
+            redraw (callable, optional): Called after the line changed; defaults to the canvas' draw_idle.
+        """
+        self.ax = ax
+        self.line = line
+        self.db_path = db_path
+        self.sensor_id = sensor_id
+        self.method = method
+        self.redraw = redraw or (lambda: ax.figure.canvas.draw_idle())
+        self.paused = False
+        self.connection = ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+    def width(self):
+        return max(3, int(self.ax.bbox.width))
+
+    def show(self, df, span=1):
+        """
+        Draw a DataFrame's series, downsampled to span times the axes width.
+
+        Args:
+            df (DataFrame): A pandas DataFrame with 'date' and 'value' columns.
+            span (int): How many axes widths of data df covers.
+        """
+        import matplotlib.dates as mdates
+        x, y = downsample(mdates.date2num(df['date'].to_numpy()), df['value'].to_numpy(), self.width() * span,
+                          self.method)
+        self.line.set_data(x, y)
+        self.line.set_marker('o' if len(x) * MARKER_SPACING_PX <= self.width() * span else '')
+
+    def on_xlim_changed(self, ax):
+        if self.paused or self.sensor_id is None:
+            return
+        import matplotlib.dates as mdates
+        start, end = (mdates.num2date(limit) for limit in ax.get_xlim())
+        margin = end - start
+        # Reading one view width on either side keeps panning smooth until the next refetch
+        self.show(read_data(self.db_path, self.sensor_id, start - margin, end + margin), span=3)
+        self.redraw()
+
+class SeriesPlot:
+    """
+    A reusable plot of one sensor's series with min/max annotations and a mean line.
+
+    The artists are created once and updated in place. The line is animated, so once a frame has been
+    drawn, data-only changes are blitted over the saved background instead of redrawing the figure.
+    """
+    def __init__(self, figure, db_path=None):
+        """
+        Create the axes and artists on a figure.
+
+        Args:
+            figure (Figure): The figure to draw on; its canvas must already be attached.
+            db_path (str, optional): Path to the database file used to re-read detail on zoom.
+        """
+        import matplotlib.dates as mdates
+        self.figure = figure
+        self.ax = figure.add_subplot()
+        self.line, = self.ax.plot([], [], linestyle='-', color='b', label='Values', animated=True)
+        self.mean_line = self.ax.axhline(0, color='g', linestyle='-', visible=False)
+        annotation_style = dict(arrowprops=dict(facecolor='black', arrowstyle='->'),
+                                bbox=dict(boxstyle='round,pad=0.5', edgecolor='black', facecolor='white'))
+        self.min_annotation = self.ax.annotate('', xy=(0, 0), xytext=(0, 0), visible=False, **annotation_style)
+        self.max_annotation = self.ax.annotate('', xy=(0, 0), xytext=(0, 0), visible=False, **annotation_style)
+        self.ax.set_xlabel('Date', fontsize=12)
+        self.ax.set_ylabel('Value', fontsize=12)
+        self.ax.grid(True)
+        # AutoDateLocator picks hours, days or months so the tick count stays readable for any range
+        locator = mdates.AutoDateLocator()
+        self.ax.xaxis.set_major_locator(locator)
+        self.ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        self.level_of_detail = LevelOfDetail(self.ax, self.line, db_path, redraw=self.blit)
+        self._background = None
+        figure.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def update(self, df, analysis=None, title=None, sensor_id=None):
+        """
+        Show a new series, reusing the existing artists.
+
+        Args:
+            df (DataFrame): A pandas DataFrame with 'date' and 'value' columns.
+            analysis (dict, optional): The result of analyze_data, used for the annotations and the mean line.
+            title (str, optional): The plot title.
+            sensor_id (int, optional): The sensor whose detail is re-read on zoom.
+        """
+        import matplotlib.dates as mdates
+        self.level_of_detail.paused = True
+        try:
+            if not df.empty:
+                low, high = df['value'].min(), df['value'].max()
+                margin = (high - low) * 0.1 or 1.0
+                self.ax.set_xlim(mdates.date2num(df['date'].iloc[0]), mdates.date2num(df['date'].iloc[-1]))
+                self.ax.set_ylim(low - margin, high + margin * 2)
+        finally:
+            self.level_of_detail.paused = False
+        self.level_of_detail.sensor_id = sensor_id
+        self.level_of_detail.show(df)
+
+        analysis = analysis or {}
+        offset = (analysis['max_value'] - analysis['min_value']) * 0.05 if analysis else 0
+        for annotation, extreme, shift in ((self.min_annotation, 'min', offset), (self.max_annotation, 'max', -offset * 2)):
+            annotation.set_visible(bool(analysis))
+            if analysis:
+                date, value = mdates.date2num(analysis[f'{extreme}_date']), analysis[f'{extreme}_value']
+                annotation.set_text(f"{extreme.capitalize()}: {value}\non {analysis[f'{extreme}_date']:%Y-%m-%d %H:%M}")
+                annotation.xy = (date, value)
+                annotation.set_position((date, value + shift))
+        self.mean_line.set_visible(bool(analysis))
+        if analysis:
+            self.mean_line.set_ydata([analysis['mean_value']] * 2)
+            self.mean_line.set_label(f"Mean Value: {analysis['mean_value']:.2f}")
+        self.ax.set_title(title or '', fontsize=14)
+        self.ax.legend(loc='upper right')
+        self.figure.canvas.draw_idle()
+
+    def save(self, path, **kwargs):
+        """
+        Write the plot to an image file.
+
+        Args:
+            path (str): The output path; the format follows its extension, e.g. '.png' or '.svg'.
+            **kwargs: Further arguments for Figure.savefig, e.g. dpi.
+        """
+        # Animated artists are left out of regular draws, so the line is made static while saving
+        self.line.set_animated(False)
+        try:
+            self.figure.savefig(path, **kwargs)
+        finally:
+            self.line.set_animated(True)
+
+    def blit(self):
+        """
+        Redraw only the line over the background saved at the last full draw.
+        """
+        canvas = self.figure.canvas
+        if self._background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        canvas.blit(self.figure.bbox)
+
+    def _on_draw(self, event):
+        self._background = self.figure.canvas.copy_from_bbox(self.figure.bbox)
+        self.ax.draw_artist(self.line)
+
+def plot_title(db_path, sensor_id):
+    """
+    Return the plot title naming a sensor's parameter and station.
+
+    Args:
+        db_path (str): Path to the database file.
+        sensor_id (int): The ID of the sensor.
+
+    Returns:
+        str: The title.
+    """
+    sensor_info = get_sensor_info(db_path, sensor_id)
+    if sensor_info:
+        param_name, station_name = sensor_info
+    else:
+        param_name, station_name = "Unknown Sensor", "Unknown Station"
+    return f'Data Over Time\n{param_name} at {station_name}'
+
 def plot_data(db_path, sensor_id, df, start_date=None, end_date=None):
     """
-    Plot the data over time, including current and historical values, with annotations for min, max, and mean values.
+    Plot the data over time in a separate window, with annotations for min, max, and mean values.
 
     Args:
         db_path (str): Path to the database file.
@@ -82,56 +332,20 @@ def plot_data(db_path, sensor_id, df, start_date=None, end_date=None):
         df (DataFrame): A pandas DataFrame containing the data to be plotted.
         start_date (str, optional): Start date for filtering the data.
         end_date (str, optional): End date for filtering the data.
+
+    Returns:
+        SeriesPlot: The plot, which keeps the line in sync with zooming.
     """
+    import matplotlib.pyplot as plt
+
     if start_date:
         df = df[df['date'] >= start_date]
     if end_date:
         df = df[df['date'] <= end_date]
 
-    sensor_info = get_sensor_info(db_path, sensor_id)
-    if sensor_info:
-        param_name, station_name = sensor_info
-    else:
-        param_name, station_name = "Unknown Sensor", "Unknown Station"
-
-    current_df = df[df['date'].isin(df['date'].unique())]
-    historical_df = df[~df['date'].isin(current_df['date'].unique())]
-
-    plt.figure(figsize=(12, 8))
-
-    plt.plot(current_df['date'], current_df['value'], marker='o', linestyle='-', color='b', label='Current Values')
-
-    if not historical_df.empty:
-        plt.plot(historical_df['date'], historical_df['value'], marker='x', linestyle='--', color='r', label='Historical Values')
-
-    analysis = analyze_data(df)
-    if analysis:
-        offset = (df['value'].max() - df['value'].min()) * 0.05
-        min_offset = -offset if analysis['min_value'] > df['value'].min() + offset else offset
-        max_offset = offset * 2 if analysis['max_value'] < df['value'].max() - offset else -offset * 2
-
-        plt.annotate(f"Min: {analysis['min_value']}\non {analysis['min_date']:%Y-%m-%d %H:%M}",
-                     xy=(analysis['min_date'], analysis['min_value']),
-                     xytext=(analysis['min_date'], analysis['min_value'] + min_offset),
-                     arrowprops=dict(facecolor='black', arrowstyle='->'),
-                     bbox=dict(boxstyle='round,pad=0.5', edgecolor='black', facecolor='white'))
-        plt.annotate(f"Max: {analysis['max_value']}\non {analysis['max_date']:%Y-%m-%d %H:%M}",
-                     xy=(analysis['max_date'], analysis['max_value']),
-                     xytext=(analysis['max_date'], analysis['max_value'] + max_offset),
-                     arrowprops=dict(facecolor='black', arrowstyle='->'),
-                     bbox=dict(boxstyle='round,pad=0.5', edgecolor='black', facecolor='white'))
-        mean_value = analysis['mean_value']
-        plt.axhline(y=mean_value, color='g', linestyle='-', label=f'Mean Value: {mean_value:.2f}')
-
-    plt.title(f'Data Over Time\n{param_name} at {station_name}', fontsize=16)
-    plt.xlabel('Date', fontsize=14)
-    plt.ylabel('Value', fontsize=14)
-    plt.legend()
-    plt.grid(True)
-
-    plt.gca().xaxis.set_major_locator(mdates.HourLocator(interval=1))
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d %H:%M'))
-
-    plt.xticks(rotation=45)
-    plt.tight_layout()
+    fig = plt.figure(figsize=(12, 8))
+    series_plot = SeriesPlot(fig, db_path)
+    series_plot.update(df, analyze_data(df), plot_title(db_path, sensor_id), sensor_id)
+    fig.tight_layout()
     plt.show()
+    return series_plot
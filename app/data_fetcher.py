@@ -1,10 +1,255 @@
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+from app.measurement_series import MeasurementSeries, iter_json_array, iter_text
 
 # Initialize the logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+API_BASE_URL = 'https://api.gios.gov.pl/pjp-api/rest'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """
+    Raised instead of sending a request while the circuit breaker is open.
+    """
+
+class CircuitBreaker:
+    """
+    Stops calling the API after repeated failures and lets a single probe through once the cool-down has passed.
+    """
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        """
+        Initialize the circuit breaker.
+
+        Args:
+            failure_threshold (int): Consecutive failures after which the circuit opens.
+            reset_timeout (float): Seconds to wait before letting a probe request through an open circuit.
+            clock (callable): Monotonic clock returning seconds.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._clock() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if not self._probing and self._clock() - self._opened_at >= self.reset_timeout:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning(f"Circuit opened after {self._failures} consecutive API failures.")
+                self._opened_at = self._clock()
+
+class LatencyHistogram:
+    """
+    Cumulative request latency histogram with fixed bucket bounds in seconds.
+    """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._total += seconds
+
+    def snapshot(self):
+        """
+        Return the histogram contents.
+
+        Returns:
+            dict: Keys 'count', 'total_seconds' and 'buckets', the latter mapping each upper bound
+                  (as a string, '+Inf' for the overflow bucket) to the number of requests that took at most that long.
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total = self._total
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {'count': sum(counts), 'total_seconds': total, 'buckets': dict(zip(labels, counts))}
+
+class FetcherClient:
+    """
+    Shared HTTP client for the GIOŚ API: pooled keep-alive connections, timeouts, retries with
+    exponential backoff on 5xx/429, a circuit breaker and per-endpoint latency histograms.
+    """
+    def __init__(self, base_url=API_BASE_URL, pool_maxsize=10, connect_timeout=3.05, read_timeout=20.0,
+                 max_retries=3, backoff_factor=0.5, max_backoff=30.0, breaker=None, sleep=time.sleep):
+        """
+        Initialize the client.
+
+        Args:
+            base_url (str): The API root URL.
+            pool_maxsize (int): Maximum number of open connections per host; further requests wait for a free one.
+            connect_timeout (float): Seconds to wait for a TCP/TLS connection.
+            read_timeout (float): Seconds to wait for the server between bytes of the response.
+            max_retries (int): Number of retries after the first attempt.
+            backoff_factor (float): Base delay in seconds; retry n sleeps backoff_factor * 2 ** n.
+            max_backoff (float): Upper bound for a single backoff delay, including Retry-After.
+            breaker (CircuitBreaker, optional): Circuit breaker to use; a default one is created if omitted.
+            sleep (callable): Function used to wait between retries.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._sleep = sleep
+        self._histograms = {}
+        self._histograms_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def get(self, endpoint, path, headers=None, **kwargs):
+        """
+        Send a GET request to the API, retrying transient failures.
+
+        Args:
+            endpoint (str): Name of the endpoint used to label latency statistics.
+            path (str): Path relative to the API root, e.g. '/station/findAll'.
+            headers (dict, optional): Extra request headers.
+            **kwargs: Further keyword arguments passed to requests.Session.get.
+
+        Returns:
+            requests.Response: The last response received; the caller checks its status.
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open.
+            requests.exceptions.RequestException: If the request still fails after all retries.
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(f"Circuit open, not calling {endpoint}")
+        url = f"{self.base_url}{path}"
+        histogram = self._histogram(endpoint)
+        attempt = 0
+        succeeded = False
+        # The outcome is recorded once, whatever leaves the loop; otherwise an unexpected exception
+        # during a half-open probe would leave the breaker waiting for that probe forever
+        try:
+            while True:
+                started = time.perf_counter()
+                try:
+                    response = self.session.get(url, headers=headers, timeout=self.timeout, **kwargs)
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                    histogram.observe(time.perf_counter() - started)
+                    if attempt >= self.max_retries:
+                        raise
+                    logger.warning(f"{endpoint} request failed ({e}), retrying")
+                    self._sleep(self._backoff(attempt))
+                    attempt += 1
+                    continue
+                histogram.observe(time.perf_counter() - started)
+
+                if response.status_code not in RETRY_STATUSES:
+                    succeeded = True
+                    return response
+                if attempt >= self.max_retries:
+                    # Still rate limited or failing after every retry
+                    return response
+                logger.warning(f"{endpoint} returned HTTP {response.status_code}, retrying")
+                self._sleep(self._backoff(attempt, response.headers.get('Retry-After')))
+                attempt += 1
+        finally:
+            if succeeded:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+
+    def latency_stats(self):
+        """
+        Return the latency histogram of every endpoint called so far.
+
+        Returns:
+            dict: A mapping of endpoint name to LatencyHistogram.snapshot().
+        """
+        with self._histograms_lock:
+            histograms = dict(self._histograms)
+        return {endpoint: histogram.snapshot() for endpoint, histogram in histograms.items()}
+
+    def close(self):
+        self.session.close()
+
+    def _histogram(self, endpoint):
+        with self._histograms_lock:
+            if endpoint not in self._histograms:
+                self._histograms[endpoint] = LatencyHistogram()
+            return self._histograms[endpoint]
+
+    def _backoff(self, attempt, retry_after=None):
+        delay = self.backoff_factor * 2 ** attempt
+        if isinstance(retry_after, str) and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return min(delay, self.max_backoff)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the shared FetcherClient, creating it on first use.
+
+    Returns:
+        FetcherClient: The client used by all fetch functions in this module.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FetcherClient()
+        return _client
+
+def set_client(client):
+    """
+    Replace the shared FetcherClient, e.g. to change timeouts or pool size.
+
+    Args:
+        client (FetcherClient): The client to use from now on.
+    """
+    global _client
+    with _client_lock:
+        _client = client
+
 def get_station_list():
     """
     Fetch the list of all stations from the API.
@@ -12,16 +257,48 @@ def get_station_list():
     Returns:
         list: A list of dictionaries containing station data, or None if an error occurs.
     """
+    result = get_station_list_conditional()
+    return result['stations'] if result else None
+
+def get_station_list_conditional(etag=None, last_modified=None):
+    """
+    Fetch the list of all stations, revalidating a previously cached copy.
+
+    Args:
+        etag (str, optional): The ETag returned by the previous fetch.
+        last_modified (str, optional): The Last-Modified header returned by the previous fetch.
+
+    Returns:
+        dict: A dictionary with keys 'not_modified', 'stations', 'etag' and 'last_modified',
+              or None if an error occurs. 'stations' is None when the server answered 304 Not Modified.
+    """
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
     try:
-        response = requests.get('https://api.gios.gov.pl/pjp-api/rest/station/findAll')
-        response.raise_for_status()
-        stations = response.json()
-        for station in stations:
-            station['id'] = int(station['id'])
-            station['gegrLat'] = float(station['gegrLat'])
-            station['gegrLon'] = float(station['gegrLon'])
-        return stations
-    except requests.exceptions.RequestException as e:
+        response = get_client().get('station_list', '/station/findAll', headers=headers, stream=True)
+        try:
+            if response.status_code == 304:
+                return {'not_modified': True, 'stations': None, 'etag': etag, 'last_modified': last_modified}
+            response.raise_for_status()
+            # Stations are converted as they are parsed, without holding the raw text next to the parsed list
+            stations = []
+            for station in iter_json_array(iter_text(response)):
+                station['id'] = int(station['id'])
+                station['gegrLat'] = float(station['gegrLat'])
+                station['gegrLon'] = float(station['gegrLon'])
+                stations.append(station)
+        finally:
+            response.close()  # Returns the streamed connection to the pool
+        return {
+            'not_modified': False,
+            'stations': stations,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+    except (requests.exceptions.RequestException, ValueError) as e:
         logger.error(f"Error fetching station list: {e}")
         return None
 
@@ -36,8 +313,7 @@ def get_sensors_for_station(station_id):
         list: A list of dictionaries containing sensor data, or None if an error occurs.
     """
     try:
-        url = f'https://api.gios.gov.pl/pjp-api/rest/station/sensors/{station_id}'
-        response = requests.get(url)
+        response = get_client().get('sensors', f'/station/sensors/{station_id}')
         response.raise_for_status()
         sensors = response.json()
         for sensor in sensors:
@@ -52,32 +328,31 @@ def get_measurement_data(sensor_id):
     """
     Fetch measurement data for a specific sensor.
 
+    The response is parsed while it streams in and the values go straight into a compact MeasurementSeries.
+
     Args:
         sensor_id (int): The ID of the sensor.
 
     Returns:
-        dict: A dictionary containing measurement data, or None if an error occurs.
+        MeasurementSeries: The sensor's values, which also reads like a {'values': [...]} dictionary,
+                           or None if an error occurs.
     """
     try:
-        url = f'https://api.gios.gov.pl/pjp-api/rest/data/getData/{sensor_id}'
-        response = requests.get(url)
-        response.raise_for_status()
-        data = response.json()
-        logger.info(f"Raw measurement data: {data}")
-        values = []
-        for value in data['values']:
-            if value['value'] is not None:
-                measurement = {
-                    'date': value['date'],
-                    'value': float(value['value']),
-                }
-                if 'historical_value' in value:
-                    measurement['historical_value'] = float(value['historical_value'])
-                if 'historical_value_date' in value:
-                    measurement['historical_value_date'] = value['historical_value_date']
-                values.append(measurement)
-        return {'values': values}
-    except requests.exceptions.RequestException as e:
+        response = get_client().get('measurements', f'/data/getData/{sensor_id}', stream=True)
+        try:
+            response.raise_for_status()
+            series = MeasurementSeries()
+            for value in iter_json_array(iter_text(response), 'values'):
+                # A revised earlier reading is stored as a point of its own, like db_manager does for dictionaries
+                if value.get('historical_value') is not None and value.get('historical_value_date'):
+                    series.add(value['historical_value_date'], value['historical_value'])
+                if value.get('value') is not None:
+                    series.add(value.get('date'), value['value'])
+        finally:
+            response.close()
+        logger.debug(f"Parsed {len(series.timestamps)} values for sensor {sensor_id}")
+        return series
+    except (requests.exceptions.RequestException, ValueError) as e:
         logger.error(f"Error fetching measurement data for sensor {sensor_id}: {e}")
         return None
 
@@ -92,8 +367,7 @@ def get_air_quality_index(station_id):
         dict: A dictionary containing air quality index data, or None if an error occurs.
     """
     try:
-        url = f'https://api.gios.gov.pl/pjp-api/rest/aqindex/getIndex/{station_id}'
-        response = requests.get(url)
+        response = get_client().get('aq_index', f'/aqindex/getIndex/{station_id}')
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -1,49 +1,367 @@
+import calendar
+import collections
+import contextlib
 import sqlite3
 import logging
+from datetime import datetime, timezone
+from app.aggregates import AGGREGATES_DDL, rebuild_aggregates, refresh_aggregates
 
 # Initialize the logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def to_epoch(date):
+    """
+    Convert a measurement date to the integer timestamp stored in the database.
+
+    GIOŚ publishes naive local wall-clock times; they are stored as if they were UTC so that
+    from_epoch gives back exactly the published date, without daylight-saving ambiguity.
+
+    Args:
+        date (str): A date such as '2024-06-01 13:00:00', '2024-06-01' or '2024-06-01T13:00:00Z'.
+
+    Returns:
+        int: Seconds since the epoch.
+    """
+    if isinstance(date, str):
+        date = datetime.fromisoformat(date.replace('Z', '+00:00'))
+    if date.tzinfo is not None:
+        return int(date.timestamp())
+    return calendar.timegm(date.timetuple())
+
+def from_epoch(ts):
+    """
+    Convert a stored timestamp back to the published date string.
+
+    Args:
+        ts (int): Seconds since the epoch, as returned by to_epoch.
+
+    Returns:
+        str: The date formatted as 'YYYY-MM-DD HH:MM:SS'.
+    """
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(DATE_FORMAT)
+
+MIGRATION_CHUNK_SIZE = 50000  # Rows copied per transaction when a migration rebuilds a large table
+
+# Clustered on (sensorId, ts): per-sensor range scans, MIN/MAX and ORDER BY ts read only the requested
+# slice of the primary key, which also holds the value, so no secondary index is needed
+MEASUREMENTS_DDL = '''CREATE TABLE IF NOT EXISTS measurements (
+                       sensorId INTEGER NOT NULL,
+                       ts INTEGER NOT NULL,
+                       value REAL NOT NULL,
+                       PRIMARY KEY(sensorId, ts),
+                       FOREIGN KEY(sensorId) REFERENCES sensors(id)) WITHOUT ROWID'''
+
+# One row per station and index calculation; levels are the GIOŚ level ids (0 very good .. 5 very bad)
+AQ_INDEX_DDL = '''CREATE TABLE IF NOT EXISTS aq_index (
+                   stationId INTEGER NOT NULL,
+                   calcTs INTEGER NOT NULL,
+                   sourceTs INTEGER,
+                   indexLevel INTEGER,
+                   critParam TEXT,
+                   so2Level INTEGER,
+                   no2Level INTEGER,
+                   coLevel INTEGER,
+                   pm10Level INTEGER,
+                   pm25Level INTEGER,
+                   o3Level INTEGER,
+                   c6h6Level INTEGER,
+                   PRIMARY KEY(stationId, calcTs)) WITHOUT ROWID'''
+
 def create_tables(conn):
+    """
+    Create the tables, upgrading an existing database to the current schema version.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+    """
     try:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS stations (
-                     id INTEGER PRIMARY KEY,
-                     stationName TEXT,
-                     city TEXT,
-                     longitude REAL,
-                     latitude REAL)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS sensors (
-                     id INTEGER PRIMARY KEY,
-                     stationId INTEGER,
-                     paramName TEXT,
-                     FOREIGN KEY(stationId) REFERENCES stations(id))''')
-        c.execute('''CREATE TABLE IF NOT EXISTS measurements (
-                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                     sensorId INTEGER,
-                     stationId INTEGER,
-                     paramName TEXT,
-                     stationName TEXT,
-                     value REAL,
-                     date TEXT,
-                     historical_value REAL,
-                     historical_value_date TEXT,
-                     UNIQUE(sensorId, date),
-                     FOREIGN KEY(sensorId) REFERENCES sensors(id),
-                     FOREIGN KEY(stationId) REFERENCES stations(id))''')
-        conn.commit()
+        migrate(conn)
     except sqlite3.Error as e:
         logger.error(f"Error creating tables: {e}")
 
+@contextlib.contextmanager
+def _transaction(conn):
+    # Explicit BEGIN so DDL is part of the transaction too; sqlite3 only opens one implicitly for DML
+    if conn.in_transaction:
+        conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+def get_schema_version(conn):
+    """
+    Return the schema version recorded in the database header.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+
+    Returns:
+        int: The value of PRAGMA user_version; 0 for a new or pre-versioning database.
+    """
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn, target=None, chunk_size=MIGRATION_CHUNK_SIZE):
+    """
+    Apply the pending upgrade steps in MIGRATIONS in order.
+
+    Each step runs in one transaction together with the PRAGMA user_version update, so a failing step
+    leaves the database at the previous version. Steps that rebuild large tables do the bulk copy in an
+    optional prepare function first, which copies rows in short chunked transactions and records its
+    progress, so readers and writers are not locked out for long and an interrupted upgrade resumes.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        target (int, optional): Stop after this version; defaults to SCHEMA_VERSION.
+        chunk_size (int): Rows copied per transaction by chunked steps.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    target = SCHEMA_VERSION if target is None else target
+    version = get_schema_version(conn)
+    for step_version, description, step, prepare in MIGRATIONS:
+        if version < step_version <= target:
+            logger.info(f"Upgrading database schema to version {step_version}: {description}")
+            if prepare is not None:
+                prepare(conn, chunk_size)
+            with _transaction(conn):
+                step(conn)
+                conn.execute(f'PRAGMA user_version = {int(step_version)}')
+            version = step_version
+    return version
+
+def copy_in_chunks(conn, task, source_table, copy_sql, chunk_size=MIGRATION_CHUNK_SIZE):
+    """
+    Copy rows out of a rowid table in short transactions, resuming after the last copied chunk.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        task (str): Unique name under which progress is recorded.
+        source_table (str): The table being copied.
+        copy_sql (str): INSERT ... SELECT statement with two parameters, the exclusive lower and the
+                        inclusive upper rowid bound of the chunk.
+        chunk_size (int): Number of rowids per chunk.
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_migration_progress (
+                    task TEXT PRIMARY KEY,
+                    lastRowid INTEGER)''')
+    row = conn.execute('SELECT lastRowid FROM schema_migration_progress WHERE task = ?', (task,)).fetchone()
+    last_rowid = row[0] if row else 0
+    max_rowid = conn.execute(f'SELECT MAX(rowid) FROM {source_table}').fetchone()[0] or 0
+    while last_rowid < max_rowid:
+        upper = last_rowid + chunk_size
+        with _transaction(conn):
+            conn.execute(copy_sql, (last_rowid, upper))
+            conn.execute('''INSERT INTO schema_migration_progress (task, lastRowid) VALUES (?, ?)
+                            ON CONFLICT(task) DO UPDATE SET lastRowid = excluded.lastRowid''', (task, upper))
+        last_rowid = upper
+
+def _table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+
+def _upgrade_to_v1(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS stations (
+                    id INTEGER PRIMARY KEY,
+                    stationName TEXT,
+                    city TEXT,
+                    longitude REAL,
+                    latitude REAL)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS sensors (
+                    id INTEGER PRIMARY KEY,
+                    stationId INTEGER,
+                    paramName TEXT,
+                    FOREIGN KEY(stationId) REFERENCES stations(id))''')
+
+def _prepare_v2(conn, chunk_size):
+    """
+    Copy the original measurements layout into the compact (sensorId, ts, value) table.
+
+    The original table repeated station and parameter names on every row, kept the date as TEXT and
+    stored the previous reading in historical_value/historical_value_date columns. Names move to the
+    stations and sensors tables and historical readings become ordinary points of the series.
+    """
+    if 'date' in _table_columns(conn, 'measurements'):
+        with _transaction(conn):
+            conn.execute('ALTER TABLE measurements RENAME TO measurements_v1')
+    if _table_columns(conn, 'measurements_v1'):
+        with _transaction(conn):
+            conn.execute(MEASUREMENTS_DDL)
+            conn.execute('''INSERT OR IGNORE INTO stations (id, stationName)
+                            SELECT stationId, MAX(stationName) FROM measurements_v1
+                            WHERE stationId IS NOT NULL GROUP BY stationId''')
+            conn.execute('''INSERT OR IGNORE INTO sensors (id, stationId, paramName)
+                            SELECT sensorId, MAX(stationId), MAX(paramName) FROM measurements_v1
+                            WHERE sensorId IS NOT NULL GROUP BY sensorId''')
+        copy_in_chunks(conn, 'v2_current_values', 'measurements_v1', '''
+            INSERT OR REPLACE INTO measurements (sensorId, ts, value)
+            SELECT sensorId, CAST(strftime('%s', date) AS INTEGER), value FROM measurements_v1
+            WHERE rowid > ? AND rowid <= ?
+              AND sensorId IS NOT NULL AND value IS NOT NULL AND strftime('%s', date) IS NOT NULL''', chunk_size)
+        # A current reading for the same hour takes precedence over a historical one
+        copy_in_chunks(conn, 'v2_historical_values', 'measurements_v1', '''
+            INSERT OR IGNORE INTO measurements (sensorId, ts, value)
+            SELECT sensorId, CAST(strftime('%s', historical_value_date) AS INTEGER), historical_value
+            FROM measurements_v1
+            WHERE rowid > ? AND rowid <= ?
+              AND sensorId IS NOT NULL AND historical_value IS NOT NULL
+              AND strftime('%s', historical_value_date) IS NOT NULL''', chunk_size)
+
+def _upgrade_to_v2(conn):
+    conn.execute('DROP TABLE IF EXISTS measurements_v1')
+    conn.execute('DROP TABLE IF EXISTS schema_migration_progress')
+    conn.execute(MEASUREMENTS_DDL)
+    if 'lastDate' in _table_columns(conn, 'sensor_watermarks'):
+        conn.execute('DROP TABLE sensor_watermarks')
+    conn.execute('''CREATE TABLE IF NOT EXISTS sensor_watermarks (
+                    sensorId INTEGER PRIMARY KEY,
+                    lastTs INTEGER,
+                    FOREIGN KEY(sensorId) REFERENCES sensors(id))''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sensors_station ON sensors(stationId)')
+    conn.execute('''INSERT OR IGNORE INTO sensor_watermarks (sensorId, lastTs)
+                    SELECT sensorId, MAX(ts) FROM measurements GROUP BY sensorId''')
+
+def _upgrade_to_v3(conn):
+    conn.execute(AGGREGATES_DDL)
+    rebuild_aggregates(conn)
+
+def _upgrade_to_v4(conn):
+    conn.execute(AQ_INDEX_DDL)
+
+# Ordered upgrade steps: (version, description, step(conn), prepare(conn, chunk_size) or None).
+# Steps must be idempotent, as databases created before versioning start at version 0. Append new steps at the end.
+MIGRATIONS = [
+    (1, 'stations and sensors tables', _upgrade_to_v1, None),
+    (2, 'compact measurements table with epoch timestamps', _upgrade_to_v2, _prepare_v2),
+    (3, 'hour/day/month measurement aggregates', _upgrade_to_v3, None),
+    (4, 'air quality index table', _upgrade_to_v4, None),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def _station_row(station):
+    return (station['id'], station['stationName'], station['city']['name'], station['gegrLon'], station['gegrLat'])
+
+def _sensor_row(sensor):
+    return (sensor['id'], sensor['stationId'], sensor['param']['paramName'])
+
+def _measurement_point(sensor_id, date, value):
+    try:
+        return (sensor_id, to_epoch(date), float(value))
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Skipping malformed value {value!r} at {date!r} for sensor {sensor_id}: {e}")
+        return None
+
+def _measurement_rows(sensor_id, measurement_data, station, sensor):
+    rows = getattr(measurement_data, 'rows', None)
+    if rows is not None:
+        # A MeasurementSeries from get_measurement_data already holds converted timestamps and values
+        yield from rows(sensor_id)
+        return
+    debug = logger.isEnabledFor(logging.DEBUG)
+    for value in measurement_data.get('values') or []:
+        if value.get('value') is not None:
+            if debug:
+                logger.debug(f"Inserting value: {value['value']} at {value.get('date')} for station {station['id']}, sensor {sensor_id}")
+            points = [_measurement_point(sensor_id, value.get('date'), value['value'])]
+            if value.get('historical_value') is not None and value.get('historical_value_date'):
+                points.insert(0, _measurement_point(sensor_id, value['historical_value_date'], value['historical_value']))
+            yield from (point for point in points if point is not None)
+
+INSERT_STATION_SQL = '''INSERT OR IGNORE INTO stations (id, stationName, city, longitude, latitude)
+                         VALUES (?, ?, ?, ?, ?)'''
+INSERT_SENSOR_SQL = '''INSERT OR IGNORE INTO sensors (id, stationId, paramName)
+                        VALUES (?, ?, ?)'''
+INSERT_MEASUREMENT_SQL = '''INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)'''
+# Rewrites a stored point only when its value changed
+UPSERT_MEASUREMENT_SQL = '''INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)
+                             ON CONFLICT(sensorId, ts) DO UPDATE SET value = excluded.value
+                             WHERE value IS NOT excluded.value'''
+UPDATE_WATERMARK_SQL = '''INSERT INTO sensor_watermarks (sensorId, lastTs) VALUES (?, ?)
+                          ON CONFLICT(sensorId) DO UPDATE SET lastTs = MAX(lastTs, excluded.lastTs)'''
+
+def get_watermarks(conn, sensor_ids=None):
+    """
+    Return the timestamp of the newest stored measurement per sensor.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        sensor_ids (iterable, optional): Restrict the result to these sensors.
+
+    Returns:
+        dict: A mapping of sensor ID to its high-water mark in seconds since the epoch.
+    """
+    if sensor_ids is None:
+        return dict(conn.execute('SELECT sensorId, lastTs FROM sensor_watermarks').fetchall())
+    sensor_ids = list(sensor_ids)
+    placeholders = ', '.join('?' * len(sensor_ids))
+    return dict(conn.execute(f'SELECT sensorId, lastTs FROM sensor_watermarks WHERE sensorId IN ({placeholders})',
+                             sensor_ids).fetchall())
+
+def _stored_values(conn, sensor_id, first_ts, last_ts):
+    return dict(conn.execute('SELECT ts, value FROM measurements WHERE sensorId = ? AND ts BETWEEN ? AND ?',
+                             (sensor_id, first_ts, last_ts)))
+
+def _upsert_measurement_rows(conn, rows):
+    """
+    Write (sensorId, ts, value) rows inside the caller's transaction, touching only new or changed points.
+
+    Rows newer than their sensor's high-water mark cannot be stored yet and go through a plain INSERT.
+    Older rows are looked up in the primary key: missing ones (gaps being backfilled) are inserted too,
+    changed ones go through the conditional upsert and unchanged ones are skipped. The high-water
+    marks are advanced and the aggregate buckets of the written points are refreshed.
+
+    Returns:
+        dict: Counts of 'inserted', 'updated' and 'skipped' rows.
+    """
+    # The last value for a (sensorId, ts) pair wins, so the plain INSERT never sees a duplicate key
+    rows = list({(sensor_id, ts): (sensor_id, ts, value) for sensor_id, ts, value in rows}.values())
+    watermarks = get_watermarks(conn, {row[0] for row in rows}) if rows else {}
+    new_rows, known_rows = [], collections.defaultdict(list)
+    for row in rows:
+        watermark = watermarks.get(row[0])
+        if watermark is None or row[1] > watermark:
+            new_rows.append(row)
+        else:
+            known_rows[row[0]].append(row)
+
+    changed_rows, skipped = [], 0
+    for sensor_id, sensor_rows in known_rows.items():
+        stored = _stored_values(conn, sensor_id, min(row[1] for row in sensor_rows), max(row[1] for row in sensor_rows))
+        for row in sensor_rows:
+            if row[1] not in stored:
+                new_rows.append(row)
+            elif stored[row[1]] != row[2]:
+                changed_rows.append(row)
+            else:
+                skipped += 1
+
+    if new_rows:
+        conn.executemany(INSERT_MEASUREMENT_SQL, new_rows)
+    if changed_rows:
+        conn.executemany(UPSERT_MEASUREMENT_SQL, changed_rows)
+    latest, spans = {}, {}
+    for sensor_id, ts, _ in new_rows:
+        latest[sensor_id] = max(latest.get(sensor_id, ts), ts)
+    if latest:
+        conn.executemany(UPDATE_WATERMARK_SQL, latest.items())
+    for sensor_id, ts, _ in new_rows + changed_rows:
+        first, last = spans.get(sensor_id, (ts, ts))
+        spans[sensor_id] = (min(first, ts), max(last, ts))
+    for sensor_id, (first, last) in spans.items():
+        refresh_aggregates(conn, sensor_id, first, last)
+    return {'inserted': len(new_rows), 'updated': len(changed_rows), 'skipped': skipped}
+
 def insert_station(conn, station):
     try:
         c = conn.cursor()
-        logger.info(f"Inserting station: {station}")
-        c.execute('''INSERT OR IGNORE INTO stations (id, stationName, city, longitude, latitude)
-                     VALUES (?, ?, ?, ?, ?)''',
-                  (station['id'], station['stationName'], station['city']['name'],
-                   station['gegrLon'], station['gegrLat']))
+        logger.debug(f"Inserting station: {station}")
+        c.execute(INSERT_STATION_SQL, _station_row(station))
         conn.commit()
     except sqlite3.Error as e:
         logger.error(f"Error inserting station: {e}")
@@ -51,36 +369,64 @@ def insert_station(conn, station):
 def insert_sensor(conn, sensor):
     try:
         c = conn.cursor()
-        logger.info(f"Inserting sensor: {sensor}")
-        c.execute('''INSERT OR IGNORE INTO sensors (id, stationId, paramName)
-                     VALUES (?, ?, ?)''',
-                  (sensor['id'], sensor['stationId'], sensor['param']['paramName']))
+        logger.debug(f"Inserting sensor: {sensor}")
+        c.execute(INSERT_SENSOR_SQL, _sensor_row(sensor))
         conn.commit()
     except sqlite3.Error as e:
         logger.error(f"Error inserting sensor: {e}")
 
 def insert_measurement(conn, sensor_id, measurement_data, station, sensor):
     try:
-        c = conn.cursor()
-        logger.info(f"Inserting measurement for sensor_id {sensor_id}: {measurement_data}")
-        for value in measurement_data['values']:
-            logger.info(f"Processing value: {value}")
-            if value['value'] is not None:
-                logger.info(f"Inserting value: {value['value']} at {value['date']} for station {station['id']}, sensor {sensor_id}")
-                historical_value = value.get('historical_value')
-                historical_value_date = value.get('historical_value_date')
-                c.execute('''INSERT OR REPLACE INTO measurements (sensorId, stationId, paramName, stationName, value, date, historical_value, historical_value_date)
-                             VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                          (sensor_id, station['id'], sensor['param']['paramName'], station['stationName'],
-                           value['value'], value['date'], historical_value, historical_value_date))
-        conn.commit()
+        logger.debug(f"Inserting measurement for sensor_id {sensor_id}: {measurement_data}")
+        with conn:
+            counts = _upsert_measurement_rows(conn, _measurement_rows(sensor_id, measurement_data, station, sensor))
+        logger.debug(f"Measurement upsert for sensor_id {sensor_id}: {counts}")
+        return counts
     except sqlite3.Error as e:
         logger.error(f"Error inserting measurement: {e}")
 
+def insert_bulk(conn, stations=(), sensors=(), series=()):
+    """
+    Insert many stations, sensors and measurement series in a single transaction.
+
+    Args:
+        conn (sqlite3.Connection): The database connection.
+        stations (iterable): Station dictionaries as returned by get_station_list.
+        sensors (iterable): Sensor dictionaries as returned by get_sensors_for_station.
+        series (iterable): (station, sensor, measurement_data) tuples, measurement_data as returned by
+                           get_measurement_data. Their stations and sensors are inserted as well.
+
+    Returns:
+        dict: Counts of measurement rows 'inserted', 'updated' and 'skipped' (already stored unchanged),
+              or None if the transaction was rolled back.
+    """
+    try:
+        series = list(series)
+        station_rows = {row[0]: row for row in map(_station_row, stations)}
+        sensor_rows = {row[0]: row for row in map(_sensor_row, sensors)}
+        for station, sensor, _ in series:
+            station_rows.setdefault(station['id'], _station_row(station))
+            sensor_rows.setdefault(sensor['id'], _sensor_row(sensor))
+        measurement_rows = [row for station, sensor, measurement_data in series
+                            for row in _measurement_rows(sensor['id'], measurement_data, station, sensor)]
+        with conn:
+            conn.executemany(INSERT_STATION_SQL, station_rows.values())
+            conn.executemany(INSERT_SENSOR_SQL, sensor_rows.values())
+            counts = _upsert_measurement_rows(conn, measurement_rows)
+        logger.info(f"Bulk ingested {len(station_rows)} stations, {len(sensor_rows)} sensors "
+                    f"and measurements {counts}")
+        return counts
+    except (sqlite3.Error, KeyError, TypeError, ValueError) as e:
+        logger.error(f"Error in bulk insert: {e}")
+        return None
+
 def clear_data(conn):
     try:
         c = conn.cursor()
         c.execute('DELETE FROM measurements')
+        c.execute('DELETE FROM sensor_watermarks')
+        c.execute('DELETE FROM measurement_aggregates')
+        c.execute('DELETE FROM aq_index')
         c.execute('DELETE FROM sensors')
         c.execute('DELETE FROM stations')
         conn.commit()
@@ -0,0 +1,84 @@
+import numpy as np
+
+
+def lttb(x, y, threshold):
+    """
+    Downsample a series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The first and last points are kept; from every bucket in between the point forming the largest
+    triangle with the previously kept point and the mean of the next bucket is kept, which preserves
+    peaks and the visual shape of the line.
+
+    Args:
+        x (array-like): Increasing x coordinates, e.g. matplotlib date numbers.
+        y (array-like): The values.
+        threshold (int): Number of points to keep.
+
+    Returns:
+        tuple: The downsampled (x, y) arrays; the input itself if it has no more than threshold points.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_start, next_end = end, edges[bucket + 2] if bucket + 2 < len(edges) else n
+        mean_x, mean_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[previous] - mean_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (mean_y - y[previous]))
+        previous = start + int(area.argmax())
+        kept[bucket + 1] = previous
+    return x[kept], y[kept]
+
+
+def minmax(x, y, buckets):
+    """
+    Downsample a series by keeping the minimum and maximum of each of a number of equal-count buckets.
+
+    Args:
+        x (array-like): Increasing x coordinates.
+        y (array-like): The values.
+        buckets (int): Number of buckets; at most two points are kept per bucket.
+
+    Returns:
+        tuple: The downsampled (x, y) arrays in x order; the input itself if it is already small enough.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if 2 * buckets >= n or buckets < 1:
+        return x, y
+    starts = np.linspace(0, n, buckets + 1).astype(np.int64)[:-1]
+    group = np.repeat(np.arange(buckets), np.diff(np.r_[starts, n]))
+    # Sorting by (bucket, value) puts each bucket's minimum first and maximum last
+    order = np.lexsort((y, group))
+    ends = np.r_[starts[1:], n] - 1
+    kept = np.unique(np.concatenate([order[starts], order[ends]]))
+    return x[kept], y[kept]
+
+
+def downsample(x, y, width, method='lttb'):
+    """
+    Reduce a series to about one point per horizontal pixel.
+
+    Args:
+        x (array-like): Increasing x coordinates.
+        y (array-like): The values.
+        width (int): Width of the plot area in pixels.
+        method (str): 'lttb' or 'minmax'.
+
+    Returns:
+        tuple: The downsampled (x, y) arrays.
+    """
+    if method == 'lttb':
+        return lttb(x, y, max(3, int(width)))
+    if method == 'minmax':
+        return minmax(x, y, max(1, int(width) // 2))
+    raise ValueError(f"Unknown downsampling method: {method}")
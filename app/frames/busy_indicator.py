@@ -0,0 +1,64 @@
+import tkinter as tk
+from tkinter import ttk
+
+
+class BusyIndicator(ttk.Frame):
+    """
+    A progress bar with a status text and a Cancel button, visible while a background task runs.
+    The frame itself stays in its parent's layout; only its contents are shown and hidden.
+    """
+    def __init__(self, parent):
+        super().__init__(parent)
+        self._on_cancel = None
+        self._token = 0
+        self.status_label = ttk.Label(self, text="")
+        self.progress_bar = ttk.Progressbar(self, mode='indeterminate', length=200)
+        self.cancel_button = ttk.Button(self, text="Cancel", command=self.cancel)
+        self._widgets = (self.status_label, self.progress_bar, self.cancel_button)
+
+    def start(self, message, on_cancel=None):
+        """
+        Show the indicator.
+
+        Args:
+            message (str): What is being done, e.g. "Downloading sensors...".
+            on_cancel (callable, optional): Called when the user presses Cancel.
+
+        Returns:
+            int: A token for stop(), so a superseded task cannot hide the indicator of its successor.
+        """
+        self._token += 1
+        self._on_cancel = on_cancel
+        self.status_label.config(text=message)
+        self.progress_bar.config(mode='indeterminate', value=0)
+        self.progress_bar.start(15)
+        self.cancel_button.state(['!disabled'] if on_cancel else ['disabled'])
+        for column, widget in enumerate(self._widgets):
+            widget.grid(row=0, column=column, padx=5, sticky=tk.W)
+        return self._token
+
+    def progress(self, done, total=None, message=None):
+        """
+        Switch to determinate progress once the number of steps is known.
+        """
+        if total:
+            self.progress_bar.stop()
+            self.progress_bar.config(mode='determinate', maximum=total, value=done)
+        if message:
+            self.status_label.config(text=message)
+
+    def stop(self, token=None):
+        """
+        Hide the indicator, unless another task started it again since token was issued.
+        """
+        if token is not None and token != self._token:
+            return
+        self.progress_bar.stop()
+        self._on_cancel = None
+        for widget in self._widgets:
+            widget.grid_remove()
+
+    def cancel(self):
+        if self._on_cancel is not None:
+            self._on_cancel()
+        self.stop()
@@ -1,9 +1,11 @@
 import tkinter as tk
 from tkinter import ttk
-from tkinter import Label, Button
-import sqlite3
+from tkinter import Label, Button, messagebox
 import os
 import logging
+from app.aggregates import bucket_starts, time_span
+from app.connection_manager import get_manager
+from app.frames.date_range_picker import DateRangePicker
 
 # Initialize the logger
 logging.basicConfig(level=logging.INFO)
@@ -29,13 +31,10 @@ class DataAnalysisFrame(ttk.Frame):
         self.sensor_combobox.grid(row=2, column=1, padx=10, pady=10)
         self.sensor_combobox.bind("<<ComboboxSelected>>", self.on_sensor_selected)
 
-        Label(self, text="Start Date:").grid(row=3, column=0, padx=10, pady=10)
-        self.start_date_combobox = ttk.Combobox(self, state='readonly', width=50)
-        self.start_date_combobox.grid(row=3, column=1, padx=10, pady=10)
-
-        Label(self, text="End Date:").grid(row=4, column=0, padx=10, pady=10)
-        self.end_date_combobox = ttk.Combobox(self, state='readonly', width=50)
-        self.end_date_combobox.grid(row=4, column=1, padx=10, pady=10)
+        Label(self, text="Date Range:").grid(row=3, column=0, padx=10, pady=10, sticky=tk.N)
+        self.date_range_sensor_id = None
+        self.date_range_picker = DateRangePicker(self, self.load_buckets)
+        self.date_range_picker.grid(row=3, column=1, rowspan=2, padx=10, pady=10, sticky=tk.W)
 
         analyze_button = Button(self, text="Analyze Data", command=self.controller.analyze_data)
         analyze_button.grid(row=5, column=0, padx=10, pady=10)
@@ -43,6 +42,31 @@ class DataAnalysisFrame(ttk.Frame):
         plot_button = Button(self, text="Plot Data", command=self.controller.plot_data)
         plot_button.grid(row=5, column=1, padx=10, pady=10)
 
+        compare_button = Button(self, text="Compare City", command=self.controller.compare_data)
+        compare_button.grid(row=5, column=1, padx=10, pady=10, sticky=tk.E)
+
+        # The figure is created on the first plot, so matplotlib is not loaded at startup
+        self.series_plot = None
+        self.rowconfigure(6, weight=1)
+        self.columnconfigure(1, weight=1)
+
+    def create_plot(self):
+        """
+        Create the embedded figure, its canvas and toolbar; the figure lives as long as the frame and
+        plotting updates its artists instead of opening windows.
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from app.data_analyzer import SeriesPlot
+
+        self.figure = Figure(figsize=(8, 4), dpi=100)
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.series_plot = SeriesPlot(self.figure, self.controller.db_path)
+        self.canvas.get_tk_widget().grid(row=6, column=0, columnspan=2, padx=10, pady=5, sticky='nsew')
+        toolbar_frame = ttk.Frame(self)
+        toolbar_frame.grid(row=7, column=0, columnspan=2, sticky=tk.W)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, toolbar_frame)
+
     def on_station_selected(self, event):
         self.clear_sensor_and_date_comboboxes()
         station_id = self.station_combobox.get().split(" - ")[0]
@@ -61,45 +85,113 @@ class DataAnalysisFrame(ttk.Frame):
         self.sensor_combobox['values'] = sensor_names
 
     def update_date_range(self, sensor_id):
+        """
+        Show the selected sensor's history in the date range picker.
+
+        The span and the month list come from the primary key and the aggregates table; days and hours are
+        looked up when the picker opens a month or day, so this costs the same for a week or a decade of data.
+        """
         db_path = self.controller.db_path
         logger.info(f"Database path in DataAnalysisFrame: {db_path}")
         if not os.path.exists(db_path):
             raise FileNotFoundError(f"Database file not found at {db_path}")
 
-        conn = sqlite3.connect(db_path)
-        query = f'''
-        SELECT date FROM measurements WHERE sensorId = {sensor_id}
-        UNION
-        SELECT historical_value_date AS date FROM measurements WHERE sensorId = {sensor_id}
-        ORDER BY date
-        '''
-        dates = conn.execute(query).fetchall()
-        conn.close()
-
-        date_list = [date[0] for date in dates if date[0] is not None]
-        self.start_date_combobox['values'] = date_list
-        self.end_date_combobox['values'] = date_list
+        self.date_range_sensor_id = int(sensor_id)
+        with get_manager(db_path).reader() as conn:
+            span = time_span(conn, self.date_range_sensor_id)
+            months = bucket_starts(conn, self.date_range_sensor_id, 'month') if span else []
+        self.date_range_picker.set_span(span, months)
+
+    def load_buckets(self, grain, start_ts, end_ts):
+        with get_manager(self.controller.db_path).reader() as conn:
+            return bucket_starts(conn, self.date_range_sensor_id, grain, start_ts, end_ts)
+
+    def show_plot(self, sensor_id, start_date=None, end_date=None):
+        """
+        Plot a sensor's values in the embedded canvas.
+
+        Reading and analysing the series runs in a worker thread; only updating the artists and drawing
+        happen on the Tk thread.
+
+        Args:
+            sensor_id (int): The ID of the sensor.
+            start_date (str, optional): Only plot values at or after this date.
+            end_date (str, optional): Only plot values at or before this date.
+        """
+        # Imported on the Tk thread before the worker starts, which then finds the modules loaded
+        from app.data_analyzer import read_data, analyze_data, plot_title
+
+        if self.series_plot is None:
+            self.create_plot()
+        db_path = self.controller.db_path
 
-        if date_list:
-            self.start_date_combobox.set(date_list[0])
-            self.end_date_combobox.set(date_list[-1])
+        def load():
+            df = read_data(db_path, sensor_id, start_date or None, end_date or None)
+            return df, analyze_data(df), plot_title(db_path, sensor_id)
+
+        def show(result):
+            df, analysis, title = result
+            self.series_plot.update(df, analysis, title, int(sensor_id))
+
+        def failed(error):
+            logger.error(f"Error plotting data: {error}")
+            messagebox.showerror("Error", str(error))
+
+        self.controller.tasks.submit(load, name='plot-loader', key='plot', on_success=show, on_error=failed)
+
+    def show_comparison(self, result):
+        """
+        Open a window with the overlaid series of compared sensors and their statistics side by side.
+
+        Args:
+            result (dict): The result of comparison.compare_sensors.
+        """
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+        from app.comparison import plot_comparison
+
+        if result['stats'].empty:
+            messagebox.showinfo("No Data", "No data found for the compared sensors.")
+            return
+        window = tk.Toplevel(self)
+        window.title("Sensor Comparison")
+        small_multiples = tk.BooleanVar(value=False)
+        figure = Figure(figsize=(9, 5), dpi=100)
+        canvas = FigureCanvasTkAgg(figure, master=window)
+
+        def redraw():
+            plot_comparison(figure, result['wide'], result['labels'], small_multiples.get())
+            canvas.draw_idle()
+
+        ttk.Checkbutton(window, text="One panel per sensor", variable=small_multiples,
+                        command=redraw).pack(anchor=tk.W, padx=10)
+        canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10)
+        NavigationToolbar2Tk(canvas, window)
+
+        columns = ('label', 'count', 'mean_value', 'max_value', 'exceedances', 'trend')
+        table = ttk.Treeview(window, columns=columns, show='headings', height=min(len(result['stats']), 10))
+        for column, heading in zip(columns, ("Sensor", "Values", "Mean", "Maximum", "Above Norm", "Trend")):
+            table.heading(column, text=heading)
+            table.column(column, width=260 if column == 'label' else 90, anchor=tk.W)
+        for _, row in result['stats'].iterrows():
+            table.insert('', tk.END, values=(row['label'], row['count'], f"{row['mean_value']:.2f}",
+                                             f"{row['max_value']:.2f}", row['exceedances'], row['trend']))
+        table.pack(fill=tk.X, padx=10, pady=10)
+        redraw()
 
     def get_selected_sensor_id(self):
         return self.sensor_combobox.get().split(" - ")[0]
 
     def get_start_date(self):
-        return self.start_date_combobox.get()
+        return self.date_range_picker.get_start()
 
     def get_end_date(self):
-        return self.end_date_combobox.get()
+        return self.date_range_picker.get_end()
 
     def clear_sensor_and_date_comboboxes(self):
         self.sensor_combobox.set('')
         self.sensor_combobox['values'] = []
-        self.start_date_combobox.set('')
-        self.start_date_combobox['values'] = []
-        self.end_date_combobox.set('')
-        self.end_date_combobox['values'] = []
+        self.date_range_picker.clear()
 
     def clear_station_combobox(self):
         self.station_combobox.set('')
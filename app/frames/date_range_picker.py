@@ -0,0 +1,167 @@
+import bisect
+import tkinter as tk
+from tkinter import ttk
+from datetime import datetime, timezone
+from app.db_manager import from_epoch
+
+GRAIN_SECONDS = {'hour': 3600, 'day': 86400}
+
+
+def _month_end(ts):
+    # First second of the following month
+    date = datetime.fromtimestamp(ts, timezone.utc)
+    year, month = (date.year + 1, 1) if date.month == 12 else (date.year, date.month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+
+class DateTimePicker(ttk.Frame):
+    """
+    Picks an hour of a sensor's history as three comboboxes: month, day and hour.
+
+    Only the list of months is loaded up front; the days of a month and the hours of a day are looked up
+    when that month or day is selected, so a long history never fills a widget with every timestamp.
+    """
+    def __init__(self, parent, load_buckets, prefer_last=False):
+        """
+        Initialize the picker.
+
+        Args:
+            parent (tk.Widget): The parent widget.
+            load_buckets (callable): load_buckets(grain, start_ts, end_ts) returns the start timestamps of the
+                hour, day or month buckets that hold values in [start_ts, end_ts).
+            prefer_last (bool): Select the last day and hour of a month instead of the first, for range ends.
+        """
+        super().__init__(parent)
+        self.load_buckets = load_buckets
+        self.prefer_last = prefer_last
+        self._buckets = {'month': [], 'day': [], 'hour': []}
+        self._comboboxes = {}
+        for column, (grain, width) in enumerate((('month', 8), ('day', 4), ('hour', 6))):
+            combobox = ttk.Combobox(self, state='readonly', width=width)
+            combobox.grid(row=0, column=column, padx=(0, 5))
+            combobox.bind("<<ComboboxSelected>>", lambda event, grain=grain: self._on_selected(grain))
+            self._comboboxes[grain] = combobox
+
+    def set_months(self, months, ts=None):
+        """
+        Offer a new list of months and select the hour containing ts, or the first/last available hour.
+
+        Args:
+            months (list): Start timestamps of the months that hold values.
+            ts (int, optional): The timestamp to select.
+        """
+        self._fill('month', months)
+        if months:
+            self.set(ts if ts is not None else (months[-1] if self.prefer_last else months[0]))
+
+    def set(self, ts):
+        """
+        Select the available hour containing ts, or the nearest one in its month and day.
+
+        Args:
+            ts (int): Seconds since the epoch.
+        """
+        for grain in ('month', 'day', 'hour'):
+            buckets = self._buckets[grain]
+            if not buckets:
+                return
+            self._select(grain, max(bisect.bisect_right(buckets, ts) - 1, 0))
+
+    def get(self):
+        """
+        Return the selected hour.
+
+        Returns:
+            str: The hour as 'YYYY-MM-DD HH:MM:SS', or '' if nothing is selected.
+        """
+        index = self._comboboxes['hour'].current()
+        if index < 0:
+            return ''
+        return from_epoch(self._buckets['hour'][index])
+
+    def clear(self):
+        for grain in self._comboboxes:
+            self._fill(grain, [])
+
+    def _fill(self, grain, buckets):
+        self._buckets[grain] = buckets
+        labels = {'month': '%Y-%m', 'day': '%d', 'hour': '%H:00'}[grain]
+        combobox = self._comboboxes[grain]
+        combobox['values'] = [datetime.fromtimestamp(ts, timezone.utc).strftime(labels) for ts in buckets]
+        combobox.set('')
+
+    def _select(self, grain, index):
+        self._comboboxes[grain].current(index)
+        self._load_below(grain)
+
+    def _on_selected(self, grain):
+        self._load_below(grain)
+        finer = {'month': 'day', 'day': 'hour'}.get(grain)
+        if finer and self._buckets[finer]:
+            self._select(finer, len(self._buckets[finer]) - 1 if self.prefer_last else 0)
+
+    def _load_below(self, grain):
+        # Page in the days of the selected month or the hours of the selected day
+        finer = {'month': 'day', 'day': 'hour'}.get(grain)
+        if finer is None:
+            return
+        start = self._buckets[grain][self._comboboxes[grain].current()]
+        end = _month_end(start) if grain == 'month' else start + GRAIN_SECONDS[grain]
+        self._fill(finer, self.load_buckets(finer, start, end))
+        if finer == 'day':
+            self._fill('hour', [])
+
+
+class DateRangePicker(ttk.Frame):
+    """
+    A start and an end DateTimePicker with a summary of the sensor's history.
+    """
+    def __init__(self, parent, load_buckets):
+        """
+        Initialize the range picker.
+
+        Args:
+            parent (tk.Widget): The parent widget.
+            load_buckets (callable): See DateTimePicker.
+        """
+        super().__init__(parent)
+        ttk.Label(self, text="From:").grid(row=0, column=0, sticky=tk.W)
+        self.start_picker = DateTimePicker(self, load_buckets)
+        self.start_picker.grid(row=0, column=1, sticky=tk.W, pady=2)
+        ttk.Label(self, text="To:").grid(row=1, column=0, sticky=tk.W)
+        self.end_picker = DateTimePicker(self, load_buckets, prefer_last=True)
+        self.end_picker.grid(row=1, column=1, sticky=tk.W, pady=2)
+        self.summary_label = ttk.Label(self, text="")
+        self.summary_label.grid(row=2, column=0, columnspan=2, sticky=tk.W)
+
+    def set_span(self, span, months):
+        """
+        Show a sensor's history and select all of it.
+
+        Args:
+            span (dict): 'first_ts', 'last_ts' and 'count' as returned by aggregates.time_span, or None.
+            months (list): Start timestamps of the months that hold values.
+        """
+        if span is None:
+            self.clear()
+            self.summary_label.config(text="No measurements for this sensor")
+            return
+        self.start_picker.set_months(months, span['first_ts'])
+        self.end_picker.set_months(months, span['last_ts'])
+        self.summary_label.config(
+            text=f"{span['count']:,} values from {from_epoch(span['first_ts'])} to {from_epoch(span['last_ts'])}")
+
+    def get_start(self):
+        return self.start_picker.get()
+
+    def get_end(self):
+        """
+        Return the end of the selected last hour, so values within that hour are included.
+        """
+        start = self.end_picker.get()
+        return start[:14] + '59:59' if start else ''
+
+    def clear(self):
+        self.start_picker.clear()
+        self.end_picker.clear()
+        self.summary_label.config(text="")
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 import logging
+from app.frames.busy_indicator import BusyIndicator
 
 # Initialize the logger
 logging.basicConfig(level=logging.INFO)
@@ -43,6 +44,9 @@ class SensorFrame(ttk.Frame):
         self.save_data_button.grid(row=0, column=1, padx=5, pady=5, sticky=tk.E)
         self.save_data_button.grid_remove()  # Hide initially
 
+        self.busy_indicator = BusyIndicator(self)
+        self.busy_indicator.grid(row=7, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
     def populate_sensors(self, sensors):
         self.sensor_listbox.delete(0, tk.END)
         self.sensors = sensors
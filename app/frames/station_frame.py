@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 import logging
+from app.frames.busy_indicator import BusyIndicator
 
 logger = logging.getLogger(__name__)
 
@@ -24,11 +25,17 @@ class StationFrame(ttk.Frame):
         back_button = ttk.Button(self, text="Back", command=self.go_back)
         back_button.grid(row=6, column=0, padx=10, pady=5, sticky=tk.W)
 
+        self.busy_indicator = BusyIndicator(self)
+        self.busy_indicator.grid(row=7, column=0, padx=10, pady=5, sticky=tk.W)
+
     def populate_stations(self, stations):
         self.station_listbox.delete(0, tk.END)
         self.stations = stations
         for station in stations:
-            self.station_listbox.insert(tk.END, f"{station['id']} - {station['stationName']}")
+            label = f"{station['id']} - {station['stationName']}"
+            if 'distance_km' in station:
+                label += f" ({station['distance_km']:.1f} km)"
+            self.station_listbox.insert(tk.END, label)
 
     def on_station_select(self):
         selected_index = self.station_listbox.curselection()
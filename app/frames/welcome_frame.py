@@ -1,21 +1,31 @@
+import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from app.frames.busy_indicator import BusyIndicator
+
+SUGGESTION_DELAY_MS = 120  # Wait for a pause in typing before querying the search index
 
 class WelcomeFrame(ttk.Frame):
     def __init__(self, parent, controller):
         super().__init__(parent)
         self.controller = controller
+        self._suggest_job = None
         self.create_widgets()
 
     def create_widgets(self):
         welcome_label = ttk.Label(self, text="Welcome to the Air Quality Monitoring App!", font=("Helvetica", 16))
         welcome_label.pack(padx=10, pady=10)
 
-        city_label = ttk.Label(self, text="Enter a city to look up measurement station:")
+        city_label = ttk.Label(self, text="Enter a city, or latitude, longitude, to look up measurement stations:")
         city_label.pack(padx=10, pady=5)
 
         self.city_entry = ttk.Entry(self, width=30)
         self.city_entry.pack(padx=10, pady=5)
+        self.city_entry.bind("<KeyRelease>", self.on_city_typed)
+        self.city_entry.bind("<Return>", lambda event: self.lookup_city())
+
+        self.suggestion_listbox = tk.Listbox(self, width=30, height=5)
+        self.suggestion_listbox.bind("<<ListboxSelect>>", self.on_suggestion_selected)
 
         lookup_button = ttk.Button(self, text="Look Up", command=self.lookup_city)
         lookup_button.pack(padx=10, pady=10)
@@ -26,6 +36,34 @@ class WelcomeFrame(ttk.Frame):
         analyze_data_button = ttk.Button(self, text="Analyze Data", command=self.switch_to_data_analysis)
         analyze_data_button.pack(padx=10, pady=10)
 
+        self.busy_indicator = BusyIndicator(self)
+        self.busy_indicator.pack(padx=10, pady=5)
+
+    def on_city_typed(self, event):
+        if event.keysym in ("Return", "Up", "Down", "Left", "Right"):
+            return
+        if self._suggest_job is not None:
+            self.after_cancel(self._suggest_job)
+        self._suggest_job = self.after(SUGGESTION_DELAY_MS, self.update_suggestions)
+
+    def update_suggestions(self):
+        self._suggest_job = None
+        suggestions = self.controller.suggest_cities(self.city_entry.get().strip())
+        self.suggestion_listbox.delete(0, tk.END)
+        if not suggestions:
+            self.suggestion_listbox.pack_forget()
+            return
+        for name in suggestions:
+            self.suggestion_listbox.insert(tk.END, name)
+        self.suggestion_listbox.pack(padx=10, pady=0, after=self.city_entry)
+
+    def on_suggestion_selected(self, event):
+        selection = self.suggestion_listbox.curselection()
+        if selection:
+            self.city_entry.delete(0, tk.END)
+            self.city_entry.insert(0, self.suggestion_listbox.get(selection[0]))
+            self.suggestion_listbox.pack_forget()
+
     def lookup_city(self):
         city_name = self.city_entry.get().strip().lower()
         if not city_name:
@@ -0,0 +1,177 @@
+"""
+Headless harvester that periodically stores the complete measurement series of configured stations.
+
+Usage:
+    python -m app.harvester --city kraków --interval 3600
+    python -m app.harvester --station 400 --station 401 --param PM10 --once
+    python -m app.harvester --city kraków --aq-index
+"""
+import argparse
+import os
+import threading
+import time
+import logging
+from app.aq_index import store_indexes
+from app.bulk_fetcher import BulkFetcher, BulkFetchReport
+from app.connection_manager import get_manager
+from app.db_manager import create_tables, insert_bulk
+from app.station_catalog import StationCatalog
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'air_quality.db'))
+DEFAULT_INTERVAL = 60 * 60  # GIOŚ publishes hourly values
+BATCH_SIZE = 50  # Series per transaction; bounds memory while the fetch is still streaming
+
+
+def harvest_once(db, fetcher, stations, param_codes=None, sensor_ids=None, collect_index=False):
+    """
+    Fetch all values of the given stations' sensors and store the new or changed ones.
+
+    The API returns a sliding window of recent hours on every call, so most values of a run are
+    already stored; the upsert in db_manager skips those without rewriting them. The write connection
+    is taken per batch, so other writers in the process only wait for one transaction at a time.
+
+    Args:
+        db (ConnectionManager): The connection manager of the database.
+        fetcher (BulkFetcher): The bulk fetcher used for the network fan-out.
+        stations (list): Station dictionaries to harvest.
+        param_codes (iterable, optional): Only harvest sensors measuring these parameters.
+        sensor_ids (iterable, optional): Only harvest these sensors.
+        collect_index (bool): Also fetch the stations' current air quality index and store new calculations.
+
+    Returns:
+        dict: Counts of values 'inserted', 'updated' and 'skipped', plus the bulk fetch report under 'fetch'
+              and, with collect_index, the number of new index calculations under 'indexes'.
+    """
+    report = BulkFetchReport()
+    totals = {'inserted': 0, 'updated': 0, 'skipped': 0}
+    batch = []
+
+    def flush():
+        with db.writer() as conn:
+            counts = insert_bulk(conn, series=batch)
+        for key, count in (counts or {}).items():
+            totals[key] += count
+        batch.clear()
+
+    for result in fetcher.iter_station_measurements(stations, param_codes, report, sensor_ids):
+        batch.append((result['station'], result['sensor'], result['data']))
+        if len(batch) >= BATCH_SIZE:
+            flush()
+    if batch:
+        flush()
+    if collect_index:
+        indexes = [(result['station_id'], result['index'])
+                   for result in fetcher.iter_air_quality_indexes(stations, report)]
+        with db.writer() as conn:
+            insert_bulk(conn, stations=stations)
+            counts = store_indexes(conn, indexes)
+        totals['indexes'] = (counts or {}).get('inserted', 0)
+    logger.info(f"Harvest finished: {totals}")
+    return dict(totals, fetch=report.as_dict())
+
+
+def run_forever(db, fetcher, select_stations, interval=DEFAULT_INTERVAL, param_codes=None, sensor_ids=None,
+                stop_event=None, collect_index=False):
+    """
+    Harvest every interval seconds until stop_event is set.
+
+    Args:
+        db (ConnectionManager): The connection manager of the database.
+        fetcher (BulkFetcher): The bulk fetcher used for the network fan-out.
+        select_stations (callable): Returns the station dictionaries to harvest; called before every run so
+                                    catalog updates are picked up.
+        interval (float): Seconds between the starts of consecutive runs.
+        param_codes (iterable, optional): Only harvest sensors measuring these parameters.
+        sensor_ids (iterable, optional): Only harvest these sensors.
+        stop_event (threading.Event, optional): Set it to stop the loop.
+        collect_index (bool): Also store the stations' air quality index on every run.
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.is_set():
+        started = time.monotonic()
+        try:
+            harvest_once(db, fetcher, select_stations(), param_codes, sensor_ids, collect_index)
+        except Exception as e:
+            logger.error(f"Harvest run failed: {e}")
+        stop_event.wait(max(0.0, interval - (time.monotonic() - started)))
+
+
+def select_stations(catalog, station_ids=None, cities=None):
+    """
+    Resolve the configured station IDs and city names to station dictionaries.
+
+    Args:
+        catalog (StationCatalog): The station catalog.
+        station_ids (iterable, optional): Station IDs to harvest.
+        cities (iterable, optional): City names whose stations are harvested.
+
+    Returns:
+        list: Station dictionaries, without duplicates.
+    """
+    selected = {}
+    if station_ids:
+        stations = catalog.get_stations()
+        if stations is None:
+            logger.error(f"Station catalog unavailable; cannot resolve station IDs {sorted(set(station_ids))}")
+        else:
+            wanted = set(station_ids)
+            for station in stations:
+                if station['id'] in wanted:
+                    selected[station['id']] = station
+            unresolved = wanted - selected.keys()
+            if unresolved:
+                logger.warning(f"Station IDs not found in the catalog: {sorted(unresolved)}")
+    for city in cities or []:
+        stations = catalog.find_by_city(city)
+        if stations is None:
+            logger.error(f"Station catalog unavailable; cannot resolve city '{city}'")
+            continue
+        if not stations:
+            logger.warning(f"No stations found for city '{city}'")
+        for station in stations:
+            selected[station['id']] = station
+    return list(selected.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Periodically store complete GIOŚ measurement series.')
+    parser.add_argument('--station', type=int, action='append', dest='stations', help='station ID (repeatable)')
+    parser.add_argument('--city', action='append', dest='cities', help='harvest all stations of a city (repeatable)')
+    parser.add_argument('--sensor', type=int, action='append', dest='sensors', help='only these sensor IDs (repeatable)')
+    parser.add_argument('--param', action='append', dest='params', help='only these parameter codes, e.g. PM10 (repeatable)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='seconds between runs')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help='path to the SQLite database')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    parser.add_argument('--aq-index', action='store_true', help="also store the stations' air quality index")
+    parser.add_argument('--once', action='store_true', help='run a single harvest and exit')
+    args = parser.parse_args(argv)
+    if not args.stations and not args.cities:
+        parser.error('configure at least one --station or --city')
+
+    db = get_manager(args.db)
+    catalog = StationCatalog(os.path.join(os.path.dirname(os.path.abspath(args.db)), 'station_catalog.json'))
+    fetcher = BulkFetcher(max_workers=args.workers)
+
+    def configured_stations():
+        return select_stations(catalog, args.stations, args.cities)
+
+    try:
+        with db.writer() as conn:
+            create_tables(conn)
+        if args.once:
+            harvest_once(db, fetcher, configured_stations(), args.params, args.sensors, args.aq_index)
+        else:
+            run_forever(db, fetcher, configured_stations, args.interval, args.params, args.sensors,
+                        collect_index=args.aq_index)
+    except KeyboardInterrupt:
+        logger.info("Harvester stopped.")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
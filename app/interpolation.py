@@ -0,0 +1,284 @@
+"""
+Spatial interpolation of station measurements onto a latitude/longitude grid.
+
+Inverse distance weighting (IDW) estimates a value at any point as the distance-weighted mean of the
+stations that measured it. The weights depend only on where the stations and grid cells are, not on the
+values, so IDWInterpolator computes the cell-by-station weight matrix once and then interpolates any
+number of timesteps with two matrix products; stations missing a value at a timestep simply drop out of
+that timestep's weighted mean.
+"""
+import os
+import logging
+import numpy as np
+import pandas as pd
+from app.comparison import find_sensors, read_sensors, to_wide
+from app.connection_manager import get_manager
+from app.spatial_index import EARTH_RADIUS_KM
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+POLAND_BBOX = (49.0, 14.1, 54.9, 24.2)  # min_lat, min_lon, max_lat, max_lon
+DEFAULT_CELL_KM = 5.0
+DEFAULT_POWER = 2.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+PERIODS = {'hour': 'h', 'day': 'D', 'month': 'M'}
+MAX_TIMESTEPS = 31 * 24  # A month of hourly grids, about 40 MB at the default cell size over Poland
+
+
+def distance_matrix_km(lats1, lons1, lats2, lons2):
+    """
+    Return the great-circle distances between two sets of points.
+
+    Args:
+        lats1, lons1 (array-like): The first points in degrees, n of them.
+        lats2, lons2 (array-like): The second points in degrees, m of them.
+
+    Returns:
+        ndarray: An (n, m) array of distances in kilometres.
+    """
+    phi1 = np.radians(np.asarray(lats1, dtype=np.float64))[:, None]
+    phi2 = np.radians(np.asarray(lats2, dtype=np.float64))[None, :]
+    dlam = np.radians(np.asarray(lons2, dtype=np.float64))[None, :] - np.radians(np.asarray(lons1, dtype=np.float64))[:, None]
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def make_grid(bbox=POLAND_BBOX, cell_km=DEFAULT_CELL_KM):
+    """
+    Return the cell centres of a grid covering a bounding box with cells of about cell_km on each side.
+
+    Args:
+        bbox (tuple): (min_lat, min_lon, max_lat, max_lon) in degrees.
+        cell_km (float): The cell size in kilometres; the longitude step is taken at the box's mean latitude.
+
+    Returns:
+        tuple: The latitudes (rows, south to north) and longitudes (columns, west to east) of the cell centres.
+    """
+    min_lat, min_lon, max_lat, max_lon = bbox
+    lat_step = cell_km / KM_PER_DEGREE
+    lon_step = cell_km / (KM_PER_DEGREE * np.cos(np.radians((min_lat + max_lat) / 2)))
+    rows = max(1, int(np.ceil((max_lat - min_lat) / lat_step)))
+    columns = max(1, int(np.ceil((max_lon - min_lon) / lon_step)))
+    lats = min_lat + (np.arange(rows) + 0.5) * (max_lat - min_lat) / rows
+    lons = min_lon + (np.arange(columns) + 0.5) * (max_lon - min_lon) / columns
+    return lats, lons
+
+
+class IDWInterpolator:
+    """
+    Inverse distance weighting from a fixed set of stations to a fixed set of target points.
+    """
+    def __init__(self, station_lats, station_lons, target_lats, target_lons, power=DEFAULT_POWER, max_km=None,
+                 dtype=np.float32):
+        """
+        Precompute the weight matrix.
+
+        Args:
+            station_lats, station_lons (array-like): Station coordinates in degrees.
+            target_lats, target_lons (array-like): Coordinates of the points to estimate, e.g. flattened grid cells.
+            power (float): The distance exponent; higher values make estimates more local.
+            max_km (float, optional): Ignore stations farther than this from a point; points with no station
+                in range are NaN.
+            dtype: The float type of the weights; float32 halves the memory of national grids.
+        """
+        distances = distance_matrix_km(target_lats, target_lons, station_lats, station_lons)
+        with np.errstate(divide='ignore'):
+            weights = distances ** -power
+        # A point on top of a station takes that station's value
+        exact = distances < 1e-6
+        on_station = exact.any(axis=1)
+        weights[on_station] = exact[on_station]
+        if max_km is not None:
+            weights[distances > max_km] = 0.0
+        self.weights = weights.astype(dtype)
+
+    def interpolate(self, values):
+        """
+        Estimate the target points from station values.
+
+        Args:
+            values (array-like): One value per station, or a (stations, timesteps) array; NaN marks a
+                missing value.
+
+        Returns:
+            ndarray: One estimate per target point, or a (timesteps, points) array; NaN where no station
+                     contributes.
+        """
+        values = np.asarray(values, dtype=self.weights.dtype)
+        present = ~np.isnan(values)
+        numerator = self.weights @ np.where(present, values, 0)
+        denominator = self.weights @ present.astype(self.weights.dtype)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            estimate = numerator / denominator
+        estimate[denominator == 0] = np.nan
+        return estimate.T if estimate.ndim == 2 else estimate
+
+
+def _timestep_end(start, resample):
+    # The last second of the timestep containing start, so a single grid averages its whole hour, day or month
+    return pd.Timestamp(start).to_period(PERIODS[resample]).end_time.floor('s').to_pydatetime()
+
+
+def station_series(db_path, param, start, end=None, resample='hour', max_timesteps=MAX_TIMESTEPS):
+    """
+    Read a parameter's values at every station that measures it, aligned on a common time grid.
+
+    The range must be bounded: interpolation keeps an estimate per target point and timestep in memory, so
+    the whole history of every station is never read.
+
+    Args:
+        db_path (str): Path to the database file.
+        param (str): A parameter code or name, e.g. 'PM2.5'.
+        start (str or datetime): Only values at or after this date.
+        end (str or datetime, optional): Only values at or before this date; defaults to the end of the
+            timestep of start.
+        resample (str): 'hour', 'day' or 'month'.
+        max_timesteps (int): The largest number of timesteps the range may span.
+
+    Returns:
+        tuple: The sensors (see comparison.find_sensors) with coordinates and the wide frame of their
+               values (see comparison.to_wide), one column per sensor in the same order.
+
+    Raises:
+        ValueError: If start is missing, the range spans more than max_timesteps or no stored sensor
+                    with coordinates measures the parameter.
+    """
+    if not start:
+        raise ValueError("A start date is required")
+    if resample not in PERIODS:
+        raise ValueError(f"Unknown resample granularity: {resample}")
+    end = end or _timestep_end(start, resample)
+    timesteps = len(pd.period_range(pd.Timestamp(start), pd.Timestamp(end), freq=PERIODS[resample]))
+    if timesteps > max_timesteps:
+        raise ValueError(f"The range spans {timesteps} {resample} timesteps, more than the limit of {max_timesteps}; "
+                         f"narrow it or use a coarser timestep")
+    with get_manager(db_path).reader() as conn:
+        sensors = [sensor for sensor in find_sensors(conn, param)
+                   if sensor['latitude'] is not None and sensor['longitude'] is not None]
+    if not sensors:
+        raise ValueError(f"No stored sensors with coordinates measure {param}")
+    sensor_ids = [sensor['id'] for sensor in sensors]
+    wide = to_wide(read_sensors(db_path, sensor_ids, start, end, resample), sensor_ids, resample)
+    return sensors, wide
+
+
+def interpolate_grids(db_path, param, start, end=None, bbox=POLAND_BBOX, cell_km=DEFAULT_CELL_KM,
+                      power=DEFAULT_POWER, max_km=None, resample='hour', max_timesteps=MAX_TIMESTEPS):
+    """
+    Build an interpolated grid of a parameter for every timestep of a date range.
+
+    Args:
+        db_path (str): Path to the database file.
+        param (str): A parameter code or name, e.g. 'PM2.5'.
+        start (str or datetime): The first timestep.
+        end (str or datetime, optional): The last timestep; defaults to the timestep of start, for a single grid.
+            The range may span at most max_timesteps, as every grid is held in memory.
+        bbox (tuple): (min_lat, min_lon, max_lat, max_lon) of the grid in degrees.
+        cell_km (float): The cell size in kilometres.
+        power (float): The IDW distance exponent.
+        max_km (float, optional): Ignore stations farther than this from a cell.
+        resample (str): The timestep, 'hour', 'day' or 'month'.
+        max_timesteps (int): The largest number of grids to build; see station_series.
+
+    Returns:
+        dict: 'times' (datetime64 array), 'lats' and 'lons' (cell centres), 'grids' (a float array of shape
+              (times, lats, lons)), 'bbox' and 'stations' (the sensors used, with coordinates).
+    """
+    sensors, wide = station_series(db_path, param, start, end, resample, max_timesteps)
+    lats, lons = make_grid(bbox, cell_km)
+    cell_lats, cell_lons = np.meshgrid(lats, lons, indexing='ij')
+    interpolator = IDWInterpolator([sensor['latitude'] for sensor in sensors], [sensor['longitude'] for sensor in sensors],
+                                   cell_lats.ravel(), cell_lons.ravel(), power, max_km)
+    grids = interpolator.interpolate(wide.to_numpy().T).reshape(len(wide), len(lats), len(lons))
+    logger.info(f"Interpolated {len(wide)} grids of {len(lats)}x{len(lons)} cells from {len(sensors)} stations")
+    return {'times': wide.index.to_numpy(), 'lats': lats, 'lons': lons, 'grids': grids, 'bbox': tuple(bbox),
+            'stations': sensors}
+
+
+def interpolate_points(db_path, param, lats, lons, start, end=None, power=DEFAULT_POWER, max_km=None,
+                       resample='hour', max_timesteps=MAX_TIMESTEPS):
+    """
+    Estimate a parameter at given points, e.g. an address, for every timestep of a date range.
+
+    Args:
+        db_path (str): Path to the database file.
+        param (str): A parameter code or name, e.g. 'PM2.5'.
+        lats, lons (array-like): The points in degrees.
+        start (str or datetime): The first timestep.
+        end (str or datetime, optional): The last timestep; defaults to the timestep of start. The range may
+            span at most max_timesteps.
+        power (float): The IDW distance exponent.
+        max_km (float, optional): Ignore stations farther than this from a point.
+        resample (str): The timestep, 'hour', 'day' or 'month'.
+        max_timesteps (int): The largest number of timesteps; see station_series.
+
+    Returns:
+        DataFrame: Indexed by date, one column per point.
+    """
+    sensors, wide = station_series(db_path, param, start, end, resample, max_timesteps)
+    interpolator = IDWInterpolator([sensor['latitude'] for sensor in sensors], [sensor['longitude'] for sensor in sensors],
+                                   np.atleast_1d(lats), np.atleast_1d(lons), power, max_km)
+    return pd.DataFrame(interpolator.interpolate(wide.to_numpy().T), index=wide.index)
+
+
+def save_grids(path, result):
+    """
+    Write interpolated grids to a compressed NumPy archive.
+
+    Args:
+        path (str): The .npz file to write.
+        result (dict): The result of interpolate_grids.
+    """
+    np.savez_compressed(path, times=result['times'].astype('datetime64[s]'), lats=result['lats'], lons=result['lons'],
+                        grids=result['grids'],
+                        station_lats=np.array([sensor['latitude'] for sensor in result['stations']]),
+                        station_lons=np.array([sensor['longitude'] for sensor in result['stations']]))
+
+
+def save_heatmaps(directory, result, param, vmin=None, vmax=None, dpi=100):
+    """
+    Draw each grid as a PNG heatmap with the stations marked.
+
+    The colour scale is shared by all images of a run, so the frames can be compared or animated.
+
+    Args:
+        directory (str): The directory to write to; files are named '<param>_<YYYYmmdd_HHMM>.png'.
+        result (dict): The result of interpolate_grids.
+        param (str): The parameter, used in titles and file names.
+        vmin, vmax (float, optional): The colour scale; defaults to the range of all grids.
+        dpi (int): The image resolution.
+
+    Returns:
+        list: The paths written.
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    os.makedirs(directory, exist_ok=True)
+    grids, lats, lons = result['grids'], result['lats'], result['lons']
+    if grids.size and np.isfinite(grids).any():
+        vmin = np.nanmin(grids) if vmin is None else vmin
+        vmax = np.nanmax(grids) if vmax is None else vmax
+    figure = Figure(figsize=(8, 6), dpi=dpi)
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    min_lat, min_lon, max_lat, max_lon = result['bbox']
+    image = ax.imshow(grids[0] if len(grids) else np.full((len(lats), len(lons)), np.nan), origin='lower',
+                      extent=(min_lon, max_lon, min_lat, max_lat),
+                      cmap='RdYlGn_r', vmin=vmin, vmax=vmax, aspect=1 / np.cos(np.radians(lats.mean())))
+    ax.scatter([sensor['longitude'] for sensor in result['stations']], [sensor['latitude'] for sensor in result['stations']],
+               s=8, c='black', marker='^')
+    figure.colorbar(image, ax=ax, label=param)
+    ax.set_xlabel('Longitude')
+    ax.set_ylabel('Latitude')
+    paths = []
+    safe_param = ''.join(ch if ch.isalnum() else '_' for ch in param)
+    for time, grid in zip(result['times'].astype('datetime64[s]').astype(object), grids):
+        image.set_data(grid)
+        ax.set_title(f"{param} {time:%Y-%m-%d %H:%M}")
+        path = os.path.join(directory, f"{safe_param}_{time:%Y%m%d_%H%M}.png")
+        figure.savefig(path)
+        paths.append(path)
+    return paths
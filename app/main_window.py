@@ -1,21 +1,25 @@
+import math
 import os
 import tkinter as tk
 from tkinter import messagebox
-import pandas as pd
 import logging
-from app.data_fetcher import get_station_list, get_sensors_for_station, get_measurement_data
+from app.data_fetcher import get_sensors_for_station, get_measurement_data
 from app.db_manager import create_tables, insert_station, insert_sensor, insert_measurement, clear_data, inspect_db
-from app.data_analyzer import read_data, analyze_data, plot_data
+from app.spatial_index import parse_coordinates
+from app.station_catalog import StationCatalog
+from app.connection_manager import get_manager
+from app.task_executor import TaskExecutor
 from app.frames.welcome_frame import WelcomeFrame
 from app.frames.station_frame import StationFrame
 from app.frames.sensor_frame import SensorFrame
 from app.frames.data_analysis_frame import DataAnalysisFrame
-import sqlite3
 
 # Initialize the logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+NEAREST_STATION_COUNT = 10  # Stations listed for a coordinate lookup
+
 class AirQualityApp:
     """
     Main application class for the Air Quality Monitoring App.
@@ -36,12 +40,14 @@ class AirQualityApp:
         self.sensors = []
         self.selected_station = None
         self.selected_sensor = None
-        self.station_list = []
         self.current_data = None
 
+        self.tasks = TaskExecutor(self.root)
         self.db_path = self.ensure_data_directory()
-        self.conn = sqlite3.connect(self.db_path)
-        create_tables(self.conn)
+        self.db = get_manager(self.db_path)
+        with self.db.writer() as conn:
+            create_tables(conn)
+        self.station_catalog = StationCatalog(os.path.join(os.path.dirname(self.db_path), 'station_catalog.json'))
 
         self.init_frames()
         self.show_frame("welcome_frame")
@@ -89,15 +95,70 @@ class AirQualityApp:
         frame = self.frames[frame_name]
         frame.tkraise()
 
+    def run_in_background(self, frame_name, message, function, *args, key=None, on_success=None, cancellable=True):
+        """
+        Run a blocking call in the task executor while the frame's busy indicator is shown.
+
+        Args:
+            frame_name (str): The frame whose busy indicator is shown.
+            message (str): The status text of the indicator.
+            function (callable): The blocking function.
+            *args: Arguments for the function.
+            key (str, optional): A new task with the same key cancels the previous one.
+            on_success (callable, optional): Called with the result on the Tk thread.
+            cancellable (bool): Whether the indicator offers a Cancel button.
+
+        Returns:
+            Task: The handle of the submitted task.
+        """
+        indicator = self.frames[frame_name].busy_indicator
+        token = None
+
+        def succeeded(result):
+            # Hide the indicator before the callback, which may open a modal dialog
+            indicator.stop(token)
+            if on_success:
+                on_success(result)
+
+        def failed(error):
+            indicator.stop(token)
+            logger.error(f"{message} failed: {error}")
+            messagebox.showerror("Error", str(error))
+
+        task = self.tasks.submit(function, *args, key=key, on_success=succeeded, on_error=failed,
+                                 on_finally=lambda: indicator.stop(token))
+        token = indicator.start(message, task.cancel if cancellable else None)
+        return task
+
     def lookup_city(self, city_name):
         """
-        Look up measurement centers in the specified city.
+        Look up measurement centers in the specified city, or the nearest ones to a "latitude, longitude" pair.
+
+        Args:
+            city_name (str): The name of the city to look up, or coordinates such as "50.06, 19.94".
+        """
+        coordinates = parse_coordinates(city_name)
+        if coordinates:
+            self.run_in_background("welcome_frame", "Looking up the nearest stations...",
+                                   self.station_catalog.find_nearest, *coordinates, NEAREST_STATION_COUNT,
+                                   key='stations', on_success=lambda stations: self.show_stations(city_name, stations))
+            return
+        self.run_in_background("welcome_frame", "Looking up stations...", self.station_catalog.find_by_city,
+                               city_name, key='stations',
+                               on_success=lambda stations: self.show_stations(city_name, stations))
+
+    def show_stations(self, city_name, filtered_stations):
+        """
+        Show the stations found for a city.
 
         Args:
-            city_name (str): The name of the city to look up.
+            city_name (str): The name of the city that was looked up.
+            filtered_stations (list): The stations in the city, None if the station list could not be downloaded.
         """
-        self.station_list = get_station_list()
-        filtered_stations = [station for station in self.station_list if city_name in station['city']['name'].lower()]
+        if filtered_stations is None:
+            messagebox.showerror("Connection Error", "Could not download the list of measurement stations.")
+            return
+        logger.info(f"Station catalog stats: {self.station_catalog.stats()}")
 
         if not filtered_stations:
             messagebox.showinfo("No Results", f"No measurement centers found for city: {city_name}")
@@ -106,6 +167,21 @@ class AirQualityApp:
         self.frames["station_frame"].populate_stations(filtered_stations)
         self.show_frame("station_frame")
 
+    def suggest_cities(self, text):
+        """
+        Suggest city names for the text typed so far in the welcome frame.
+
+        Args:
+            text (str): The partial city name.
+
+        Returns:
+            list: Matching city names, empty if the station list has not been downloaded yet.
+        """
+        index = self.station_catalog.get_index(fetch=False)
+        if index is None:
+            return []
+        return index.suggest_cities(text)
+
     def on_station_select(self, index):
         """
         Handle station selection and populate sensors for the selected station.
@@ -116,7 +192,17 @@ class AirQualityApp:
         self.selected_station = self.frames["station_frame"].stations[index]
         logger.info(f"Selected Station: {self.selected_station}")
         selected_station_id = self.selected_station['id']
-        self.sensors = get_sensors_for_station(selected_station_id)
+        self.run_in_background("station_frame", "Downloading sensors...", get_sensors_for_station,
+                               selected_station_id, key='sensors', on_success=self.show_sensors)
+
+    def show_sensors(self, sensors):
+        """
+        Show the sensors of the selected station.
+
+        Args:
+            sensors (list): The sensors downloaded for the station.
+        """
+        self.sensors = sensors
         if self.sensors:
             self.frames["sensor_frame"].populate_sensors(self.sensors)
             self.show_frame("sensor_frame")
@@ -131,7 +217,16 @@ class AirQualityApp:
         self.selected_sensor = self.sensors[index]
         logger.info(f"Selected Sensor: {self.selected_sensor}")
         selected_sensor_id = self.selected_sensor['id']
-        measurement_data = get_measurement_data(selected_sensor_id)
+        self.run_in_background("sensor_frame", "Downloading measurements...", get_measurement_data,
+                               selected_sensor_id, key='measurements', on_success=self.show_measurement_data)
+
+    def show_measurement_data(self, measurement_data):
+        """
+        Show the downloaded measurement data and offer to save it.
+
+        Args:
+            measurement_data (dict): Dictionary containing measurement data, None if the download failed.
+        """
         if measurement_data:
             self.display_measurement_data(measurement_data)
             self.frames["sensor_frame"].show_save_button()
@@ -182,12 +277,21 @@ class AirQualityApp:
         if self.current_data and self.selected_station and self.selected_sensor:
             logger.info(f"Saving data for station: {self.selected_station}, sensor: {self.selected_sensor}")
             logger.info(f"Current Data: {self.current_data}")
-            insert_station(self.conn, self.selected_station)
-            insert_sensor(self.conn, self.selected_sensor)
-            insert_measurement(self.conn, self.selected_sensor['id'], {"values": [self.current_data]}, self.selected_station, self.selected_sensor)
-            inspect_db(self.conn)  # Add a call to inspect the database contents after saving
-            self.populate_analyze_data_stations()  # Refresh the stations in the data analysis frame
-            messagebox.showinfo("Data Saved", "The current data has been saved to the database.")
+            station, sensor, current_data = self.selected_station, self.selected_sensor, dict(self.current_data)
+
+            def write():
+                with self.db.writer() as conn:
+                    insert_station(conn, station)
+                    insert_sensor(conn, sensor)
+                    insert_measurement(conn, sensor['id'], {"values": [current_data]}, station, sensor)
+                    inspect_db(conn)  # Add a call to inspect the database contents after saving
+
+            def saved(result):
+                self.populate_analyze_data_stations()  # Refresh the stations in the data analysis frame
+                messagebox.showinfo("Data Saved", "The current data has been saved to the database.")
+
+            # A started write cannot be undone halfway, so saving offers no Cancel button
+            self.run_in_background("sensor_frame", "Saving data...", write, on_success=saved, cancellable=False)
         else:
             messagebox.showwarning("Save Error", "No data to save.")
 
@@ -195,16 +299,23 @@ class AirQualityApp:
         """
         Clear all data from the database.
         """
-        clear_data(self.conn)
-        messagebox.showinfo("Data Cleared", "All data has been cleared from the database.")
+        def clear():
+            with self.db.writer() as conn:
+                clear_data(conn)
+
+        def cleared(result):
+            self.populate_analyze_data_stations()
+            messagebox.showinfo("Data Cleared", "All data has been cleared from the database.")
+
+        self.run_in_background("welcome_frame", "Clearing the database...", clear, on_success=cleared,
+                               cancellable=False)
 
     def populate_analyze_data_stations(self):
         """
         Populate the station list for data analysis.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id, stationName FROM stations")
-        stations = cursor.fetchall()
+        with self.db.reader() as conn:
+            stations = conn.execute("SELECT id, stationName FROM stations").fetchall()
 
         station_list = [{'id': id, 'stationName': name} for id, name in stations]
         self.frames["data_analysis_frame"].populate_stations(station_list)
@@ -216,9 +327,8 @@ class AirQualityApp:
         Args:
             station_id (int): The ID of the selected station.
         """
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT id, paramName FROM sensors WHERE stationId=?", (station_id,))
-        sensors = cursor.fetchall()
+        with self.db.reader() as conn:
+            sensors = conn.execute("SELECT id, paramName FROM sensors WHERE stationId=?", (station_id,)).fetchall()
 
         sensor_list = [{'id': id, 'param': {'paramName': name}, 'stationId': station_id} for id, name in sensors]
         self.frames["data_analysis_frame"].populate_sensors(sensor_list)
@@ -227,17 +337,14 @@ class AirQualityApp:
         """
         Analyze the data for the selected sensor and date range.
         """
+        from app.data_analyzer import analyze_range
+
         sensor_id = self.frames["data_analysis_frame"].get_selected_sensor_id()
         start_date = self.frames["data_analysis_frame"].get_start_date()
         end_date = self.frames["data_analysis_frame"].get_end_date()
         try:
-            df = read_data(self.db_path, sensor_id)
-            if not df.empty:
-                if start_date:
-                    df = df[df['date'] >= pd.Timestamp(start_date)]
-                if end_date:
-                    df = df[df['date'] <= pd.Timestamp(end_date)]
-                analysis = analyze_data(df)
+            analysis = analyze_range(self.db_path, sensor_id, start_date or None, end_date or None)
+            if analysis:
                 self.display_analysis(analysis)
             else:
                 messagebox.showinfo("No Data", "No data found for the given Sensor ID.")
@@ -252,12 +359,24 @@ class AirQualityApp:
         Args:
             analysis (dict): A dictionary containing analysis results.
         """
-        analysis_str = f"""
-        Minimum Value: {analysis['min_value']} (Date: {analysis['min_date']})
-        Maximum Value: {analysis['max_value']} (Date: {analysis['max_date']})
-        Average Value: {analysis['mean_value']}
-        Trend: {analysis['trend']}
-        """
+        lines = [
+            f"Minimum Value: {analysis['min_value']} (Date: {analysis['min_date']})",
+            f"Maximum Value: {analysis['max_value']} (Date: {analysis['max_date']})",
+            f"Average Value: {analysis['mean_value']:.2f}",
+            f"Standard Deviation: {analysis['std_value']:.2f}",
+        ]
+        # Median, percentiles and exceedances are only present when the range was small enough to read raw
+        if 'median_value' in analysis:
+            lines.append(f"Median Value: {analysis['median_value']:.2f}")
+            lines.append(f"5th-95th Percentile: {analysis['p5']:.2f} - {analysis['p95']:.2f}")
+        else:
+            from app.data_analyzer import RAW_ANALYSIS_LIMIT
+            lines.append(f"Median, percentiles and exceedances: narrow the range to "
+                         f"{RAW_ANALYSIS_LIMIT:,} values or fewer ({analysis['count']:,} selected)")
+        lines.append(f"Trend: {analysis['trend']} ({analysis['slope_per_day']:+.3f} per day)")
+        if 'norm' in analysis and not math.isnan(analysis['norm']):
+            lines.append(f"Values above the {analysis['norm']:g} norm: {analysis['exceedances']}")
+        analysis_str = "\n".join(lines)
         messagebox.showinfo("Analysis Results", analysis_str)
 
     def plot_data(self):
@@ -268,12 +387,43 @@ class AirQualityApp:
         start_date = self.frames["data_analysis_frame"].get_start_date()
         end_date = self.frames["data_analysis_frame"].get_end_date()
         try:
-            df = read_data(self.db_path, sensor_id)
-            plot_data(self.db_path, sensor_id, df, start_date, end_date)
+            self.frames["data_analysis_frame"].show_plot(sensor_id, start_date, end_date)
         except Exception as e:
             logger.error(f"Error plotting data: {e}")
             messagebox.showerror("Error", str(e))
 
+    def compare_data(self):
+        """
+        Compare the selected sensor with the other stored sensors of its parameter in the same city.
+        """
+        frame = self.frames["data_analysis_frame"]
+        sensor_id = frame.get_selected_sensor_id()
+        if not sensor_id:
+            messagebox.showinfo("No Sensor", "Select a sensor to compare.")
+            return
+        start_date = frame.get_start_date()
+        end_date = frame.get_end_date()
+        db_path = self.db_path
+
+        def compare():
+            from app.comparison import compare_sensors, find_sensors
+
+            with self.db.reader() as conn:
+                row = conn.execute("""SELECT sensors.paramName, stations.city FROM sensors
+                                      JOIN stations ON sensors.stationId = stations.id
+                                      WHERE sensors.id = ?""", (int(sensor_id),)).fetchone()
+                sensor_ids = [int(sensor_id)]
+                if row:
+                    sensor_ids += [sensor['id'] for sensor in find_sensors(conn, row[0], row[1])]
+            return compare_sensors(db_path, sensor_ids, start_date or None, end_date or None)
+
+        def failed(error):
+            logger.error(f"Error comparing data: {error}")
+            messagebox.showerror("Error", str(error))
+
+        self.tasks.submit(compare, name='comparison', key='compare', on_success=frame.show_comparison,
+                          on_error=failed)
+
     def go_back_to_welcome(self):
         """
         Go back to the welcome screen.
@@ -286,3 +436,4 @@ if __name__ == "__main__":
     root = tk.Tk()
     app = AirQualityApp(root)
     root.mainloop()
+    app.tasks.shutdown()
@@ -0,0 +1,222 @@
+import codecs
+import functools
+import json
+import re
+import logging
+from array import array
+from collections.abc import Mapping
+from app.db_manager import from_epoch, to_epoch
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 16 * 1024  # Bytes read from the response at a time
+_SEPARATORS = ' \t\r\n,'
+
+
+@functools.lru_cache(maxsize=4096)
+def _day_start(day):
+    return to_epoch(day)
+
+
+def parse_date(date):
+    """
+    Convert an API date to epoch seconds like to_epoch, with a fast path for the 'YYYY-MM-DD HH:MM:SS' form.
+
+    Consecutive values share their day, so only the time of day is parsed per value.
+
+    Args:
+        date (str): The measurement date.
+
+    Returns:
+        int: Seconds since the epoch.
+    """
+    if len(date) == 19 and date[10] == ' ' and date[13] == date[16] == ':':
+        hour, minute, second = int(date[11:13]), int(date[14:16]), int(date[17:19])
+        if hour < 24 and minute < 60 and second < 60:
+            return _day_start(date[:10]) + hour * 3600 + minute * 60 + second
+    return to_epoch(date)
+
+
+class MeasurementSeries(Mapping):
+    """
+    One sensor's measurements as two flat arrays: epoch timestamps and float values, in the order the API
+    sent them (newest first).
+
+    A point costs 16 bytes instead of a dictionary with a date string and a float. For existing callers the
+    series also reads like the {'values': [{'date': ..., 'value': ...}, ...]} dictionary returned before;
+    that list is built on access.
+    """
+    __slots__ = ('timestamps', 'values_array')
+
+    def __init__(self, points=()):
+        """
+        Initialize the series.
+
+        Args:
+            points (iterable, optional): (timestamp, value) pairs to start with.
+        """
+        self.timestamps = array('q')
+        self.values_array = array('d')
+        for ts, value in points:
+            self.timestamps.append(ts)
+            self.values_array.append(value)
+
+    @classmethod
+    def from_arrays(cls, timestamps, values):
+        """
+        Create a series from NumPy arrays without a per-point Python loop.
+
+        Args:
+            timestamps (ndarray): Epoch seconds.
+            values (ndarray): The values, as many as timestamps.
+
+        Returns:
+            MeasurementSeries: The series.
+        """
+        series = cls()
+        series.timestamps.frombytes(timestamps.astype('=i8', copy=False).tobytes())
+        series.values_array.frombytes(values.astype('=f8', copy=False).tobytes())
+        return series
+
+    def add(self, date, value):
+        """
+        Append a point as published by the API.
+
+        Args:
+            date (str): The measurement date, e.g. '2024-06-01 13:00:00'.
+            value (float): The measured value.
+
+        Returns:
+            bool: False if the point was malformed and skipped.
+        """
+        try:
+            ts, value = parse_date(date), float(value)
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning(f"Skipping malformed value {value!r} at {date!r}: {e}")
+            return False
+        self.timestamps.append(ts)
+        self.values_array.append(value)
+        return True
+
+    def points(self):
+        """
+        Iterate over the points without building dictionaries.
+
+        Yields:
+            tuple: (timestamp, value) pairs.
+        """
+        return zip(self.timestamps, self.values_array)
+
+    def rows(self, sensor_id):
+        """
+        Iterate over the points as measurements table rows.
+
+        Args:
+            sensor_id (int): The sensor the series belongs to.
+
+        Yields:
+            tuple: (sensorId, ts, value) rows.
+        """
+        return ((sensor_id, ts, value) for ts, value in self.points())
+
+    def nbytes(self):
+        return (self.timestamps.itemsize * len(self.timestamps)
+                + self.values_array.itemsize * len(self.values_array))
+
+    def __len__(self):
+        # Mapping length: the single 'values' key
+        return 1
+
+    def __iter__(self):
+        yield 'values'
+
+    def __getitem__(self, key):
+        if key != 'values':
+            raise KeyError(key)
+        return [{'date': from_epoch(ts), 'value': value} for ts, value in self.points()]
+
+    def __repr__(self):
+        return f"MeasurementSeries({len(self.timestamps)} points)"
+
+
+def iter_text(response, chunk_size=CHUNK_SIZE):
+    """
+    Decode a streamed HTTP response body chunk by chunk.
+
+    Args:
+        response (requests.Response): A response requested with stream=True.
+        chunk_size (int): Bytes read at a time.
+
+    Yields:
+        str: Decoded text chunks; multi-byte characters split between chunks are joined.
+    """
+    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')(errors='replace')
+    for chunk in response.iter_content(chunk_size=chunk_size):
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_array(chunks, key=None):
+    """
+    Parse the elements of a JSON array one at a time from a stream of text chunks.
+
+    Only the current chunk and the element being parsed are held in memory, never the whole document.
+
+    Args:
+        chunks (iterable): Text chunks of the JSON document.
+        key (str, optional): Parse the array under this top-level key, e.g. 'values'; None for a top-level array.
+
+    Yields:
+        The decoded elements.
+
+    Raises:
+        ValueError: If the array is missing or the document ends before the array is closed.
+    """
+    decoder = json.JSONDecoder()
+    chunks = iter(chunks)
+    buffer, pos = '', 0
+
+    def read_more():
+        nonlocal buffer, pos
+        chunk = next(chunks, None)
+        if chunk is None:
+            return False
+        buffer, pos = buffer[pos:] + chunk, 0
+        return True
+
+    start = re.compile(r'"%s"\s*:\s*\[' % re.escape(key)) if key else re.compile(r'\s*\[')
+    while True:
+        match = start.search(buffer) if key else start.match(buffer)
+        if match:
+            pos = match.end()
+            break
+        if not read_more():
+            raise ValueError(f"No JSON array {'under ' + repr(key) if key else ''} in the response")
+
+    while True:
+        while pos < len(buffer) and buffer[pos] in _SEPARATORS:
+            pos += 1
+        if pos == len(buffer):
+            if not read_more():
+                raise ValueError("The response ended inside a JSON array")
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The element continues in the next chunk
+            if not read_more():
+                raise
+            continue
+        if end == len(buffer) and read_more():
+            # A number at the end of the chunk may continue in the next one
+            continue
+        yield item
+        pos = end
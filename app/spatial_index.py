@@ -0,0 +1,214 @@
+import bisect
+import heapq
+import math
+import re
+
+EARTH_RADIUS_KM = 6371.0088
+_COORDINATES_RE = re.compile(r'^\s*(-?\d+(?:\.\d+)?)\s*[,;\s]\s*(-?\d+(?:\.\d+)?)\s*$')
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """
+    Return the great-circle distance between two points.
+
+    Args:
+        lat1, lon1 (float): The first point in degrees.
+        lat2, lon2 (float): The second point in degrees.
+
+    Returns:
+        float: The distance in kilometres.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def parse_coordinates(text):
+    """
+    Read a 'latitude, longitude' pair typed by the user, e.g. '50.06, 19.94'.
+
+    Args:
+        text (str): The text to parse.
+
+    Returns:
+        tuple: (latitude, longitude) in degrees, or None if the text is not a valid pair.
+    """
+    match = _COORDINATES_RE.match(text or '')
+    if not match:
+        return None
+    lat, lon = float(match.group(1)), float(match.group(2))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def station_coordinates(station):
+    """
+    Return a station's coordinates from the API ('gegrLat'/'gegrLon') or database ('latitude'/'longitude') form.
+
+    Args:
+        station (dict): A station dictionary.
+
+    Returns:
+        tuple: (latitude, longitude) in degrees, or None if the station has no valid coordinates.
+    """
+    try:
+        lat = float(station.get('gegrLat', station.get('latitude')))
+        lon = float(station.get('gegrLon', station.get('longitude')))
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def _unit_vector(lat, lon):
+    phi, lam = math.radians(lat), math.radians(lon)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def _chord(distance_km):
+    # Straight-line distance through the unit sphere between two points this far apart on the surface
+    return 2 * math.sin(min(distance_km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+class SpatialIndex:
+    """
+    Nearest-neighbour, radius and bounding-box queries over station coordinates.
+
+    Stations are placed on the unit sphere and kept in a KD-tree, where straight-line distance orders
+    points exactly like great-circle distance, so there is no distortion near the poles or the antimeridian.
+    Bounding boxes are answered from a list sorted by latitude.
+    """
+    def __init__(self, stations):
+        """
+        Build the index; stations without valid coordinates are left out.
+
+        Args:
+            stations (list): Station dictionaries with 'gegrLat'/'gegrLon' or 'latitude'/'longitude'.
+        """
+        self.stations = []
+        self._coordinates = []
+        self._points = []
+        for station in stations:
+            coordinates = station_coordinates(station)
+            if coordinates:
+                self.stations.append(station)
+                self._coordinates.append(coordinates)
+                self._points.append(_unit_vector(*coordinates))
+        # The tree is stored implicitly: the node of a range is its middle position, split on axis depth % 3
+        self._tree = list(range(len(self._points)))
+        self._build(0, len(self._tree), 0)
+        self._by_latitude = sorted(range(len(self._coordinates)), key=lambda i: self._coordinates[i][0])
+        self._latitudes = [self._coordinates[i][0] for i in self._by_latitude]
+
+    def __len__(self):
+        return len(self.stations)
+
+    def _build(self, lo, hi, depth):
+        if hi - lo <= 1:
+            return
+        axis = depth % 3
+        self._tree[lo:hi] = sorted(self._tree[lo:hi], key=lambda i: self._points[i][axis])
+        mid = (lo + hi) // 2
+        self._build(lo, mid, depth + 1)
+        self._build(mid + 1, hi, depth + 1)
+
+    def _search(self, target, visit, bound):
+        # Depth-first descent, nearer side first; bound() gives the current squared pruning distance
+        tx, ty, tz = target
+        tree, points = self._tree, self._points
+        stack = [(0, len(tree), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            index = tree[mid]
+            point = points[index]
+            x, y, z = point
+            visit(index, (x - tx) * (x - tx) + (y - ty) * (y - ty) + (z - tz) * (z - tz))
+            diff = target[depth % 3] - point[depth % 3]
+            near, far = ((lo, mid), (mid + 1, hi)) if diff < 0 else ((mid + 1, hi), (lo, mid))
+            if diff * diff <= bound():
+                stack.append((*far, depth + 1))
+            stack.append((*near, depth + 1))
+
+    def nearest(self, lat, lon, k=1, max_km=None):
+        """
+        Return the k stations nearest to a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            k (int): Number of stations to return.
+            max_km (float, optional): Ignore stations farther away than this.
+
+        Returns:
+            list: (station, distance_km) pairs, nearest first.
+        """
+        if k < 1:
+            return []
+        target = _unit_vector(lat, lon)
+        limit = _chord(max_km) ** 2 if max_km is not None else math.inf
+        best = []  # Max-heap of (-squared chord, index)
+
+        def visit(index, distance):
+            if distance > limit:
+                return
+            if len(best) < k:
+                heapq.heappush(best, (-distance, index))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, index))
+
+        self._search(target, visit, lambda: -best[0][0] if len(best) == k else limit)
+        return self._result(lat, lon, [index for _, index in best])
+
+    def within_radius(self, lat, lon, radius_km):
+        """
+        Return the stations within a distance of a point.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            radius_km (float): The radius in kilometres.
+
+        Returns:
+            list: (station, distance_km) pairs, nearest first.
+        """
+        limit = _chord(radius_km) ** 2
+        found = []
+
+        def visit(index, distance):
+            if distance <= limit:
+                found.append(index)
+
+        self._search(_unit_vector(lat, lon), visit, lambda: limit)
+        return self._result(lat, lon, found)
+
+    def within_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Return the stations inside a latitude/longitude box.
+
+        Args:
+            min_lat, max_lat (float): The latitude range in degrees.
+            min_lon, max_lon (float): The longitude range in degrees; min_lon > max_lon crosses the antimeridian.
+
+        Returns:
+            list: Station dictionaries ordered by latitude.
+        """
+        lower = bisect.bisect_left(self._latitudes, min_lat)
+        upper = bisect.bisect_right(self._latitudes, max_lat)
+        result = []
+        for index in self._by_latitude[lower:upper]:
+            lon = self._coordinates[index][1]
+            inside = min_lon <= lon <= max_lon if min_lon <= max_lon else (lon >= min_lon or lon <= max_lon)
+            if inside:
+                result.append(self.stations[index])
+        return result
+
+    def _result(self, lat, lon, indices):
+        pairs = [(self.stations[index], haversine_km(lat, lon, *self._coordinates[index])) for index in indices]
+        pairs.sort(key=lambda pair: pair[1])
+        return pairs
@@ -0,0 +1,219 @@
+import json
+import os
+import threading
+import time
+import logging
+from app.data_fetcher import get_station_list_conditional
+from app.spatial_index import SpatialIndex
+from app.station_search import StationIndex
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 24 * 60 * 60  # The national station list changes a few times a year at most
+
+
+class StationCatalog:
+    """
+    In-memory station list backed by a JSON sidecar file and revalidated against the API once per TTL window.
+    """
+    def __init__(self, cache_path=None, ttl=DEFAULT_TTL, fetch=get_station_list_conditional, clock=time.time):
+        """
+        Initialize the catalog.
+
+        Args:
+            cache_path (str, optional): Path of the sidecar file used to persist the station list between runs.
+            ttl (float): Number of seconds a fetched station list is considered fresh.
+            fetch (callable): Function performing the conditional fetch, see get_station_list_conditional.
+            clock (callable): Function returning the current time in seconds since the epoch.
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._fetch = fetch
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+        self._stations = None
+        self._fetched_at = None
+        self._etag = None
+        self._last_modified = None
+        self._disk_checked = False
+        self._index = None
+        self._spatial_index = None
+        self._stats = {'hits': 0, 'misses': 0, 'refreshes': 0, 'revalidations': 0, 'disk_loads': 0, 'errors': 0}
+
+    def get_stations(self, force_refresh=False):
+        """
+        Return the station list, going to the network only when the cached copy has expired.
+
+        Args:
+            force_refresh (bool): Revalidate against the API even if the cached copy is still fresh.
+
+        Returns:
+            list: A list of station dictionaries, or None if no copy is cached and the API is unreachable.
+        """
+        with self._lock:
+            if self._stations is None and not self._disk_checked:
+                self._load_sidecar()
+            if self._stations is not None and not force_refresh and self._is_fresh():
+                self._stats['hits'] += 1
+                return self._stations
+            self._stats['misses'] += 1
+            seen_fetched_at = self._fetched_at
+
+        # The request runs outside self._lock, so readers of the cached copy such as type-ahead never wait for
+        # it; self._fetch_lock lets only one thread download at a time
+        with self._fetch_lock:
+            with self._lock:
+                if self._stations is not None and self._fetched_at != seen_fetched_at:
+                    # Another thread refreshed the list while this one waited
+                    return self._stations
+                etag, last_modified = self._etag, self._last_modified
+            result = self._fetch(etag=etag, last_modified=last_modified)
+            with self._lock:
+                if result is None:
+                    self._stats['errors'] += 1
+                    if self._stations is not None:
+                        logger.warning("Station list refresh failed, serving the stale cached copy.")
+                    return self._stations
+
+                if result['not_modified'] and self._stations is not None:
+                    self._stats['revalidations'] += 1
+                else:
+                    self._stats['refreshes'] += 1
+                    self._stations = result['stations']
+                    self._index = None
+                    self._spatial_index = None
+                self._etag = result['etag']
+                self._last_modified = result['last_modified']
+                self._fetched_at = self._clock()
+                self._save_sidecar()
+                return self._stations
+
+    def get_index(self, fetch=True):
+        """
+        Return the search index over the current station list, building it once per list.
+
+        Args:
+            fetch (bool): Allow going to the network when no station list is cached. Pass False from
+                          latency-sensitive callers such as type-ahead, which should never block on HTTP.
+
+        Returns:
+            StationIndex: The search index, or None if no station list is available.
+        """
+        if fetch:
+            stations = self.get_stations()
+        else:
+            with self._lock:
+                if self._stations is None and not self._disk_checked:
+                    self._load_sidecar()
+                stations = self._stations
+        if stations is None:
+            return None
+        with self._lock:
+            if self._index is None:
+                self._index = StationIndex(stations)
+            return self._index
+
+    def get_spatial_index(self):
+        """
+        Return the coordinate index over the current station list, building it once per list.
+
+        Returns:
+            SpatialIndex: The index, or None if no station list is available.
+        """
+        stations = self.get_stations()
+        if stations is None:
+            return None
+        with self._lock:
+            if self._spatial_index is None:
+                self._spatial_index = SpatialIndex(stations)
+            return self._spatial_index
+
+    def find_nearest(self, lat, lon, k=10, radius_km=None):
+        """
+        Return the stations nearest to a point, each with its 'distance_km'.
+
+        Args:
+            lat (float): Latitude in degrees.
+            lon (float): Longitude in degrees.
+            k (int): Maximum number of stations.
+            radius_km (float, optional): Only stations within this distance.
+
+        Returns:
+            list: Copies of the station dictionaries with a 'distance_km' key, nearest first,
+                  or None if the station list is unavailable.
+        """
+        index = self.get_spatial_index()
+        if index is None:
+            return None
+        return [dict(station, distance_km=round(distance, 2)) for station, distance in index.nearest(lat, lon, k, radius_km)]
+
+    def find_by_city(self, city_name):
+        """
+        Return the stations whose city name contains the given text, ignoring case and diacritics.
+        Falls back to fuzzy matching when nothing contains the text, so small typos still find the city.
+
+        Args:
+            city_name (str): The text to look for in city names.
+
+        Returns:
+            list: A list of matching station dictionaries, or None if the station list is unavailable.
+        """
+        index = self.get_index()
+        if index is None:
+            return None
+        return index.search(city_name, fields=('city',)) or index.search(city_name, mode='fuzzy', fields=('city',))
+
+    def invalidate(self):
+        """
+        Mark the cached station list as expired so the next lookup revalidates it.
+        """
+        with self._lock:
+            self._fetched_at = None
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: Counts of cache hits, misses, full refreshes, 304 revalidations, sidecar loads and fetch errors.
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _is_fresh(self):
+        return self._fetched_at is not None and self._clock() - self._fetched_at < self.ttl
+
+    def _load_sidecar(self):
+        self._disk_checked = True
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                cached = json.load(f)
+            self._stations = cached['stations']
+            self._fetched_at = cached['fetched_at']
+            self._etag = cached.get('etag')
+            self._last_modified = cached.get('last_modified')
+            self._stats['disk_loads'] += 1
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error reading station catalog from {self.cache_path}: {e}")
+
+    def _save_sidecar(self):
+        if not self.cache_path:
+            return
+        payload = {
+            'fetched_at': self._fetched_at,
+            'etag': self._etag,
+            'last_modified': self._last_modified,
+            'stations': self._stations,
+        }
+        tmp_path = self.cache_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.error(f"Error writing station catalog to {self.cache_path}: {e}")
@@ -0,0 +1,183 @@
+import difflib
+import re
+import unicodedata
+
+# Letters that Unicode decomposition does not reduce to an ASCII base letter
+_EXTRA_FOLDS = str.maketrans({'ł': 'l', 'Ł': 'l', 'ß': 'ss', 'ø': 'o', 'Ø': 'o', 'đ': 'd', 'Đ': 'd'})
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+SEARCH_FIELDS = ('station', 'city', 'commune', 'address')
+
+
+def normalize(text):
+    """
+    Fold text for diacritic- and case-insensitive comparison, e.g. "Łódź" -> "lodz".
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The lower-case ASCII form of the text with runs of whitespace collapsed.
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text.translate(_EXTRA_FOLDS))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    return ' '.join(text.split())
+
+
+def tokenize(text):
+    """
+    Split normalized text into alphanumeric tokens.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        list: A list of normalized tokens.
+    """
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _station_fields(station):
+    city = station.get('city') or {}
+    commune = city.get('commune') or {}
+    return {
+        'station': station.get('stationName'),
+        'city': city.get('name'),
+        'commune': ' '.join(filter(None, (commune.get('communeName'), commune.get('districtName'),
+                                          commune.get('provinceName')))),
+        'address': station.get('addressStreet'),
+    }
+
+
+class _FieldIndex:
+    """
+    Token trie and trigram postings for one text field of every station.
+    """
+    def __init__(self, texts):
+        self.texts = [normalize(text) for text in texts]
+        self.trie = {}
+        self.trigrams = {}
+        self.vocabulary = {}
+        for position, text in enumerate(self.texts):
+            for token in _TOKEN_RE.findall(text):
+                self.vocabulary.setdefault(token, set()).add(position)
+                node = self.trie
+                for ch in token:
+                    node = node.setdefault(ch, {'': set()})
+                    node[''].add(position)
+            for i in range(len(text) - 2):
+                self.trigrams.setdefault(text[i:i + 3], set()).add(position)
+
+    def prefix(self, token):
+        node = self.trie
+        for ch in token:
+            node = node.get(ch)
+            if node is None:
+                return set()
+        return node['']
+
+    def substring(self, text):
+        if len(text) < 3:
+            return {position for position, candidate in enumerate(self.texts) if text in candidate}
+        candidates = None
+        for i in range(len(text) - 2):
+            postings = self.trigrams.get(text[i:i + 3])
+            if not postings:
+                return set()
+            candidates = set(postings) if candidates is None else candidates & postings
+        return {position for position in candidates if text in self.texts[position]}
+
+    def fuzzy(self, token, cutoff):
+        positions = set()
+        for match in difflib.get_close_matches(token, self.vocabulary, n=5, cutoff=cutoff):
+            positions |= self.vocabulary[match]
+        return positions
+
+
+class StationIndex:
+    """
+    Search index over station names, city names, communes and addresses, built once per station list.
+    """
+    def __init__(self, stations):
+        """
+        Build the index.
+
+        Args:
+            stations (list): A list of station dictionaries as returned by get_station_list.
+        """
+        self.stations = list(stations)
+        per_station = [_station_fields(station) for station in self.stations]
+        self._fields = {field: _FieldIndex([values[field] for values in per_station]) for field in SEARCH_FIELDS}
+
+    def search(self, query, mode='substring', fields=SEARCH_FIELDS, limit=None, cutoff=0.75):
+        """
+        Find stations matching the query in any of the given fields.
+
+        Args:
+            query (str): The text to look for; case and Polish diacritics are ignored.
+            mode (str): 'prefix' (every query word starts a word of the field), 'substring'
+                        (the query occurs anywhere in the field) or 'fuzzy' (words within a small edit distance).
+            fields (tuple): The fields to search, a subset of SEARCH_FIELDS.
+            limit (int, optional): Maximum number of stations to return.
+            cutoff (float): Similarity threshold between 0 and 1 used by the 'fuzzy' mode.
+
+        Returns:
+            list: Matching station dictionaries in catalog order.
+        """
+        text = normalize(query)
+        tokens = _TOKEN_RE.findall(text)
+        if not tokens:
+            return []
+        positions = set()
+        for field in fields:
+            index = self._fields[field]
+            if mode == 'prefix':
+                matched = self._match_all(tokens, index.prefix)
+            elif mode == 'substring':
+                matched = index.substring(text)
+            elif mode == 'fuzzy':
+                matched = self._match_all(tokens, lambda token: index.fuzzy(token, cutoff))
+            else:
+                raise ValueError(f"Unknown search mode: {mode}")
+            positions |= matched
+        result = [self.stations[position] for position in sorted(positions)]
+        return result[:limit] if limit else result
+
+    def suggest_cities(self, query, limit=10):
+        """
+        Return city names for type-ahead, preferring cities whose name starts with the query.
+
+        Args:
+            query (str): The text typed so far.
+            limit (int): Maximum number of suggestions.
+
+        Returns:
+            list: Distinct city names in their original spelling.
+        """
+        text = normalize(query)
+        if not text:
+            return []
+        index = self._fields['city']
+        matched = sorted(index.substring(text))
+        starts = [position for position in matched if index.texts[position].startswith(text)]
+        contains = [position for position in matched if not index.texts[position].startswith(text)]
+        names = []
+        for position in starts + contains:
+            name = self.stations[position]['city']['name']
+            if name not in names:
+                names.append(name)
+                if len(names) == limit:
+                    break
+        return names
+
+    @staticmethod
+    def _match_all(tokens, lookup):
+        matched = None
+        for token in tokens:
+            positions = lookup(token)
+            matched = set(positions) if matched is None else matched & positions
+            if not matched:
+                return set()
+        return matched
@@ -0,0 +1,186 @@
+import queue
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+# Initialize the logger
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 4
+POLL_INTERVAL_MS = 16  # About one frame at 60 fps
+
+
+class TaskCancelled(Exception):
+    """
+    Raised inside a task by check_cancelled() once the task has been cancelled.
+    """
+
+
+class Task:
+    """
+    Handle of a submitted background task.
+    """
+    def __init__(self, name, executor):
+        self.name = name
+        self._executor = executor
+        self._cancelled = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """
+        Cancel the task: it is dropped if it has not started yet, and only its on_finally callback is called.
+        A running task stops early if it calls check_cancelled().
+        """
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            # It never ran, so report it finished here
+            self._executor._post(self, None, None)
+
+    def check_cancelled(self):
+        """
+        Raise TaskCancelled if the task was cancelled; call it between steps of long-running work.
+        """
+        if self.cancelled:
+            raise TaskCancelled(self.name)
+
+    def report_progress(self, done, total=None, message=None):
+        """
+        Report progress from the worker thread; the task's on_progress callback runs on the Tk thread.
+
+        Args:
+            done (int): Number of steps done.
+            total (int, optional): Total number of steps, None if unknown.
+            message (str, optional): A short description of the current step.
+        """
+        self._executor._post(self, 'on_progress', (done, total, message))
+
+
+class TaskExecutor:
+    """
+    Runs blocking work (HTTP requests, database writes) in a thread pool and delivers the results to the
+    Tk thread through a queue polled with after(), so callbacks may touch widgets safely.
+    """
+    def __init__(self, widget, max_workers=DEFAULT_MAX_WORKERS, poll_interval_ms=POLL_INTERVAL_MS):
+        """
+        Initialize the task executor.
+
+        Args:
+            widget: Any Tk widget; its after() method schedules polling on the Tk thread.
+            max_workers (int): Maximum number of tasks running at once.
+            poll_interval_ms (int): Interval between checks for finished tasks while tasks are pending.
+        """
+        self.widget = widget
+        self.poll_interval_ms = poll_interval_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tk-task')
+        self._results = queue.Queue()
+        self._callbacks = {}
+        self._by_key = {}
+        self._pending = 0
+        self._poll_job = None
+
+    def submit(self, function, *args, name=None, key=None, on_success=None, on_error=None, on_progress=None,
+               on_finally=None, pass_task=False):
+        """
+        Run function(*args) in the thread pool.
+
+        Args:
+            function (callable): The blocking function.
+            *args: Arguments for the function.
+            name (str, optional): Name used in log messages; defaults to the function's name.
+            key (str, optional): Submitting another task with the same key cancels this one, e.g. when the user
+                                 selects another station before the previous sensors arrived.
+            on_success (callable, optional): Called with the result on the Tk thread.
+            on_error (callable, optional): Called with the exception on the Tk thread; errors are logged otherwise.
+            on_progress (callable, optional): Called with (done, total, message) on the Tk thread.
+            on_finally (callable, optional): Called without arguments on the Tk thread once the task
+                                             succeeded, failed or was cancelled.
+            pass_task (bool): Pass the Task as the first argument, for progress reporting and cancellation checks.
+
+        Returns:
+            Task: The handle of the submitted task.
+        """
+        task = Task(name or getattr(function, '__name__', 'task'), self)
+        if key is not None:
+            previous = self._by_key.get(key)
+            if previous is not None:
+                previous.cancel()
+            self._by_key[key] = task
+        self._callbacks[task] = {'on_success': on_success, 'on_error': on_error, 'on_progress': on_progress,
+                                 'on_finally': on_finally, 'key': key}
+        call_args = (task,) + args if pass_task else args
+        self._pending += 1
+        task.future = self._pool.submit(self._run, task, function, call_args)
+        self._schedule_poll()
+        return task
+
+    def shutdown(self):
+        """
+        Cancel every pending task and stop the worker threads.
+        """
+        for task in list(self._callbacks):
+            task.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def poll(self):
+        """
+        Deliver the results that arrived since the last poll; runs on the Tk thread.
+        """
+        self._poll_job = None
+        while True:
+            try:
+                task, kind, payload = self._results.get_nowait()
+            except queue.Empty:
+                break
+            callbacks = self._callbacks.get(task)
+            if callbacks is None:
+                continue
+            if kind == 'on_progress':
+                if not task.cancelled and callbacks['on_progress']:
+                    callbacks['on_progress'](*payload)
+                continue
+            self._finish(task, callbacks)
+            try:
+                if task.cancelled or kind is None:
+                    continue
+                if kind == 'on_error':
+                    if callbacks['on_error']:
+                        callbacks['on_error'](payload)
+                    else:
+                        logger.error(f"Background task {task.name} failed: {payload}")
+                elif callbacks['on_success']:
+                    callbacks['on_success'](payload)
+            finally:
+                if callbacks['on_finally']:
+                    callbacks['on_finally']()
+        self._schedule_poll()
+
+    def _finish(self, task, callbacks):
+        del self._callbacks[task]
+        self._pending -= 1
+        if callbacks['key'] is not None and self._by_key.get(callbacks['key']) is task:
+            del self._by_key[callbacks['key']]
+
+    def _run(self, task, function, args):
+        if task.cancelled:
+            self._post(task, None, None)
+            return
+        try:
+            result = function(*args)
+        except TaskCancelled:
+            self._post(task, None, None)
+        except Exception as e:
+            self._post(task, 'on_error', e)
+        else:
+            self._post(task, 'on_success', result)
+
+    def _post(self, task, kind, payload):
+        self._results.put((task, kind, payload))
+
+    def _schedule_poll(self):
+        if self._pending and self._poll_job is None:
+            self._poll_job = self.widget.after(self.poll_interval_ms, self.poll)
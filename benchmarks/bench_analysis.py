@@ -0,0 +1,77 @@
+"""
+Analysis throughput of the original per-sensor pandas scans versus the vectorized analysis engine.
+
+Generates synthetic hourly series and analyses every sensor three ways: with the original analyze_data
+logic (repeated min/max/mask/mean scans per sensor, first/last trend only), with the same statistics
+as the engine computed per sensor in pandas, and with a single analyze_arrays call.
+
+Run from the repository root:
+    python -m benchmarks.bench_analysis [--points 10000000] [--sensors 100]
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from app.analysis_engine import analyze_arrays
+
+
+def legacy_analyze(df):
+    analysis = {}
+    if not df.empty:
+        analysis['min_value'] = df['value'].min()
+        analysis['min_date'] = df.loc[df['value'] == analysis['min_value'], 'date'].iloc[0]
+        analysis['max_value'] = df['value'].max()
+        analysis['max_date'] = df.loc[df['value'] == analysis['max_value'], 'date'].iloc[0]
+        analysis['mean_value'] = df['value'].mean()
+        analysis['trend'] = 'Increasing' if df['value'].iloc[-1] > df['value'].iloc[0] else 'Decreasing'
+    return analysis
+
+
+def pandas_analyze(df, norm):
+    values = df['value']
+    slope = np.polyfit(df['date'].astype('int64') / 86400e9, values, 1)[0]
+    return {
+        'min_value': values.min(), 'min_date': df['date'].iloc[values.argmin()],
+        'max_value': values.max(), 'max_date': df['date'].iloc[values.argmax()],
+        'mean_value': values.mean(), 'std_value': values.std(ddof=0), 'median_value': values.median(),
+        'percentiles': values.quantile([0.05, 0.25, 0.75, 0.95]).tolist(),
+        'slope_per_day': slope, 'exceedances': int((values > norm).sum()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--points', type=int, default=10_000_000)
+    parser.add_argument('--sensors', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    per_sensor = args.points // args.sensors
+    sensor_ids = np.repeat(np.arange(1, args.sensors + 1), per_sensor)
+    timestamps = np.tile(1704067200 + np.arange(per_sensor, dtype=np.int64) * 3600, args.sensors)
+    values = rng.gamma(2.0, 15.0, size=len(sensor_ids))
+    norms = {sensor_id: 50.0 for sensor_id in range(1, args.sensors + 1)}
+    print(f"{len(values):,} points, {args.sensors} sensors")
+
+    df = pd.DataFrame({'sensor_id': sensor_ids, 'date': pd.to_datetime(timestamps, unit='s'), 'value': values})
+    started = time.perf_counter()
+    for _, group in df.groupby('sensor_id', sort=False):
+        legacy_analyze(group)
+    legacy = time.perf_counter() - started
+    print(f"legacy analyze_data per sensor: {legacy:8.2f} s  (min/max/mean/first-last trend only)")
+
+    started = time.perf_counter()
+    for sensor_id, group in df.groupby('sensor_id', sort=False):
+        pandas_analyze(group, norms[sensor_id])
+    per_sensor_pandas = time.perf_counter() - started
+    print(f"same statistics, pandas/sensor: {per_sensor_pandas:8.2f} s")
+
+    started = time.perf_counter()
+    analyze_arrays(sensor_ids, timestamps, values, norms)
+    engine = time.perf_counter() - started
+    print(f"analysis engine, all sensors:   {engine:8.2f} s  (+ median, percentiles, std, regression, exceedances)")
+    print(f"speed-up for the same statistics: {per_sensor_pandas / engine:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""
+Load time of a sensor's series through read_data: SQLite versus a memory-mapped columnar export.
+
+Builds a database of hourly values, exports it with export_store and reads the full series, a one-month
+range and the daily means of one sensor through both backends. Each read opens a fresh ColumnarStore,
+so the columnar timings include mapping the files.
+
+Run from the repository root:
+    python -m benchmarks.bench_columnar [--sensors 20] [--years 5]
+"""
+import argparse
+import os
+import tempfile
+import time
+from app.columnar_store import ColumnarStore, export_store
+from app.connection_manager import get_manager
+from app.data_analyzer import read_data
+from app.db_manager import create_tables, to_epoch
+
+REPEATS = 5
+
+
+def build_db(db_path, sensor_count, hours):
+    start = to_epoch('2020-01-01 00:00:00')
+    with get_manager(db_path).writer() as conn:
+        create_tables(conn)
+        for sensor_id in range(1, sensor_count + 1):
+            conn.executemany('INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)',
+                             ((sensor_id, start + hour * 3600, float(hour % 97)) for hour in range(hours)))
+
+
+def timed(read):
+    best = float('inf')
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        rows = len(read())
+        best = min(best, time.perf_counter() - started)
+    return best, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=20)
+    parser.add_argument('--years', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'bench.db')
+        export_dir = os.path.join(tmp_dir, 'export')
+        build_db(db_path, args.sensors, args.years * 8760)
+        started = time.perf_counter()
+        with get_manager(db_path).reader() as conn:
+            exported = export_store(conn, export_dir)
+        print(f"exported {exported['rows']:,} rows of {exported['sensors']} sensors in {time.perf_counter() - started:.2f} s")
+
+        sensor_id = args.sensors // 2 or 1
+        cases = [('full series', None, None, None),
+                 ('one month', '2022-03-01', '2022-03-31 23:00:00', None),
+                 ('daily means', None, None, 'day')]
+        print(f"{'query':<12} {'rows':>7} {'sqlite':>10} {'columnar':>10} {'speed-up':>9}")
+        for label, start, end, resample in cases:
+            sqlite_time, rows = timed(lambda: read_data(db_path, sensor_id, start, end, resample))
+            columnar_time, _ = timed(lambda: read_data(db_path, sensor_id, start, end, resample,
+                                                       store=ColumnarStore(export_dir)))
+            print(f"{label:<12} {rows:>7} {sqlite_time * 1000:>8.2f}ms {columnar_time * 1000:>8.2f}ms "
+                  f"{sqlite_time / columnar_time:>8.1f}x")
+        get_manager(db_path).close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Peak and retained memory of a bulk measurement fetch, measured with tracemalloc: the original
+response.json() parse into per-point dictionaries versus streaming into MeasurementSeries.
+
+The HTTP layer is replaced by in-memory responses, so only parsing and the kept records are measured.
+
+Run from the repository root:
+    python -m benchmarks.bench_fetch_memory [--sensors 200] [--hours 8760]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+from app import data_fetcher
+from app.db_manager import from_epoch, to_epoch
+from app.measurement_series import CHUNK_SIZE
+
+logger = logging.getLogger('bench_fetch_memory')
+
+
+class FakeResponse:
+    """Serves a prepared body like a requests.Response, either whole or streamed in chunks."""
+
+    status_code = 200
+    encoding = 'utf-8'
+
+    def __init__(self, body):
+        self.content = body
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding)
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=CHUNK_SIZE):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def raise_for_status(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeClient:
+    def __init__(self, bodies):
+        self.bodies = bodies
+
+    def get(self, endpoint, path, headers=None, **kwargs):
+        return FakeResponse(self.bodies[int(path.rsplit('/', 1)[1])])
+
+
+def make_body(hours):
+    # Newest first, with an occasional missing value, like the API
+    start = to_epoch('2024-01-01 00:00:00')
+    values = [{'date': from_epoch(start + hour * 3600), 'value': round(10 + hour % 97 * 0.37, 2) if hour % 50 else None}
+              for hour in reversed(range(hours))]
+    return json.dumps({'key': 'PM10', 'values': values}).encode('utf-8')
+
+
+def legacy_get_measurement_data(sensor_id):
+    # The original implementation: whole-body parse, INFO log of the payload, then a converted copy
+    response = data_fetcher.get_client().get('measurements', f'/data/getData/{sensor_id}')
+    response.raise_for_status()
+    data = response.json()
+    logger.info(f"Raw measurement data: {data}")
+    values = []
+    for value in data['values']:
+        if value['value'] is not None:
+            measurement = {
+                'date': value['date'],
+                'value': float(value['value']),
+            }
+            values.append(measurement)
+    return {'values': values}
+
+
+def run(label, fetch, sensor_ids):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = [fetch(sensor_id) for sensor_id in sensor_ids]  # A bulk fetch holds a batch of series until it is stored
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<8} peak {peak / 2 ** 20:8.1f} MiB  retained {retained / 2 ** 20:8.1f} MiB  {elapsed:6.2f} s")
+    del kept
+    return peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=200)
+    parser.add_argument('--hours', type=int, default=24 * 365)
+    args = parser.parse_args()
+
+    # Send the legacy INFO lines to a null stream so the comparison measures formatting, not terminal speed
+    logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler(open(os.devnull, 'w'))], force=True)
+    body = make_body(args.hours)
+    sensor_ids = range(args.sensors)
+    data_fetcher.set_client(FakeClient({sensor_id: body for sensor_id in sensor_ids}))
+    print(f"{args.sensors} series of {args.hours} values, {len(body) / 2 ** 10:.0f} KiB per response")
+    before_peak, before_retained = run('before', legacy_get_measurement_data, sensor_ids)
+    after_peak, after_retained = run('after', data_fetcher.get_measurement_data, sensor_ids)
+    print(f"peak: {before_peak / after_peak:.1f}x lower, retained: {before_retained / after_retained:.1f}x lower")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Ingestion throughput: per-series insert_* calls as done before bulk ingestion versus insert_bulk.
+
+Run from the repository root:
+    python -m benchmarks.bench_ingest [--sensors 2000] [--hours 24]
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from app.db_manager import create_tables, insert_bulk
+
+logger = logging.getLogger('bench_ingest')
+
+# The original table layout the legacy code path wrote to
+LEGACY_SCHEMA = [
+    '''CREATE TABLE stations (id INTEGER PRIMARY KEY, stationName TEXT, city TEXT, longitude REAL, latitude REAL)''',
+    '''CREATE TABLE sensors (id INTEGER PRIMARY KEY, stationId INTEGER, paramName TEXT)''',
+    '''CREATE TABLE measurements (id INTEGER PRIMARY KEY AUTOINCREMENT, sensorId INTEGER, stationId INTEGER,
+                                paramName TEXT, stationName TEXT, value REAL, date TEXT, historical_value REAL,
+                                historical_value_date TEXT, UNIQUE(sensorId, date))''',
+]
+
+
+def create_legacy_tables(conn):
+    for statement in LEGACY_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+
+
+def make_series(sensor_count, hours):
+    series = []
+    for sensor_id in range(1, sensor_count + 1):
+        station_id = (sensor_id - 1) // 5 + 1
+        station = {'id': station_id, 'stationName': f'Station {station_id}', 'city': {'name': 'City'},
+                   'gegrLon': 19.0, 'gegrLat': 52.0}
+        sensor = {'id': sensor_id, 'stationId': station_id, 'param': {'paramName': 'PM10'}}
+        values = [{'date': f'2024-06-{1 + hour // 24:02d} {hour % 24:02d}:00:00', 'value': float(hour)}
+                  for hour in range(hours)]
+        series.append((station, sensor, {'values': values}))
+    return series
+
+
+def legacy_ingest(conn, series):
+    # The pre-bulk code path: one commit per station, sensor and series, one execute and INFO log line per value
+    for station, sensor, measurement_data in series:
+        c = conn.cursor()
+        logger.info(f"Inserting station: {station}")
+        c.execute('''INSERT OR IGNORE INTO stations (id, stationName, city, longitude, latitude)
+                     VALUES (?, ?, ?, ?, ?)''',
+                  (station['id'], station['stationName'], station['city']['name'], station['gegrLon'], station['gegrLat']))
+        conn.commit()
+        logger.info(f"Inserting sensor: {sensor}")
+        c.execute('''INSERT OR IGNORE INTO sensors (id, stationId, paramName) VALUES (?, ?, ?)''',
+                  (sensor['id'], sensor['stationId'], sensor['param']['paramName']))
+        conn.commit()
+        logger.info(f"Inserting measurement for sensor_id {sensor['id']}: {measurement_data}")
+        for value in measurement_data['values']:
+            logger.info(f"Processing value: {value}")
+            c.execute('''INSERT OR REPLACE INTO measurements (sensorId, stationId, paramName, stationName, value, date, historical_value, historical_value_date)
+                         VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+                      (sensor['id'], station['id'], sensor['param']['paramName'], station['stationName'],
+                       value['value'], value['date'], None, None))
+        conn.commit()
+
+
+def run(label, ingest, series, setup=create_tables):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        conn = sqlite3.connect(os.path.join(tmp_dir, 'bench.db'))
+        setup(conn)
+        started = time.perf_counter()
+        ingest(conn, series)
+        elapsed = time.perf_counter() - started
+        rows = conn.execute('SELECT COUNT(*) FROM measurements').fetchone()[0]
+        conn.close()
+    print(f"{label:<8} {rows:>9} rows {elapsed:8.2f} s {rows / elapsed:12,.0f} rows/s")
+    return rows / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=2000)
+    parser.add_argument('--hours', type=int, default=24)
+    args = parser.parse_args()
+
+    # Send the legacy INFO lines to a null stream so the comparison measures formatting, not terminal speed
+    logging.basicConfig(level=logging.INFO, handlers=[logging.StreamHandler(open(os.devnull, 'w'))], force=True)
+    series = make_series(args.sensors, args.hours)
+    before = run('before', legacy_ingest, series, setup=create_legacy_tables)
+    after = run('after', lambda conn, s: insert_bulk(conn, series=s), series)
+    print(f"speed-up: {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Time to build a day of hourly IDW grids for all of Poland: recomputing the distance weights for every hour
+versus the precomputed weight matrix of IDWInterpolator, and rendering the PNG heatmaps.
+
+Stations are scattered uniformly over the country and a tenth of the hourly values are missing.
+
+Run from the repository root:
+    python -m benchmarks.bench_interpolation [--stations 300] [--hours 24] [--cell-km 2]
+"""
+import argparse
+import tempfile
+import time
+import numpy as np
+from app.interpolation import POLAND_BBOX, IDWInterpolator, make_grid, save_heatmaps
+
+
+def per_hour(station_lats, station_lons, cell_lats, cell_lons, values):
+    # Without reuse: each hour builds the weights of the stations that reported
+    grids = []
+    for hour in range(values.shape[1]):
+        present = ~np.isnan(values[:, hour])
+        interpolator = IDWInterpolator(station_lats[present], station_lons[present], cell_lats, cell_lons)
+        grids.append(interpolator.interpolate(values[present, hour]))
+    return np.array(grids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stations', type=int, default=300)
+    parser.add_argument('--hours', type=int, default=24)
+    parser.add_argument('--cell-km', type=float, default=2.0)
+    args = parser.parse_args()
+
+    generator = np.random.default_rng(1)
+    min_lat, min_lon, max_lat, max_lon = POLAND_BBOX
+    station_lats = generator.uniform(min_lat, max_lat, args.stations)
+    station_lons = generator.uniform(min_lon, max_lon, args.stations)
+    values = generator.gamma(2.0, 10.0, (args.stations, args.hours))
+    values[generator.random(values.shape) < 0.1] = np.nan
+    lats, lons = make_grid(POLAND_BBOX, args.cell_km)
+    cell_lats, cell_lons = (grid.ravel() for grid in np.meshgrid(lats, lons, indexing='ij'))
+    print(f"{args.stations} stations, {args.hours} hours, {len(lats)}x{len(lons)} cells of {args.cell_km:g} km")
+
+    started = time.perf_counter()
+    before = per_hour(station_lats, station_lons, cell_lats, cell_lons, values)
+    before_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    interpolator = IDWInterpolator(station_lats, station_lons, cell_lats, cell_lons)
+    weights_time = time.perf_counter() - started
+    after = interpolator.interpolate(values)
+    after_time = time.perf_counter() - started
+    assert np.allclose(before, after, rtol=1e-3, equal_nan=True)
+    print(f"per-hour weights   {before_time:7.2f} s")
+    print(f"precomputed        {after_time:7.2f} s  (weights {weights_time:.2f} s)  {before_time / after_time:.1f}x")
+
+    result = {'times': np.datetime64('2024-06-01T00', 'h') + np.arange(args.hours).astype('timedelta64[h]'),
+              'lats': lats, 'lons': lons, 'grids': after.reshape(args.hours, len(lats), len(lons)),
+              'bbox': POLAND_BBOX, 'stations': [{'latitude': lat, 'longitude': lon}
+                                                 for lat, lon in zip(station_lats, station_lons)]}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        started = time.perf_counter()
+        save_heatmaps(tmp_dir, result, 'PM2.5')
+        print(f"PNG heatmaps       {time.perf_counter() - started:7.2f} s")
+
+
+if __name__ == '__main__':
+    main()
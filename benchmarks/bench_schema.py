@@ -0,0 +1,96 @@
+"""
+Storage size and query latency of the original measurements layout versus the compact schema.
+
+Builds a database in the original layout, copies it, migrates the copy in place with create_tables
+and compares file sizes (after VACUUM) and the per-sensor queries used by the analysis screens.
+
+Run from the repository root:
+    python -m benchmarks.bench_schema [--sensors 200] [--days 90]
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from benchmarks.bench_ingest import create_legacy_tables
+from app.db_manager import create_tables, to_epoch, from_epoch
+
+REPEATS = 50
+
+
+def build_legacy_db(path, sensor_count, days):
+    conn = sqlite3.connect(path)
+    create_legacy_tables(conn)
+    start = to_epoch('2024-01-01 00:00:00')
+    for sensor_id in range(1, sensor_count + 1):
+        station_id = (sensor_id - 1) // 5 + 1
+        conn.executemany(
+            '''INSERT INTO measurements (sensorId, stationId, paramName, stationName, value, date)
+               VALUES (?, ?, ?, ?, ?, ?)''',
+            ((sensor_id, station_id, 'pył zawieszony PM10', f'Station {station_id}, ul. Długa', float(hour % 97),
+              from_epoch(start + hour * 3600)) for hour in range(days * 24)))
+    conn.commit()
+    conn.execute('VACUUM')
+    conn.close()
+
+
+def timed(conn, query, params):
+    started = time.perf_counter()
+    for _ in range(REPEATS):
+        conn.execute(query, params).fetchall()
+    return (time.perf_counter() - started) / REPEATS * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sensors', type=int, default=200)
+    parser.add_argument('--days', type=int, default=90)
+    args = parser.parse_args()
+
+    sensor_id = args.sensors // 2
+    day_start, day_end = to_epoch('2024-02-01 00:00:00'), to_epoch('2024-02-01 23:00:00')
+    queries = {
+        'full series': (
+            'SELECT date, value FROM measurements WHERE sensorId = ? ORDER BY date', (sensor_id,),
+            'SELECT ts, value FROM measurements WHERE sensorId = ? ORDER BY ts', (sensor_id,)),
+        'one day': (
+            'SELECT date, value FROM measurements WHERE sensorId = ? AND date BETWEEN ? AND ?',
+            (sensor_id, from_epoch(day_start), from_epoch(day_end)),
+            'SELECT ts, value FROM measurements WHERE sensorId = ? AND ts BETWEEN ? AND ?',
+            (sensor_id, day_start, day_end)),
+        'date range': (
+            'SELECT MIN(date), MAX(date), COUNT(*) FROM measurements WHERE sensorId = ?', (sensor_id,),
+            'SELECT MIN(ts), MAX(ts), COUNT(*) FROM measurements WHERE sensorId = ?', (sensor_id,)),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        legacy_path = os.path.join(tmp_dir, 'legacy.db')
+        compact_path = os.path.join(tmp_dir, 'compact.db')
+        build_legacy_db(legacy_path, args.sensors, args.days)
+        shutil.copy(legacy_path, compact_path)
+
+        conn = sqlite3.connect(compact_path)
+        started = time.perf_counter()
+        create_tables(conn)
+        migration_seconds = time.perf_counter() - started
+        conn.execute('VACUUM')
+        conn.close()
+
+        legacy_size, compact_size = os.path.getsize(legacy_path), os.path.getsize(compact_path)
+        rows = args.sensors * args.days * 24
+        print(f"{rows:,} measurements, migration took {migration_seconds:.2f} s")
+        print(f"file size     legacy {legacy_size / 2**20:8.1f} MiB   compact {compact_size / 2**20:8.1f} MiB"
+              f"   ({compact_size / legacy_size:.0%})")
+
+        legacy, compact = sqlite3.connect(legacy_path), sqlite3.connect(compact_path)
+        for label, (legacy_query, legacy_params, compact_query, compact_params) in queries.items():
+            before = timed(legacy, legacy_query, legacy_params)
+            after = timed(compact, compact_query, compact_params)
+            print(f"{label:<12}  legacy {before:8.3f} ms   compact {after:8.3f} ms   ({before / after:.1f}x)")
+        legacy.close()
+        compact.close()
+
+
+if __name__ == '__main__':
+    main()
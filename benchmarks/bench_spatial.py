@@ -0,0 +1,57 @@
+"""
+Query time of SpatialIndex against a linear haversine scan of every station.
+
+Stations are scattered uniformly over Poland; each query point is another random point in the country.
+
+Run from the repository root:
+    python -m benchmarks.bench_spatial [--stations 300] [--queries 2000]
+"""
+import argparse
+import random
+import time
+from app.spatial_index import SpatialIndex, haversine_km
+
+
+def random_stations(count, generator):
+    return [{'id': i, 'gegrLat': generator.uniform(49.0, 54.9), 'gegrLon': generator.uniform(14.1, 24.2)}
+            for i in range(count)]
+
+
+def linear_nearest(stations, lat, lon, k):
+    return sorted(stations, key=lambda s: haversine_km(lat, lon, s['gegrLat'], s['gegrLon']))[:k]
+
+
+def linear_radius(stations, lat, lon, radius_km):
+    return [s for s in stations if haversine_km(lat, lon, s['gegrLat'], s['gegrLon']) <= radius_km]
+
+
+def per_query(run, points):
+    started = time.perf_counter()
+    for lat, lon in points:
+        run(lat, lon)
+    return (time.perf_counter() - started) / len(points)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--stations', type=int, default=300)
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    generator = random.Random(1)
+    stations = random_stations(args.stations, generator)
+    points = [(generator.uniform(49.0, 54.9), generator.uniform(14.1, 24.2)) for _ in range(args.queries)]
+    started = time.perf_counter()
+    index = SpatialIndex(stations)
+    print(f"{args.stations} stations, index built in {(time.perf_counter() - started) * 1000:.1f} ms")
+    cases = [('5 nearest', lambda lat, lon: linear_nearest(stations, lat, lon, 5), lambda lat, lon: index.nearest(lat, lon, 5)),
+             ('within 25 km', lambda lat, lon: linear_radius(stations, lat, lon, 25),
+              lambda lat, lon: index.within_radius(lat, lon, 25))]
+    print(f"{'query':<13} {'linear':>10} {'index':>10} {'speed-up':>9}")
+    for label, linear, indexed in cases:
+        linear_time, index_time = per_query(linear, points), per_query(indexed, points)
+        print(f"{label:<13} {linear_time * 1e6:>8.1f}us {index_time * 1e6:>8.1f}us {linear_time / index_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
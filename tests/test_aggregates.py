@@ -0,0 +1,79 @@
+import sqlite3
+import unittest
+import numpy as np
+from app.aggregates import bucket_starts, range_stats, rebuild_aggregates, time_span
+from app.db_manager import create_tables, insert_bulk, to_epoch
+
+STATION = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+SENSOR = {'id': 1, 'stationId': 1, 'param': {'paramName': 'PM10'}}
+
+
+class TestAggregates(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        create_tables(self.conn)
+        rng = np.random.default_rng(3)
+        self.ts = to_epoch('2024-01-30 00:00:00') + np.arange(24 * 70) * 3600
+        self.values = np.round(rng.gamma(2.0, 15.0, len(self.ts)), 1)
+        data = {'values': [{'date': f'{np.datetime64(int(ts), "s").item():%Y-%m-%d %H:%M:%S}', 'value': float(value)}
+                           for ts, value in zip(self.ts, self.values)]}
+        insert_bulk(self.conn, series=[(STATION, SENSOR, data)])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def assert_matches_raw(self, start_ts, end_ts):
+        mask = (self.ts >= start_ts) & (self.ts <= end_ts)
+        values, ts = self.values[mask], self.ts[mask]
+        stats = range_stats(self.conn, 1, start_ts, end_ts)
+        self.assertEqual(stats['count'], len(values))
+        self.assertAlmostEqual(stats['mean_value'], values.mean())
+        self.assertAlmostEqual(stats['std_value'], values.std(), places=6)
+        self.assertEqual(stats['min_value'], values.min())
+        self.assertEqual(stats['min_ts'], ts[values.argmin()])
+        self.assertEqual(stats['max_ts'], ts[values.argmax()])
+        if len(values) > 1:
+            slope = np.polyfit(ts / 86400.0 - ts[0] / 86400.0, values, 1)[0]
+            self.assertAlmostEqual(stats['slope_per_day'], slope, places=6)
+
+    def test_time_span_and_bucket_pages(self):
+        self.assertEqual(time_span(self.conn, 1), {'first_ts': int(self.ts[0]), 'last_ts': int(self.ts[-1]),
+                                                   'count': len(self.ts)})
+        self.assertIsNone(time_span(self.conn, 2))
+        months = bucket_starts(self.conn, 1, 'month')
+        self.assertEqual(months, [to_epoch(f'2024-{month:02d}-01') for month in (1, 2, 3, 4)])
+        days = bucket_starts(self.conn, 1, 'day', months[1], months[2])
+        self.assertEqual(len(days), 29)
+        self.assertEqual(len(bucket_starts(self.conn, 1, 'hour', days[0], days[0] + 86400)), 24)
+        with self.assertRaises(ValueError):
+            bucket_starts(self.conn, 1, 'week')
+
+    def test_ranges_combine_buckets_and_raw_edges(self):
+        self.assert_matches_raw(to_epoch('2024-01-30 05:30:00'), to_epoch('2024-04-02 17:10:00'))
+        self.assert_matches_raw(to_epoch('2024-02-01 00:00:00'), to_epoch('2024-02-29 23:00:00'))
+        self.assert_matches_raw(to_epoch('2024-03-03 02:00:00'), to_epoch('2024-03-03 02:00:00'))
+        self.assert_matches_raw(int(self.ts[0]), int(self.ts[-1]))
+
+    def test_ingest_refreshes_touched_buckets(self):
+        revised = {'values': [{'date': '2024-02-15 10:00:00', 'value': 999.0}]}
+        counts = insert_bulk(self.conn, series=[(STATION, SENSOR, revised)])
+        self.assertEqual(counts['updated'], 1)
+        self.values[self.ts == to_epoch('2024-02-15 10:00:00')] = 999.0
+        self.assert_matches_raw(int(self.ts[0]), int(self.ts[-1]))
+        month = self.conn.execute("SELECT maxValue, maxTs FROM measurement_aggregates WHERE grain = 'month' "
+                                  "AND bucketTs = ?", (to_epoch('2024-02-01'),)).fetchone()
+        self.assertEqual(month, (999.0, to_epoch('2024-02-15 10:00:00')))
+
+    def test_rebuild_matches_incremental(self):
+        query = "SELECT * FROM measurement_aggregates ORDER BY sensorId, grain, bucketTs"
+        incremental = self.conn.execute(query).fetchall()
+        rebuild_aggregates(self.conn)
+        self.assertEqual(self.conn.execute(query).fetchall(), incremental)
+
+    def test_empty_range(self):
+        self.assertEqual(range_stats(self.conn, 1, to_epoch('2020-01-01'), to_epoch('2020-02-01')), {})
+        self.assertEqual(range_stats(self.conn, 2), {})
+
+if __name__ == '__main__':
+    unittest.main()
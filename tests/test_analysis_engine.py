@@ -0,0 +1,52 @@
+import unittest
+import numpy as np
+import pandas as pd
+from app.analysis_engine import analyze_arrays, analyze_frame, norm_for
+
+
+class TestAnalysisEngine(unittest.TestCase):
+
+    def test_matches_numpy_per_sensor(self):
+        rng = np.random.default_rng(0)
+        sensor_ids = np.repeat([3, 1, 2], 500)
+        timestamps = np.tile(np.arange(500) * 3600, 3)
+        values = rng.gamma(2.0, 20.0, size=1500)
+        result = analyze_arrays(sensor_ids, timestamps, values, norms={1: 50.0}).set_index('sensor_id')
+        self.assertEqual(list(result.index), [1, 2, 3])
+        for sensor_id in (1, 2, 3):
+            sensor_values = values[sensor_ids == sensor_id]
+            row = result.loc[sensor_id]
+            self.assertAlmostEqual(row['mean_value'], sensor_values.mean())
+            self.assertAlmostEqual(row['std_value'], sensor_values.std())
+            self.assertAlmostEqual(row['median_value'], np.median(sensor_values))
+            self.assertAlmostEqual(row['p95'], np.percentile(sensor_values, 95))
+            self.assertEqual(row['min_ts'], timestamps[sensor_ids == sensor_id][sensor_values.argmin()])
+            self.assertEqual(row['max_value'], sensor_values.max())
+        self.assertEqual(result.loc[1, 'exceedances'], int((values[sensor_ids == 1] > 50.0).sum()))
+        self.assertEqual(result.loc[2, 'exceedances'], 0)
+
+    def test_trend_uses_least_squares_significance(self):
+        hours = np.arange(200)
+        noise = np.random.default_rng(1).normal(0, 1, 200)
+        rising = analyze_arrays(np.zeros(200), hours * 3600, hours * 0.5 + noise).iloc[0]
+        self.assertEqual(rising['trend'], 'Increasing')
+        self.assertAlmostEqual(rising['slope_per_day'], 12.0, delta=0.5)
+        flat = analyze_arrays(np.zeros(200), hours * 3600, noise).iloc[0]
+        self.assertEqual(flat['trend'], 'No significant trend')
+
+    def test_analyze_frame_returns_dates_and_ignores_missing_values(self):
+        df = pd.DataFrame({'sensor_id': [7, 7, 7], 'date': pd.date_range('2024-06-01', periods=3, freq='h'),
+                           'value': [5.0, np.nan, 1.0]})
+        row = analyze_frame(df).iloc[0]
+        self.assertEqual(row['count'], 2)
+        self.assertEqual(row['min_date'], pd.Timestamp('2024-06-01 02:00'))
+        self.assertEqual(row['max_date'], pd.Timestamp('2024-06-01 00:00'))
+
+    def test_norm_for_codes_and_names(self):
+        self.assertEqual(norm_for('PM10'), 50.0)
+        self.assertEqual(norm_for('pył zawieszony PM2.5'), 25.0)
+        self.assertEqual(norm_for('dwutlenek azotu'), 200.0)
+        self.assertIsNone(norm_for('temperatura'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from app.aq_index import index_row, index_history, latest_indexes, read_index, store_indexes
+from app.connection_manager import get_manager
+from app.db_manager import create_tables, from_epoch, insert_bulk, to_epoch
+
+STATION = {'id': 400, 'stationName': 'Kraków, Aleja Krasińskiego', 'gegrLat': '50.057678', 'gegrLon': '19.926189',
+           'city': {'id': 415, 'name': 'Kraków'}}
+
+
+def make_index(calc_date, level=1):
+    return {'id': 400, 'stCalcDate': calc_date, 'stSourceDataDate': calc_date,
+            'stIndexLevel': {'id': level, 'indexLevelName': 'Dobry'}, 'stIndexCrParam': 'PYL',
+            'pm10IndexLevel': {'id': level, 'indexLevelName': 'Dobry'}, 'no2IndexLevel': {'id': 0},
+            'so2IndexLevel': None, 'o3IndexLevel': {'id': -1, 'indexLevelName': 'Brak indeksu'}}
+
+
+class TestAqIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(':memory:')
+        create_tables(self.conn)
+        insert_bulk(self.conn, stations=[STATION])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_index_row_reads_levels_and_dates(self):
+        row = index_row(400, make_index('2024-06-01 13:20:13', level=2))
+        self.assertEqual(row[:5], (400, to_epoch('2024-06-01 13:20:13'), to_epoch('2024-06-01 13:20:13'), 2, 'PYL'))
+        so2, no2, co, pm10, pm25, o3, c6h6 = row[5:]
+        self.assertEqual((so2, no2, co, pm10, pm25, o3, c6h6), (None, 0, None, 2, None, None, None))
+        self.assertEqual(index_row(400, dict(make_index('2024-06-01 13:20:13'), stCalcDate=1717248013000))[1],
+                         1717248013)
+        self.assertIsNone(index_row(400, {'stCalcDate': None}))
+
+    def test_store_skips_calculations_already_stored(self):
+        first = store_indexes(self.conn, [(400, make_index('2024-06-01 13:20:13')), (401, None)])
+        self.assertEqual(first, {'inserted': 1, 'skipped': 0, 'invalid': 1})
+        second = store_indexes(self.conn, [(400, make_index('2024-06-01 13:20:13')),
+                                           (400, make_index('2024-06-01 14:20:13', level=3))])
+        self.assertEqual(second, {'inserted': 1, 'skipped': 1, 'invalid': 0})
+
+    def test_latest_and_history(self):
+        store_indexes(self.conn, [(400, make_index(f'2024-06-01 {hour:02d}:20:00', level=hour % 6))
+                                  for hour in range(10, 14)])
+        store_indexes(self.conn, [(401, make_index('2024-06-01 09:20:00'))])
+        latest = latest_indexes(self.conn)
+        self.assertEqual([record['stationId'] for record in latest], [400, 401])
+        self.assertEqual(latest[0]['calcDate'], from_epoch(to_epoch('2024-06-01 13:20:00')))
+        self.assertEqual(latest[0]['indexLevelName'], 'Dobry')
+        self.assertEqual(latest[0]['city'], 'Kraków')
+        self.assertIsNone(latest[1]['city'])
+        self.assertEqual([record['stationId'] for record in latest_indexes(self.conn, [401])], [401])
+
+        history = index_history(self.conn, 400, start_ts=to_epoch('2024-06-01 11:00:00'))
+        self.assertEqual([record['indexLevel'] for record in history], [5, 0, 1])
+
+    def test_read_index_as_time_series(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            with get_manager(db_path).writer() as conn:
+                create_tables(conn)
+                store_indexes(conn, [(400, make_index(f'2024-06-01 {hour:02d}:20:00')) for hour in (14, 12, 13)])
+            df = read_index(db_path, 400, start='2024-06-01 13:00:00')
+            get_manager(db_path).close()
+        self.assertEqual(list(df['date'].dt.hour), [13, 14])
+        self.assertEqual(list(df['pm10Level']), [1, 1])
+        self.assertTrue(df['so2Level'].isna().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+from app.bulk_fetcher import BulkFetcher, BulkFetchReport, RateLimiter
+
+SENSORS = {
+    1: [{'id': 11, 'stationId': 1, 'param': {'paramName': 'pył zawieszony PM10', 'paramCode': 'PM10'}},
+        {'id': 12, 'stationId': 1, 'param': {'paramName': 'dwutlenek azotu', 'paramCode': 'NO2'}}],
+    2: [{'id': 21, 'stationId': 2, 'param': {'paramName': 'pył zawieszony PM10', 'paramCode': 'PM10'}}],
+}
+
+
+def fake_sensors(station_id):
+    return SENSORS.get(station_id)
+
+
+def fake_measurements(sensor_id):
+    if sensor_id == 12:
+        return None
+    return {'values': [{'date': '2024-06-01 13:00:00', 'value': float(sensor_id)}]}
+
+
+@patch('app.bulk_fetcher.get_measurement_data', side_effect=fake_measurements)
+@patch('app.bulk_fetcher.get_sensors_for_station', side_effect=fake_sensors)
+class TestBulkFetcher(unittest.TestCase):
+
+    def test_streams_results_and_reports_partial_failures(self, mock_sensors, mock_measurements):
+        report = BulkFetchReport()
+        results = list(BulkFetcher(max_workers=4, rate=None).iter_station_measurements([1, 2, 3], report=report))
+        self.assertEqual(sorted(result['sensor']['id'] for result in results), [11, 21])
+        self.assertEqual(report.stations_ok, 2)
+        self.assertEqual(report.stations_failed, 1)
+        self.assertEqual(report.sensors_ok, 2)
+        self.assertIn({'kind': 'sensor', 'id': 12}, report.failures)
+        self.assertIn({'kind': 'station', 'id': 3}, report.failures)
+
+    def test_unexpected_errors_are_reported_as_failures(self, mock_sensors, mock_measurements):
+        def broken_measurements(sensor_id):
+            if sensor_id == 11:
+                raise KeyError('values')
+            return fake_measurements(sensor_id)
+
+        mock_measurements.side_effect = broken_measurements
+        report = BulkFetchReport()
+        results = list(BulkFetcher(rate=None).iter_station_measurements([1, 2], report=report))
+        self.assertEqual([result['sensor']['id'] for result in results], [21])
+        self.assertEqual(report.sensors_failed, 2)
+        self.assertIn({'kind': 'sensor', 'id': 11}, report.failures)
+
+    def test_param_codes_filter_sensors(self, mock_sensors, mock_measurements):
+        stations = [{'id': 1, 'stationName': 'A'}, {'id': 2, 'stationName': 'B'}]
+        results = list(BulkFetcher(rate=None).iter_station_measurements(stations, param_codes={'NO2'}))
+        self.assertEqual(results, [])
+        self.assertEqual(mock_measurements.call_args_list[0].args, (12,))
+
+    def test_results_carry_station_dictionary(self, mock_sensors, mock_measurements):
+        station = {'id': 2, 'stationName': 'B'}
+        result = next(BulkFetcher(rate=None).iter_station_measurements([station]))
+        self.assertIs(result['station'], station)
+        self.assertEqual(result['data']['values'][0]['value'], 21.0)
+
+    @patch('app.bulk_fetcher.get_air_quality_index')
+    def test_air_quality_indexes(self, mock_index, mock_sensors, mock_measurements):
+        mock_index.side_effect = lambda station_id: {'id': station_id} if station_id != 3 else None
+        report = BulkFetchReport()
+        station = {'id': 2, 'stationName': 'B'}
+        results = list(BulkFetcher(max_workers=2, rate=None).iter_air_quality_indexes([1, station, 3], report))
+        self.assertEqual(sorted(result['index']['id'] for result in results), [1, 2])
+        self.assertIs(next(result for result in results if result['station_id'] == 2)['station'], station)
+        self.assertEqual((report.indexes_ok, report.indexes_failed), (2, 1))
+        self.assertEqual(report.failures, [{'kind': 'aq_index', 'id': 3}])
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_waits_once_burst_is_used(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        limiter = RateLimiter(rate=2, burst=2, clock=lambda: now[0], sleep=sleep)
+        for _ in range(4):
+            limiter.acquire()
+        self.assertEqual(sleeps, [0.5, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from app import cli
+from app.connection_manager import get_manager
+from app.db_manager import create_tables, to_epoch
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATION = {'id': 400, 'stationName': 'Kraków, Aleja Krasińskiego', 'gegrLat': '50.057678', 'gegrLon': '19.926189',
+           'city': {'id': 415, 'name': 'Kraków', 'commune': {'communeName': 'Kraków', 'provinceName': 'MAŁOPOLSKIE'}},
+           'addressStreet': 'al. Krasińskiego'}
+SENSOR = {'id': 2747, 'stationId': 400, 'param': {'paramName': 'pył zawieszony PM10', 'paramCode': 'PM10'}}
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'test.db')
+
+    def tearDown(self):
+        get_manager(self.db_path).close()
+        self.tmp_dir.cleanup()
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        sys_stdout, sys.stdout = sys.stdout, out
+        try:
+            status = cli.main(list(argv) + ['--db', self.db_path])
+        finally:
+            sys.stdout = sys_stdout
+        return status, out.getvalue()
+
+    def write_series(self):
+        values = [{'date': f'2024-06-01 {hour:02d}:00:00', 'value': float(hour)} for hour in range(24)]
+        path = os.path.join(self.tmp_dir.name, 'series.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump([{'station': STATION, 'sensor': SENSOR, 'data': {'values': values}}], f)
+        return path
+
+    def test_import_does_not_load_gui_or_plotting_modules(self):
+        code = "import sys, app.cli; print(sorted(m for m in ('tkinter', 'matplotlib') if m in sys.modules))"
+        result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                                check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+    def test_ingest_then_analyze(self):
+        status, output = self.run_cli('ingest', '--input', self.write_series())
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output)[0]['inserted'], 24)
+
+        status, output = self.run_cli('analyze', '2747', '--start', '2024-06-01 06:00:00')
+        self.assertEqual(status, 0)
+        analysis, = json.loads(output)
+        self.assertEqual(analysis['sensor_id'], 2747)
+        self.assertEqual(analysis['count'], 18)
+        self.assertEqual(analysis['min_value'], 6.0)
+        self.assertEqual(analysis['max_date'], '2024-06-01 23:00:00')
+
+    def test_analyze_csv_from_aggregates(self):
+        self.run_cli('ingest', '--input', self.write_series())
+        status, output = self.run_cli('analyze', '2747', '--aggregates', '--format', 'csv')
+        self.assertEqual(status, 0)
+        header, row = output.strip().split('\n')
+        record = dict(zip(header.split(','), row.split(',')))
+        self.assertEqual(record['count'], '24')
+        self.assertEqual(float(record['mean_value']), 11.5)
+
+    def test_analyze_unknown_sensor_fails(self):
+        with get_manager(self.db_path).writer() as conn:
+            create_tables(conn)
+        status, output = self.run_cli('analyze', '1')
+        self.assertEqual(status, 1)
+        self.assertEqual(json.loads(output), [])
+
+    def test_compare_selected_by_param_and_city(self):
+        self.run_cli('ingest', '--input', self.write_series())
+        with get_manager(self.db_path).writer() as conn:
+            conn.execute("INSERT INTO sensors (id, stationId, paramName) VALUES (2748, 400, 'pył zawieszony PM10')")
+            conn.executemany("INSERT INTO measurements (sensorId, ts, value) VALUES (2748, ?, ?)",
+                             [(to_epoch(f'2024-06-01 {hour:02d}:00:00'), 100.0 - hour) for hour in range(24)])
+        image_path = os.path.join(self.tmp_dir.name, 'compare.png')
+        status, output = self.run_cli('compare', '--param', 'PM10', '--city', 'kraków', '--plot', image_path)
+        self.assertEqual(status, 0)
+        self.assertEqual([record['sensor_id'] for record in json.loads(output)], [2747, 2748])
+        self.assertTrue(os.path.getsize(image_path))
+
+        status, output = self.run_cli('compare', '2747', '2748', '--correlation', '--format', 'csv')
+        header, first, second = output.strip().split('\n')
+        self.assertEqual(header, 'sensor_id,2747,2748')
+        self.assertEqual(float(first.split(',')[2]), -1.0)
+
+    def test_interpolate_grid_and_point(self):
+        self.run_cli('ingest', '--input', self.write_series())
+        status, output = self.run_cli('interpolate', 'PM10', '--start', '2024-06-01 10:00:00', '--end',
+                                      '2024-06-01 11:00:00', '--bbox', '49.5', '19.5', '50.5', '20.5', '--cell-km', '20')
+        self.assertEqual(status, 0)
+        records = json.loads(output)
+        self.assertEqual([record['date'] for record in records], ['2024-06-01 10:00:00', '2024-06-01 11:00:00'])
+        self.assertAlmostEqual(records[1]['mean'], 11.0, places=4)
+
+        status, output = self.run_cli('interpolate', 'PM10', '--start', '2024-06-01 14:00:00', '--at', '50.0', '20.0')
+        point, = json.loads(output)
+        self.assertAlmostEqual(point['value'], 14.0, places=4)
+
+    def test_export_import_and_analyze_from_store(self):
+        self.run_cli('ingest', '--input', self.write_series())
+        export_dir = os.path.join(self.tmp_dir.name, 'export')
+        status, output = self.run_cli('export', export_dir)
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output)[0]['rows'], 24)
+
+        status, output = self.run_cli('analyze', '2747', '--store', export_dir, '--end', '2024-06-01 11:00:00')
+        self.assertEqual(json.loads(output)[0]['count'], 12)
+
+        other_db = os.path.join(self.tmp_dir.name, 'other.db')
+        out = io.StringIO()
+        sys_stdout, sys.stdout = sys.stdout, out
+        try:
+            status = cli.main(['import', export_dir, '--db', other_db])
+        finally:
+            sys.stdout = sys_stdout
+            get_manager(other_db).close()
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(out.getvalue())[0]['inserted'], 24)
+
+    def test_nearest_uses_the_cached_catalog(self):
+        gdansk = dict(STATION, id=700, stationName='Gdańsk, ul. Leczkowa', gegrLat='54.380279', gegrLon='18.620274')
+        with open(os.path.join(self.tmp_dir.name, 'station_catalog.json'), 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': time.time(), 'etag': None, 'last_modified': None, 'stations': [STATION, gdansk]}, f)
+        status, output = self.run_cli('nearest', '50.06', '19.94', '--count', '1')
+        self.assertEqual(status, 0)
+        nearest, = json.loads(output)
+        self.assertEqual(nearest['id'], 400)
+        self.assertLess(nearest['distance_km'], 2)
+
+        status, output = self.run_cli('nearest', '--bbox', '54', '18', '55', '19')
+        self.assertEqual([station['id'] for station in json.loads(output)], [700])
+
+    def test_aqi_fetch_latest_and_history(self):
+        with open(os.path.join(self.tmp_dir.name, 'station_catalog.json'), 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': time.time(), 'etag': None, 'last_modified': None, 'stations': [STATION]}, f)
+        for hour, level in ((12, 1), (13, 3)):
+            index = {'stCalcDate': f'2024-06-01 {hour}:20:00', 'stIndexLevel': {'id': level}, 'stIndexCrParam': 'PYL'}
+            with patch('app.bulk_fetcher.get_air_quality_index', return_value=index):
+                status, output = self.run_cli('aqi', '--city', 'kraków', '--fetch')
+            self.assertEqual(status, 0)
+            self.assertEqual(json.loads(output)[0]['inserted'], 1)
+
+        status, output = self.run_cli('aqi', '--city', 'KRAKÓW')
+        latest, = json.loads(output)
+        self.assertEqual((latest['stationId'], latest['indexLevel'], latest['indexLevelName']), (400, 3, 'Dostateczny'))
+        self.assertEqual(latest['calcDate'], '2024-06-01 13:20:00')
+
+        status, output = self.run_cli('aqi', '--history', '400', '--format', 'csv')
+        self.assertEqual(status, 0)
+        header, *rows = output.strip().split('\n')
+        self.assertEqual(len(rows), 2)
+        self.assertTrue(header.startswith('stationId,stationName,city,calcDate'))
+
+    def test_plot_writes_image(self):
+        with get_manager(self.db_path).writer() as conn:
+            create_tables(conn)
+            conn.executemany("INSERT INTO measurements (sensorId, ts, value) VALUES (1, ?, ?)",
+                             [(to_epoch(f'2024-06-01 {hour:02d}:00:00'), float(hour)) for hour in range(24)])
+        image_path = os.path.join(self.tmp_dir.name, 'plot.png')
+        status, output = self.run_cli('plot', '1', '--output', image_path, '--width', '4', '--height', '3')
+        self.assertEqual(status, 0)
+        self.assertEqual(json.loads(output)[0]['points'], 24)
+        with open(image_path, 'rb') as f:
+            self.assertEqual(f.read(8), b'\x89PNG\r\n\x1a\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from app.columnar_store import ColumnarStore, export_store, import_store, resample_columns
+from app.connection_manager import get_manager
+from app.data_analyzer import read_data
+from app.db_manager import create_tables, to_epoch
+
+
+class TestColumnarStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'test.db')
+        self.export_dir = os.path.join(self.tmp_dir.name, 'export')
+        start = to_epoch('2024-01-30 00:00:00')
+        with get_manager(self.db_path).writer() as conn:
+            create_tables(conn)
+            conn.execute("INSERT INTO stations VALUES (1, 'Station', 'City', 19.0, 52.0)")
+            conn.execute("INSERT INTO sensors VALUES (10, 1, 'PM10'), (11, 1, 'NO2')")
+            conn.executemany("INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)",
+                             [(10, start + hour * 3600, float(hour % 24)) for hour in range(24 * 5)])
+            conn.execute("INSERT INTO measurements (sensorId, ts, value) VALUES (11, ?, 40.0)", (start,))
+            self.exported = export_store(conn, self.export_dir)
+
+    def tearDown(self):
+        get_manager(self.db_path).close()
+        self.tmp_dir.cleanup()
+
+    def test_export_writes_sorted_columns(self):
+        self.assertEqual(self.exported, {'sensors': 2, 'rows': 121})
+        timestamps, values = ColumnarStore(self.export_dir).columns(10)
+        self.assertIsInstance(timestamps, np.memmap)
+        self.assertEqual(len(timestamps), 120)
+        self.assertTrue((np.diff(timestamps) > 0).all())
+
+    def test_range_read_matches_sqlite(self):
+        store = ColumnarStore(self.export_dir)
+        for start, end, resample in ((None, None, None), ('2024-01-31 05:00:00', '2024-02-01 07:00:00', None),
+                                     (None, None, 'day'), ('2024-01-31', None, 'month')):
+            with self.subTest(start=start, end=end, resample=resample):
+                expected = read_data(self.db_path, 10, start, end, resample)
+                pd.testing.assert_frame_equal(read_data(self.db_path, 10, start, end, resample, store=store), expected,
+                                              check_dtype=False)
+
+    def test_import_round_trip(self):
+        other_db = sqlite3.connect(':memory:')
+        create_tables(other_db)
+        counts = import_store(other_db, self.export_dir)
+        self.assertEqual(counts, {'inserted': 121, 'updated': 0, 'skipped': 0})
+        self.assertEqual(other_db.execute("SELECT paramName FROM sensors WHERE id = 11").fetchone()[0], 'NO2')
+        self.assertEqual(other_db.execute("SELECT stationName FROM stations").fetchall(), [('Station',)])
+        self.assertEqual(import_store(other_db, self.export_dir, [10]), {'inserted': 0, 'updated': 0, 'skipped': 120})
+        other_db.close()
+
+    def test_missing_export_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            ColumnarStore(os.path.join(self.tmp_dir.name, 'missing'))
+
+    def test_resample_columns_rejects_unknown_granularity(self):
+        with self.assertRaises(ValueError):
+            resample_columns(np.array([0]), np.array([1.0]), 'week')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from app.comparison import compare_sensors, find_sensors, plot_comparison, read_sensors, to_wide
+from app.connection_manager import get_manager
+from app.db_manager import create_tables, to_epoch
+
+
+class TestComparison(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'test.db')
+        with get_manager(self.db_path).writer() as conn:
+            create_tables(conn)
+            conn.executemany("INSERT INTO stations (id, stationName, city) VALUES (?, ?, ?)",
+                             [(1, 'Kraków, Bujaka', 'Kraków'), (2, 'Kraków, Bulwarowa', 'Kraków'),
+                              (3, 'Warszawa, Ursynów', 'Warszawa')])
+            conn.executemany("INSERT INTO sensors (id, stationId, paramName) VALUES (?, ?, ?)",
+                             [(11, 1, 'pył zawieszony PM10'), (12, 1, 'dwutlenek azotu'),
+                              (21, 2, 'pył zawieszony PM10'), (31, 3, 'pył zawieszony PM10')])
+            hours = [to_epoch(f'2024-06-01 {hour:02d}:00:00') for hour in range(24)]
+            rows = [(11, ts, 10.0 + hour) for hour, ts in enumerate(hours)]
+            # Sensor 21 rises twice as fast and misses the afternoon
+            rows += [(21, ts, 60.0 + 2 * hour) for hour, ts in enumerate(hours) if hour < 12]
+            rows += [(31, ts, 40.0 - hour) for hour, ts in enumerate(hours)]
+            conn.executemany("INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)", rows)
+
+    def tearDown(self):
+        get_manager(self.db_path).close()
+        self.tmp_dir.cleanup()
+
+    def test_find_sensors_by_param_and_city(self):
+        with get_manager(self.db_path).reader() as conn:
+            self.assertEqual([sensor['id'] for sensor in find_sensors(conn, 'PM10', 'kraków')], [11, 21])
+            self.assertEqual([sensor['id'] for sensor in find_sensors(conn, 'NO2')], [12])
+            self.assertEqual([sensor['id'] for sensor in find_sensors(conn, station_ids=[3])], [31])
+
+    def test_wide_frame_is_aligned_on_a_regular_grid(self):
+        df = read_sensors(self.db_path, [11, 21, 99], end='2024-06-01 17:00:00')
+        wide = to_wide(df, [11, 21, 99])
+        self.assertEqual(list(wide.columns), [11, 21, 99])
+        self.assertEqual(len(wide), 18)
+        self.assertEqual(wide[21].count(), 12)
+        self.assertTrue(wide[99].isna().all())
+        self.assertEqual((wide.index[1] - wide.index[0]).total_seconds(), 3600)
+
+    def test_compare_sensors(self):
+        result = compare_sensors(self.db_path, [11, 21, 31])
+        stats = result['stats'].set_index('sensor_id')
+        self.assertEqual(stats.loc[21, 'count'], 12)
+        self.assertEqual(stats.loc[11, 'label'], 'PM10, Kraków, Bujaka')
+        self.assertEqual(stats.loc[21, 'exceedances'], 12)  # All values above the PM10 norm of 50
+        correlation = result['correlation']
+        self.assertAlmostEqual(correlation.loc[11, 21], 1.0)
+        self.assertAlmostEqual(correlation.loc[11, 31], -1.0)
+
+        daily = compare_sensors(self.db_path, [11, 21], resample='day')
+        self.assertEqual(len(daily['wide']), 1)
+        self.assertTrue(np.isnan(daily['correlation'].loc[11, 21]))
+
+    def test_plot_comparison_overlay_and_small_multiples(self):
+        result = compare_sensors(self.db_path, [11, 21, 31])
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        axes = plot_comparison(figure, result['wide'], result['labels'])
+        self.assertEqual(len(axes), 1)
+        self.assertEqual(len(axes[0].get_lines()), 3)
+        axes = plot_comparison(figure, result['wide'], result['labels'], small_multiples=True)
+        self.assertEqual([len(ax.get_lines()) for ax in axes], [1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from app.connection_manager import ConnectionManager, get_manager
+
+
+class TestConnectionManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'test.db')
+        self.manager = ConnectionManager(self.db_path, read_pool_size=2)
+        with self.manager.writer() as conn:
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+            conn.execute("INSERT INTO items (name) VALUES ('first')")
+
+    def tearDown(self):
+        self.manager.close()
+        self.tmp_dir.cleanup()
+
+    def test_connections_are_tuned(self):
+        with self.manager.writer() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+            self.assertEqual(conn.execute("PRAGMA temp_store").fetchone()[0], 2)  # MEMORY
+
+    def test_readers_are_read_only(self):
+        with self.manager.reader() as conn:
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("INSERT INTO items (name) VALUES ('nope')")
+
+    def test_reader_is_not_blocked_by_open_write_transaction(self):
+        with self.manager.writer() as writer:
+            writer.execute("INSERT INTO items (name) VALUES ('uncommitted')")
+            with self.manager.reader() as reader:
+                self.assertEqual(reader.execute("SELECT COUNT(*) FROM items").fetchone()[0], 1)
+        with self.manager.reader() as reader:
+            self.assertEqual(reader.execute("SELECT COUNT(*) FROM items").fetchone()[0], 2)
+
+    def test_writer_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.manager.writer() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('discarded')")
+                raise RuntimeError("fail")
+        with self.manager.reader() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM items").fetchone()[0], 1)
+
+    def test_reader_connections_are_reused_and_counted(self):
+        with self.manager.reader() as first:
+            pass
+        with self.manager.reader() as second:
+            pass
+        self.assertIs(first, second)
+        stats = self.manager.stats()
+        self.assertEqual(stats['reader']['count'], 2)
+        self.assertGreaterEqual(stats['writer']['count'], 1)
+
+    def test_get_manager_is_shared_per_path(self):
+        self.assertIs(get_manager(self.db_path), get_manager(os.path.join(self.tmp_dir.name, '.', 'test.db')))
+        get_manager(self.db_path).close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,12 @@
+import os
+import tempfile
 import unittest
 import pandas as pd
-from app.data_analyzer import analyze_data
+from app.connection_manager import get_manager
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from app.data_analyzer import SeriesPlot, analyze_data, analyze_range, read_data
+from app.db_manager import create_tables, insert_bulk, to_epoch
 
 class TestDataAnalyzer(unittest.TestCase):
 
@@ -16,5 +22,71 @@ class TestDataAnalyzer(unittest.TestCase):
         self.assertEqual(result['mean_value'], 30)
         self.assertEqual(result['trend'], 'Increasing')
 
+    def test_analyze_range_reads_small_ranges_raw(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, 'test.db')
+            station = {'id': 1, 'stationName': 'A', 'city': {'name': 'B'}, 'gegrLon': 19.9, 'gegrLat': 50.0}
+            sensor = {'id': 1, 'stationId': 1, 'param': {'paramName': 'pył zawieszony PM10', 'paramCode': 'PM10'}}
+            values = [{'date': f'2024-06-01 {hour:02d}:00:00', 'value': float(hour * 5)} for hour in range(24)]
+            with get_manager(db_path).writer() as conn:
+                create_tables(conn)
+                insert_bulk(conn, series=[(station, sensor, {'values': values})])
+            full = analyze_range(db_path, 1)
+            summary = analyze_range(db_path, 1, raw_limit=10)
+            get_manager(db_path).close()
+        self.assertEqual(full['median_value'], 57.5)
+        self.assertEqual(full['exceedances'], 13)
+        self.assertNotIn('median_value', summary)
+        self.assertEqual((summary['count'], summary['max_value']), (24, 115.0))
+
+
+class TestReadData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'test.db')
+        with get_manager(self.db_path).writer() as conn:
+            create_tables(conn)
+            rows = [(1, to_epoch(f'2024-06-{day:02d} {hour:02d}:00:00'), float(hour)) for day in (1, 2) for hour in range(24)]
+            conn.executemany("INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)", rows)
+            conn.execute("INSERT INTO measurements (sensorId, ts, value) VALUES (2, ?, 99.0)", (to_epoch('2024-06-01'),))
+
+    def tearDown(self):
+        get_manager(self.db_path).close()
+        self.tmp_dir.cleanup()
+
+    def test_reads_only_the_requested_range(self):
+        df = read_data(self.db_path, 1, '2024-06-02 00:00:00', '2024-06-02 05:00:00')
+        self.assertEqual(len(df), 6)
+        self.assertEqual(df['date'].iloc[0], pd.Timestamp('2024-06-02 00:00:00'))
+        self.assertEqual(df['value'].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def test_resamples_in_sql(self):
+        df = read_data(self.db_path, 1, resample='day')
+        self.assertEqual(df['date'].tolist(), [pd.Timestamp('2024-06-01'), pd.Timestamp('2024-06-02')])
+        self.assertEqual(df['value'].tolist(), [11.5, 11.5])
+        self.assertEqual(len(read_data(self.db_path, 1, resample='month')), 1)
+
+    def test_unknown_resample_is_rejected(self):
+        with self.assertRaises(ValueError):
+            read_data(self.db_path, 1, resample='week')
+
+    def test_series_plot_reuses_artists_and_refetches_on_zoom(self):
+        figure = Figure(figsize=(8, 4))
+        FigureCanvasAgg(figure)
+        series_plot = SeriesPlot(figure, self.db_path)
+        line = series_plot.line
+        first_day = read_data(self.db_path, 1, '2024-06-01 00:00:00', '2024-06-01 23:00:00')
+        series_plot.update(first_day, analyze_data(first_day), 'Day 1', sensor_id=1)
+        figure.canvas.draw()
+        both_days = read_data(self.db_path, 1)
+        series_plot.update(both_days, analyze_data(both_days), 'Both days', sensor_id=1)
+        self.assertIs(series_plot.line, line)
+        self.assertEqual(len(figure.axes[0].lines), 2)  # the series and the mean line
+        self.assertEqual(len(line.get_xdata()), 48)
+        left = line.get_xdata()[0]
+        series_plot.ax.set_xlim(left + 12 / 24, left + 14 / 24)  # zoom to 12:00-14:00
+        self.assertEqual(len(line.get_xdata()), 7)  # re-read with one view width of margin on both sides
+
 if __name__ == '__main__':
     unittest.main()
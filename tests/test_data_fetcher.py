@@ -1,14 +1,31 @@
+import json
 import unittest
 from unittest.mock import patch, Mock
-from app.data_fetcher import get_station_list, get_sensors_for_station, get_measurement_data
+import requests
+from app.data_fetcher import (get_station_list, get_station_list_conditional, get_sensors_for_station,
+                              get_measurement_data, set_client, FetcherClient, CircuitBreaker, CircuitOpenError)
+from app.db_manager import to_epoch
+
+
+def streamed_response(payload, chunk_size=7):
+    # A response whose body arrives in small chunks, splitting values and multi-byte characters
+    body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    mock_response = Mock()
+    mock_response.status_code = 200
+    mock_response.encoding = 'utf-8'
+    mock_response.iter_content.return_value = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    return mock_response
+
 
 class TestDataFetcher(unittest.TestCase):
 
-    @patch('app.data_fetcher.requests.get')
+    def setUp(self):
+        set_client(FetcherClient(sleep=lambda seconds: None))
+
+    @patch('app.data_fetcher.requests.Session.get')
     def test_get_station_list(self, mock_requests_get):
         # Mock the requests.get call within get_station_list
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response = streamed_response([
             {
                 'id': 1,
                 'stationName': 'Test Station',
@@ -16,15 +33,26 @@ class TestDataFetcher(unittest.TestCase):
                 'gegrLon': 10.0,
                 'gegrLat': 20.0
             }
-        ]
-        mock_response.status_code = 200
+        ])
         mock_requests_get.return_value = mock_response
 
         stations = get_station_list()
         self.assertEqual(len(stations), 1)
         self.assertEqual(stations[0]['stationName'], 'Test Station')
 
-    @patch('app.data_fetcher.requests.get')
+    @patch('app.data_fetcher.requests.Session.get')
+    def test_get_station_list_conditional_not_modified(self, mock_requests_get):
+        # A 304 answer means the cached station list is still valid
+        mock_response = Mock()
+        mock_response.status_code = 304
+        mock_requests_get.return_value = mock_response
+
+        result = get_station_list_conditional(etag='"abc"')
+        self.assertTrue(result['not_modified'])
+        self.assertIsNone(result['stations'])
+        self.assertEqual(mock_requests_get.call_args.kwargs['headers'], {'If-None-Match': '"abc"'})
+
+    @patch('app.data_fetcher.requests.Session.get')
     def test_get_sensors_for_station(self, mock_requests_get):
         # Mock the requests.get call within get_sensors_for_station
         mock_response = Mock()
@@ -38,19 +66,136 @@ class TestDataFetcher(unittest.TestCase):
         self.assertEqual(len(sensors), 1)
         self.assertEqual(sensors[0]['param']['paramName'], 'PM2.5')
 
-    @patch('app.data_fetcher.requests.get')
+    @patch('app.data_fetcher.requests.Session.get')
     def test_get_measurement_data(self, mock_requests_get):
         # Mock the requests.get call within get_measurement_data
-        mock_response = Mock()
-        mock_response.json.return_value = {
+        mock_response = streamed_response({
             'values': [{'value': 10, 'date': '2022-01-01T00:00:00Z'}]
-        }
-        mock_response.status_code = 200
+        })
         mock_requests_get.return_value = mock_response
 
         measurement_data = get_measurement_data(1)
         self.assertEqual(len(measurement_data['values']), 1)
         self.assertEqual(measurement_data['values'][0]['value'], 10)
 
+    @patch('app.data_fetcher.requests.Session.get')
+    def test_get_measurement_data_streams_into_compact_series(self, mock_requests_get):
+        mock_requests_get.return_value = streamed_response({
+            'key': 'PM10',
+            'values': [{'date': '2024-06-01 14:00:00', 'value': None},
+                       {'date': '2024-06-01 13:00:00', 'value': 12.345},
+                       {'date': 'not a date', 'value': 1.0},
+                       {'date': '2024-06-01 12:00:00', 'value': 7}],
+        })
+
+        series = get_measurement_data(1)
+        self.assertEqual(list(series.points()), [(to_epoch('2024-06-01 13:00:00'), 12.345),
+                                                 (to_epoch('2024-06-01 12:00:00'), 7.0)])
+        self.assertEqual(series['values'][0], {'date': '2024-06-01 13:00:00', 'value': 12.345})
+        self.assertTrue(mock_requests_get.call_args.kwargs['stream'])
+        mock_requests_get.return_value.close.assert_called_once()
+
+    @patch('app.data_fetcher.requests.Session.get')
+    def test_historical_values_are_kept_as_points(self, mock_requests_get):
+        mock_requests_get.return_value = streamed_response({
+            'values': [{'date': '2024-06-01 13:00:00', 'value': 12.0,
+                        'historical_value': 9.5, 'historical_value_date': '2024-05-31 13:00:00'}],
+        })
+        series = get_measurement_data(1)
+        self.assertEqual(list(series.points()), [(to_epoch('2024-05-31 13:00:00'), 9.5),
+                                                 (to_epoch('2024-06-01 13:00:00'), 12.0)])
+
+    @patch('app.data_fetcher.requests.Session.get')
+    def test_truncated_measurement_data_is_an_error(self, mock_requests_get):
+        response = streamed_response({'values': [{'date': '2024-06-01 13:00:00', 'value': 1.0}]})
+        response.iter_content.return_value = response.iter_content.return_value[:-2]
+        mock_requests_get.return_value = response
+        self.assertIsNone(get_measurement_data(1))
+
+    @patch('app.data_fetcher.requests.Session.get')
+    def test_station_names_survive_chunk_boundaries(self, mock_requests_get):
+        mock_requests_get.return_value = streamed_response(
+            [{'id': '1', 'stationName': 'Łódź, ul. Gdańska', 'gegrLat': '51.76', 'gegrLon': '19.45'}], chunk_size=3)
+        stations = get_station_list()
+        self.assertEqual(stations[0]['stationName'], 'Łódź, ul. Gdańska')
+        self.assertEqual(stations[0]['id'], 1)
+
+class TestFetcherClient(unittest.TestCase):
+
+    def setUp(self):
+        self.sleeps = []
+        self.client = FetcherClient(max_retries=2, backoff_factor=0.5, sleep=self.sleeps.append)
+
+    def response(self, status_code, headers=None):
+        mock_response = Mock()
+        mock_response.status_code = status_code
+        mock_response.headers = headers or {}
+        return mock_response
+
+    def test_retries_server_errors_with_exponential_backoff(self):
+        responses = [self.response(503), self.response(500), self.response(200)]
+        with patch.object(self.client.session, 'get', side_effect=responses) as mock_get:
+            response = self.client.get('sensors', '/station/sensors/1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertEqual(self.sleeps, [0.5, 1.0])
+        self.assertEqual(mock_get.call_args.kwargs['timeout'], self.client.timeout)
+
+    def test_honours_retry_after_on_429(self):
+        responses = [self.response(429, {'Retry-After': '4'}), self.response(200)]
+        with patch.object(self.client.session, 'get', side_effect=responses):
+            self.client.get('sensors', '/station/sensors/1')
+        self.assertEqual(self.sleeps, [4])
+
+    def test_connection_errors_are_retried_then_raised(self):
+        with patch.object(self.client.session, 'get', side_effect=requests.exceptions.ConnectionError('down')) as mock_get:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                self.client.get('sensors', '/station/sensors/1')
+        self.assertEqual(mock_get.call_count, 3)
+
+    def test_latency_is_recorded_per_endpoint(self):
+        with patch.object(self.client.session, 'get', return_value=self.response(200)):
+            self.client.get('sensors', '/station/sensors/1')
+            self.client.get('sensors', '/station/sensors/2')
+            self.client.get('measurements', '/data/getData/1')
+        stats = self.client.latency_stats()
+        self.assertEqual(stats['sensors']['count'], 2)
+        self.assertEqual(stats['measurements']['count'], 1)
+
+    def test_open_circuit_short_circuits_requests(self):
+        now = [0.0]
+        self.client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        with patch.object(self.client.session, 'get', return_value=self.response(500)) as mock_get:
+            self.client.get('sensors', '/station/sensors/1')
+            with self.assertRaises(CircuitOpenError):
+                self.client.get('sensors', '/station/sensors/1')
+            self.assertEqual(mock_get.call_count, 3)
+            now[0] = 11.0
+            mock_get.return_value = self.response(200)
+            self.assertEqual(self.client.get('sensors', '/station/sensors/1').status_code, 200)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_failed_probe_reopens_the_circuit(self):
+        now = [0.0]
+        self.client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=lambda: now[0])
+        with patch.object(self.client.session, 'get', side_effect=ValueError('bad header')):
+            with self.assertRaises(ValueError):
+                self.client.get('sensors', '/station/sensors/1')
+        now[0] = 11.0
+        with patch.object(self.client.session, 'get', side_effect=ValueError('bad header')):
+            with self.assertRaises(ValueError):
+                self.client.get('sensors', '/station/sensors/1')
+        self.assertEqual(self.client.breaker.state, 'open')
+        now[0] = 22.0
+        with patch.object(self.client.session, 'get', return_value=self.response(200)):
+            self.assertEqual(self.client.get('sensors', '/station/sensors/1').status_code, 200)
+        self.assertEqual(self.client.breaker.state, 'closed')
+
+    def test_exhausted_rate_limit_retries_count_as_failure(self):
+        self.client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        with patch.object(self.client.session, 'get', return_value=self.response(429)):
+            self.assertEqual(self.client.get('sensors', '/station/sensors/1').status_code, 429)
+        self.assertEqual(self.client.breaker.state, 'open')
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 import sqlite3
-from app.db_manager import create_tables, insert_station, insert_sensor, insert_measurement, clear_data, inspect_db
+from unittest.mock import patch
+import app.db_manager as db_manager
+from app.measurement_series import MeasurementSeries
+from app.db_manager import (create_tables, migrate, get_schema_version, copy_in_chunks, SCHEMA_VERSION, insert_station, insert_sensor, insert_measurement, insert_bulk, get_watermarks,
+                            to_epoch, from_epoch, clear_data, inspect_db)
 
 class TestDBManager(unittest.TestCase):
 
@@ -23,6 +27,43 @@ class TestDBManager(unittest.TestCase):
         c.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='measurements'")
         self.assertIsNotNone(c.fetchone(), "Measurements table should exist")
 
+    def test_schema_version_is_recorded(self):
+        """Test that create_tables records the schema version and is idempotent."""
+        self.assertEqual(get_schema_version(self.conn), SCHEMA_VERSION)
+        create_tables(self.conn)
+        self.assertEqual(get_schema_version(self.conn), SCHEMA_VERSION)
+
+    def test_failed_upgrade_step_is_rolled_back(self):
+        """Test that a failing step leaves the database at the previous version without partial changes."""
+        def broken_step(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            raise sqlite3.OperationalError("boom")
+
+        migrations = db_manager.MIGRATIONS + [(SCHEMA_VERSION + 1, 'broken', broken_step, None)]
+        with patch.object(db_manager, 'MIGRATIONS', migrations):
+            with self.assertRaises(sqlite3.OperationalError):
+                migrate(self.conn, target=SCHEMA_VERSION + 1)
+        self.assertEqual(get_schema_version(self.conn), SCHEMA_VERSION)
+        c = self.conn.cursor()
+        c.execute("SELECT name FROM sqlite_master WHERE name = 'half_done'")
+        self.assertIsNone(c.fetchone(), "Partial changes should be rolled back")
+
+    def test_chunked_copy_resumes_after_interruption(self):
+        """Test that copy_in_chunks continues after the last committed chunk."""
+        self.conn.execute("CREATE TABLE source (id INTEGER PRIMARY KEY, value REAL)")
+        self.conn.execute("CREATE TABLE target (id INTEGER PRIMARY KEY, value REAL)")
+        self.conn.executemany("INSERT INTO source (id, value) VALUES (?, ?)", [(i, i * 1.5) for i in range(1, 8)])
+        self.conn.execute("CREATE TRIGGER fail_on_five BEFORE INSERT ON target WHEN NEW.id = 5 "
+                          "BEGIN SELECT RAISE(ABORT, 'interrupted'); END")
+        self.conn.commit()
+        copy_sql = "INSERT INTO target SELECT id, value FROM source WHERE rowid > ? AND rowid <= ?"
+        with self.assertRaises(sqlite3.IntegrityError):
+            copy_in_chunks(self.conn, 'test_copy', 'source', copy_sql, chunk_size=2)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM target").fetchone()[0], 4)
+        self.conn.execute("DROP TRIGGER fail_on_five")
+        copy_in_chunks(self.conn, 'test_copy', 'source', copy_sql, chunk_size=2)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM target").fetchone()[0], 7)
+
     def test_insert_station(self):
         """Test inserting a station into the database."""
         station = {
@@ -82,10 +123,123 @@ class TestDBManager(unittest.TestCase):
         }
         insert_measurement(self.conn, 1, measurement_data, station, sensor)
         c = self.conn.cursor()
-        c.execute("SELECT * FROM measurements WHERE sensorId = 1 AND date = '2024-06-01'")
+        c.execute("SELECT * FROM measurements WHERE sensorId = 1 AND ts = ?", (to_epoch('2024-06-01'),))
         result = c.fetchone()
         self.assertIsNotNone(result, "Measurement should be inserted")
 
+    def test_insert_bulk(self):
+        """Test inserting many stations, sensors and measurement series in one transaction."""
+        stations = [
+            {'id': station_id, 'stationName': f'Station {station_id}', 'city': {'name': 'Test City'},
+             'gegrLon': 10.0, 'gegrLat': 20.0}
+            for station_id in (1, 2)
+        ]
+        series = []
+        for station in stations:
+            sensor = {'id': station['id'] * 10, 'stationId': station['id'], 'param': {'paramName': 'PM10'}}
+            measurement_data = {'values': [
+                {'value': 10.0 + hour, 'date': f'2024-06-01 {hour:02d}:00:00'} for hour in range(24)
+            ] + [{'value': None, 'date': '2024-06-02 00:00:00'}]}
+            series.append((station, sensor, measurement_data))
+        counts = insert_bulk(self.conn, stations=stations, series=series)
+        self.assertEqual(counts, {'inserted': 48, 'updated': 0, 'skipped': 0})
+        c = self.conn.cursor()
+        self.assertEqual(c.execute("SELECT COUNT(*) FROM stations").fetchone()[0], 2)
+        self.assertEqual(c.execute("SELECT COUNT(*) FROM sensors").fetchone()[0], 2)
+        self.assertEqual(c.execute("SELECT COUNT(*) FROM measurements WHERE sensorId = 20").fetchone()[0], 24)
+
+    def test_insert_bulk_rolls_back_on_error(self):
+        """Test that a failing bulk insert leaves the database unchanged."""
+        station = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+        self.conn.execute("DROP TABLE measurements")
+        sensor = {'id': 1, 'stationId': 1, 'param': {'paramName': 'PM2.5'}}
+        counts = insert_bulk(self.conn, series=[(station, sensor, {'values': [{'value': 1.0, 'date': '2024-06-01'}]})])
+        self.assertIsNone(counts)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM stations").fetchone()[0], 0)
+
+    def test_insert_bulk_skips_malformed_points(self):
+        """Test that a malformed value is skipped without losing the rest of the batch."""
+        station = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+        sensor = {'id': 1, 'stationId': 1, 'param': {'paramName': 'PM2.5'}}
+        data = {'values': [{'value': 1.0, 'date': 'garbage'}, {'value': 'n/a', 'date': '2024-06-01 01:00:00'},
+                           {'value': 3.0, 'date': '2024-06-01 02:00:00'}]}
+        counts = insert_bulk(self.conn, series=[(station, sensor, data), (station, dict(sensor, id=2), {})])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 0, 'skipped': 0})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM sensors").fetchone()[0], 2)
+
+    def test_reingest_only_writes_changed_points(self):
+        """Test that re-ingesting an overlapping window skips unchanged points and updates revised ones."""
+        station = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+        sensor = {'id': 1, 'stationId': 1, 'param': {'paramName': 'PM2.5'}}
+        first = {'values': [{'value': 1.0, 'date': '2024-06-01 00:00:00'}, {'value': 2.0, 'date': '2024-06-01 01:00:00'}]}
+        insert_bulk(self.conn, series=[(station, sensor, first)])
+        second = {'values': [{'value': 1.0, 'date': '2024-06-01 00:00:00'}, {'value': 2.5, 'date': '2024-06-01 01:00:00'},
+                             {'value': 3.0, 'date': '2024-06-01 02:00:00'}]}
+        counts = insert_bulk(self.conn, series=[(station, sensor, second)])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 1, 'skipped': 1})
+        self.assertEqual(self.conn.execute("SELECT value FROM measurements WHERE ts = ?",
+                                           (to_epoch('2024-06-01 01:00:00'),)).fetchone()[0], 2.5)
+        self.assertEqual(get_watermarks(self.conn), {1: to_epoch('2024-06-01 02:00:00')})
+
+    def test_backfilled_gap_is_counted_as_inserted(self):
+        """Test that a new point older than the high-water mark is inserted, not reported as an update."""
+        station = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+        sensor = {'id': 1, 'stationId': 1, 'param': {'paramName': 'PM2.5'}}
+        first = {'values': [{'value': 1.0, 'date': '2024-06-01 00:00:00'}, {'value': 5.0, 'date': '2024-06-01 05:00:00'}]}
+        insert_bulk(self.conn, series=[(station, sensor, first)])
+        gap = {'values': [{'value': 2.0, 'date': '2024-06-01 02:00:00'}, {'value': 5.0, 'date': '2024-06-01 05:00:00'}]}
+        counts = insert_bulk(self.conn, series=[(station, sensor, gap)])
+        self.assertEqual(counts, {'inserted': 1, 'updated': 0, 'skipped': 1})
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM measurements").fetchone()[0], 3)
+        self.assertEqual(get_watermarks(self.conn), {1: to_epoch('2024-06-01 05:00:00')})
+
+    def test_insert_bulk_accepts_measurement_series(self):
+        """Test that a compact series from the fetcher is stored like the equivalent dictionary."""
+        station = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+        sensor = {'id': 1, 'stationId': 1, 'param': {'paramName': 'PM2.5'}}
+        series = MeasurementSeries()
+        series.add('2024-06-01 01:00:00', 2.0)
+        series.add('2024-06-01 00:00:00', 1.0)
+        counts = insert_bulk(self.conn, series=[(station, sensor, series)])
+        self.assertEqual(counts, {'inserted': 2, 'updated': 0, 'skipped': 0})
+        self.assertEqual(self.conn.execute("SELECT ts, value FROM measurements ORDER BY ts").fetchall(),
+                         [(to_epoch('2024-06-01 00:00:00'), 1.0), (to_epoch('2024-06-01 01:00:00'), 2.0)])
+
+    def test_epoch_round_trip(self):
+        """Test that stored timestamps convert back to the published date."""
+        self.assertEqual(from_epoch(to_epoch('2024-06-01 13:00:00')), '2024-06-01 13:00:00')
+        self.assertEqual(to_epoch('2022-01-01T00:00:00Z'), to_epoch('2022-01-01 00:00:00'))
+
+    def test_migrate_legacy_measurements(self):
+        """Test the in-place migration from the original measurements layout."""
+        conn = sqlite3.connect(':memory:')
+        conn.execute('''CREATE TABLE measurements (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT, sensorId INTEGER, stationId INTEGER, paramName TEXT,
+                        stationName TEXT, value REAL, date TEXT, historical_value REAL, historical_value_date TEXT,
+                        UNIQUE(sensorId, date))''')
+        conn.executemany('''INSERT INTO measurements (sensorId, stationId, paramName, stationName, value, date,
+                                                      historical_value, historical_value_date)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', [
+            (7, 3, 'PM10', 'Old Station', 20.0, '2024-06-01 13:00:00', 18.0, '2024-06-01 12:00:00'),
+            (7, 3, 'PM10', 'Old Station', 21.0, '2024-06-01 14:00:00', None, None),
+        ])
+        conn.commit()
+        migrate(conn, chunk_size=1)
+        rows = conn.execute("SELECT sensorId, ts, value FROM measurements ORDER BY ts").fetchall()
+        self.assertEqual(rows, [(7, to_epoch('2024-06-01 12:00:00'), 18.0),
+                                (7, to_epoch('2024-06-01 13:00:00'), 20.0),
+                                (7, to_epoch('2024-06-01 14:00:00'), 21.0)])
+        self.assertEqual(conn.execute("SELECT stationId, paramName FROM sensors WHERE id = 7").fetchone(), (3, 'PM10'))
+        self.assertEqual(conn.execute("SELECT stationName FROM stations WHERE id = 3").fetchone(), ('Old Station',))
+        self.assertEqual(get_watermarks(conn), {7: to_epoch('2024-06-01 14:00:00')})
+        self.assertEqual(conn.execute("SELECT count, minValue, maxValue FROM measurement_aggregates "
+                                      "WHERE sensorId = 7 AND grain = 'day'").fetchone(), (3, 18.0, 21.0))
+        self.assertEqual(get_schema_version(conn), SCHEMA_VERSION)
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertNotIn('measurements_v1', tables)
+        self.assertNotIn('schema_migration_progress', tables)
+        conn.close()
+
     def test_clear_data(self):
         """Test clearing all data from the database."""
         station = {
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from app.downsampling import downsample, lttb, minmax
+
+
+class TestDownsampling(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.arange(10000, dtype=float)
+        self.y = np.sin(self.x / 500.0)
+        self.y[4321] = 25.0  # A single spike must survive downsampling
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        x, y = lttb(self.x, self.y, 200)
+        self.assertEqual(len(x), 200)
+        self.assertEqual((x[0], x[-1]), (0.0, 9999.0))
+        self.assertIn(4321.0, x)
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+    def test_minmax_keeps_bucket_extremes(self):
+        x, y = minmax(self.x, self.y, 100)
+        self.assertLessEqual(len(x), 200)
+        self.assertEqual(y.max(), 25.0)
+        self.assertEqual(y.min(), self.y.min())
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+    def test_small_series_is_unchanged(self):
+        x, y = downsample(self.x[:50], self.y[:50], width=800)
+        self.assertEqual(len(x), 50)
+
+    def test_unknown_method(self):
+        with self.assertRaises(ValueError):
+            downsample(self.x, self.y, 100, method='average')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import Mock
+from app.connection_manager import ConnectionManager
+from app.db_manager import create_tables
+from app.harvester import BATCH_SIZE, harvest_once, run_forever, select_stations
+
+STATION = {'id': 1, 'stationName': 'Test Station', 'city': {'name': 'Test City'}, 'gegrLon': 10.0, 'gegrLat': 20.0}
+SENSOR = {'id': 11, 'stationId': 1, 'param': {'paramName': 'PM10', 'paramCode': 'PM10'}}
+
+
+class FakeFetcher:
+    def __init__(self, hours):
+        self.hours = hours
+
+    def iter_station_measurements(self, stations, param_codes=None, report=None, sensor_ids=None):
+        values = [{'date': f'2024-06-01 {hour:02d}:00:00', 'value': float(hour)} for hour in self.hours]
+        for station in stations:
+            yield {'station_id': station['id'], 'station': station, 'sensor': SENSOR, 'data': {'values': values}}
+
+    def iter_air_quality_indexes(self, stations, report=None):
+        for station in stations:
+            yield {'station_id': station['id'], 'station': station,
+                   'index': {'stCalcDate': f'2024-06-01 {self.hours[-1]:02d}:20:00', 'stIndexLevel': {'id': 1}}}
+
+
+class TestHarvester(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db = ConnectionManager(os.path.join(self.tmp_dir.name, 'test.db'))
+        with self.db.writer() as conn:
+            create_tables(conn)
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp_dir.cleanup()
+
+    def count_rows(self):
+        with self.db.reader() as conn:
+            return conn.execute("SELECT COUNT(*) FROM measurements").fetchone()[0]
+
+    def test_harvest_stores_the_complete_series(self):
+        summary = harvest_once(self.db, FakeFetcher(range(24)), [STATION])
+        self.assertEqual(summary['inserted'], 24)
+        self.assertEqual(self.count_rows(), 24)
+
+    def test_second_harvest_only_stores_new_points(self):
+        harvest_once(self.db, FakeFetcher(range(12)), [STATION])
+        summary = harvest_once(self.db, FakeFetcher(range(24)), [STATION])
+        self.assertEqual(summary['inserted'], 12)
+        self.assertEqual(summary['updated'], 0)
+        self.assertEqual(summary['skipped'], 12)
+        self.assertEqual(self.count_rows(), 24)
+
+    def test_harvest_collects_air_quality_index(self):
+        self.assertNotIn('indexes', harvest_once(self.db, FakeFetcher(range(3)), [STATION]))
+        summary = harvest_once(self.db, FakeFetcher(range(3)), [STATION], collect_index=True)
+        self.assertEqual(summary['indexes'], 1)
+        self.assertEqual(harvest_once(self.db, FakeFetcher(range(3)), [STATION], collect_index=True)['indexes'], 0)
+        with self.db.reader() as conn:
+            self.assertEqual(conn.execute("SELECT indexLevel FROM aq_index").fetchall(), [(1,)])
+
+    def test_run_forever_stops_on_event(self):
+        stop_event = threading.Event()
+        calls = []
+
+        def stations():
+            calls.append(1)
+            stop_event.set()
+            return [STATION]
+
+        run_forever(self.db, FakeFetcher(range(3)), stations, interval=3600, stop_event=stop_event)
+        self.assertEqual(len(calls), 1)
+
+    def test_writer_is_taken_once_per_batch_and_released_between_batches(self):
+        stations = [dict(STATION, id=station_id) for station_id in range(1, 2 * BATCH_SIZE + 2)]
+        fetcher = FakeFetcher(range(3))
+        acquired_between_batches = []
+
+        def paused_fetch(stations, param_codes=None, report=None, sensor_ids=None):
+            for position, result in enumerate(fetcher.iter_station_measurements(stations)):
+                if position == BATCH_SIZE:
+                    # The first batch has been flushed; another writer must get through before the next one
+                    acquired = threading.Event()
+
+                    def write():
+                        with self.db.writer():
+                            acquired.set()
+
+                    threading.Thread(target=write).start()
+                    acquired_between_batches.append(acquired.wait(5))
+                yield result
+
+        writes_before = self.db.stats()['writer']['count']
+        summary = harvest_once(self.db, Mock(iter_station_measurements=paused_fetch), stations)
+        self.assertEqual(acquired_between_batches, [True])
+        # Three batches plus the write from the other thread
+        self.assertEqual(self.db.stats()['writer']['count'] - writes_before, 4)
+        self.assertEqual(summary['inserted'], 3)
+
+    def test_select_stations_by_id_and_city(self):
+        other = dict(STATION, id=2, city={'name': 'Other City'})
+        catalog = Mock()
+        catalog.get_stations.return_value = [STATION, other]
+        catalog.find_by_city.return_value = [other]
+        self.assertEqual(select_stations(catalog, station_ids=[1], cities=['other']), [STATION, other])
+
+    def test_select_stations_logs_unresolved_ids(self):
+        catalog = Mock()
+        catalog.get_stations.return_value = [STATION]
+        with self.assertLogs('app.harvester', level='WARNING') as logs:
+            self.assertEqual(select_stations(catalog, station_ids=[1, 999]), [STATION])
+        self.assertIn('999', logs.output[0])
+
+    def test_select_stations_logs_unavailable_catalog(self):
+        catalog = Mock()
+        catalog.get_stations.return_value = None
+        with self.assertLogs('app.harvester', level='ERROR'):
+            self.assertEqual(select_stations(catalog, station_ids=[1]), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from app.connection_manager import get_manager
+from app.db_manager import create_tables, to_epoch
+from app.interpolation import (IDWInterpolator, distance_matrix_km, interpolate_grids, interpolate_points, make_grid,
+                               save_grids, save_heatmaps)
+
+STATIONS = [(1, 'Kraków', 50.06, 19.94), (2, 'Warszawa', 52.23, 21.01), (3, 'Gdańsk', 54.35, 18.65)]
+
+
+class TestIDWInterpolator(unittest.TestCase):
+
+    def test_distance_matrix_matches_known_distance(self):
+        distances = distance_matrix_km([50.0614], [19.9366], [52.2297, 50.0614], [21.0122, 19.9366])
+        self.assertEqual(distances.shape, (1, 2))
+        self.assertAlmostEqual(distances[0, 0], 252.1, delta=0.5)
+        self.assertAlmostEqual(distances[0, 1], 0.0)
+
+    def test_estimates_weighted_means_and_exact_station_values(self):
+        interpolator = IDWInterpolator([50.0, 50.0], [19.0, 21.0], [50.0, 50.0, 50.0], [19.0, 20.0, 21.0])
+        np.testing.assert_allclose(interpolator.interpolate([10.0, 30.0]), [10.0, 20.0, 30.0], rtol=1e-5)
+
+    def test_timesteps_reuse_weights_and_skip_missing_values(self):
+        generator = np.random.default_rng(3)
+        station_lats, station_lons = generator.uniform(49, 55, 20), generator.uniform(14, 24, 20)
+        target_lats, target_lons = generator.uniform(49, 55, 50), generator.uniform(14, 24, 50)
+        values = generator.uniform(0, 100, (20, 6))
+        values[[0, 5, 7], 2] = np.nan
+        interpolator = IDWInterpolator(station_lats, station_lons, target_lats, target_lons, dtype=np.float64)
+        grids = interpolator.interpolate(values)
+        self.assertEqual(grids.shape, (6, 50))
+        for step in range(6):
+            present = ~np.isnan(values[:, step])
+            single = IDWInterpolator(station_lats[present], station_lons[present], target_lats, target_lons,
+                                     dtype=np.float64)
+            np.testing.assert_allclose(grids[step], single.interpolate(values[present, step]))
+
+    def test_cells_out_of_range_are_nan(self):
+        interpolator = IDWInterpolator([50.0], [19.0], [50.0, 54.0], [19.1, 19.0], max_km=50)
+        estimate = interpolator.interpolate([42.0])
+        self.assertAlmostEqual(estimate[0], 42.0)
+        self.assertTrue(np.isnan(estimate[1]))
+
+    def test_make_grid_cell_size(self):
+        lats, lons = make_grid((50.0, 19.0, 51.0, 21.0), cell_km=10)
+        self.assertEqual(len(lats), 12)
+        self.assertTrue(np.all(np.diff(lats) > 0) and np.all(np.diff(lons) > 0))
+        row_km = distance_matrix_km([lats[0]], [lons[0]], [lats[1]], [lons[0]])[0, 0]
+        column_km = distance_matrix_km([lats[0]], [lons[0]], [lats[0]], [lons[1]])[0, 0]
+        self.assertLessEqual(row_km, 10)
+        self.assertAlmostEqual(column_km, 10, delta=1.0)
+
+
+class TestInterpolationFromDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp_dir.name, 'test.db')
+        with get_manager(self.db_path).writer() as conn:
+            create_tables(conn)
+            conn.executemany("INSERT INTO stations (id, city, latitude, longitude) VALUES (?, ?, ?, ?)",
+                             STATIONS)
+            conn.executemany("INSERT INTO sensors (id, stationId, paramName) VALUES (?, ?, 'pył zawieszony PM2.5')",
+                             [(station_id * 10, station_id) for station_id, *_ in STATIONS])
+            conn.executemany("INSERT INTO measurements (sensorId, ts, value) VALUES (?, ?, ?)",
+                             [(station_id * 10, to_epoch(f'2024-06-01 {hour:02d}:00:00'), float(station_id * 10 + hour))
+                              for station_id, *_ in STATIONS for hour in range(24)])
+
+    def tearDown(self):
+        get_manager(self.db_path).close()
+        self.tmp_dir.cleanup()
+
+    def test_day_of_hourly_grids(self):
+        result = interpolate_grids(self.db_path, 'PM2.5', '2024-06-01 00:00:00', '2024-06-01 23:00:00', cell_km=25)
+        self.assertEqual(result['grids'].shape, (24, len(result['lats']), len(result['lons'])))
+        self.assertEqual(len(result['stations']), 3)
+        # Every estimate is a weighted mean of the stations' values of that hour
+        for hour, grid in enumerate(result['grids']):
+            self.assertGreaterEqual(np.nanmin(grid), 10 + hour - 1e-3)
+            self.assertLessEqual(np.nanmax(grid), 30 + hour + 1e-3)
+
+        archive = os.path.join(self.tmp_dir.name, 'grids.npz')
+        save_grids(archive, result)
+        with np.load(archive) as saved:
+            np.testing.assert_array_equal(saved['grids'], result['grids'])
+        paths = save_heatmaps(os.path.join(self.tmp_dir.name, 'png'), dict(result, grids=result['grids'][:2],
+                                                                           times=result['times'][:2]), 'PM2.5')
+        self.assertEqual([os.path.basename(path) for path in paths], ['PM2_5_20240601_0000.png', 'PM2_5_20240601_0100.png'])
+
+    def test_value_at_a_point_and_single_timestep(self):
+        estimates = interpolate_points(self.db_path, 'PM2.5', [50.06, 51.0], [19.94, 20.0], '2024-06-01 14:00:00')
+        self.assertEqual(estimates.shape, (1, 2))
+        self.assertAlmostEqual(estimates.iloc[0, 0], 24.0, places=3)
+        self.assertTrue(24.0 < estimates.iloc[0, 1] < 34.0)
+
+        daily = interpolate_points(self.db_path, 'PM2.5', [50.06], [19.94], '2024-06-01', resample='day')
+        self.assertAlmostEqual(daily.iloc[0, 0], 21.5, places=3)
+
+        with self.assertRaises(ValueError):
+            interpolate_grids(self.db_path, 'NO2', '2024-06-01 14:00:00')
+
+    def test_range_must_be_bounded(self):
+        with self.assertRaises(ValueError):
+            interpolate_grids(self.db_path, 'PM2.5', None)
+        with self.assertRaises(ValueError):
+            interpolate_grids(self.db_path, 'PM2.5', '2024-06-01 00:00:00', '2024-06-01 23:00:00', max_timesteps=23)
+        self.assertEqual(len(interpolate_points(self.db_path, 'PM2.5', [50.06], [19.94], '2024-06-01 00:00:00',
+                                                '2024-06-01 23:00:00', max_timesteps=24)), 24)
+        with self.assertRaises(ValueError):
+            interpolate_points(self.db_path, 'PM2.5', [50.06], [19.94], '2020-01-01', '2024-06-01')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import json
+import unittest
+from app.db_manager import to_epoch
+from app.measurement_series import MeasurementSeries, iter_json_array, parse_date
+
+
+def chunked(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def test_elements_split_across_chunks(self):
+        document = json.dumps({'key': 'PM10', 'values': [{'date': f'2024-06-01 {hour:02d}:00:00', 'value': hour * 1.5}
+                                                         for hour in range(24)]})
+        for size in (1, 5, 64, len(document)):
+            with self.subTest(size=size):
+                items = list(iter_json_array(chunked(document, size), 'values'))
+                self.assertEqual(items, json.loads(document)['values'])
+
+    def test_numbers_are_not_cut_at_chunk_boundaries(self):
+        self.assertEqual(list(iter_json_array(['[12', '34, 5', '6]'])), [1234, 56])
+
+    def test_missing_or_unterminated_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['{"key": "PM10"}'], 'values'))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['{"values": [{"value": 1}, {"val']))
+
+
+class TestMeasurementSeries(unittest.TestCase):
+
+    def test_parse_date_matches_to_epoch(self):
+        for date in ('2024-06-01 13:45:10', '2024-02-29 23:00:00', '2024-06-01', '2024-06-01T13:00:00Z'):
+            with self.subTest(date=date):
+                self.assertEqual(parse_date(date), to_epoch(date))
+        with self.assertRaises(ValueError):
+            parse_date('2024-06-01 25:00:00')
+
+    def test_reads_like_the_values_dictionary(self):
+        series = MeasurementSeries()
+        self.assertTrue(series.add('2024-06-01 13:00:00', '12.5'))
+        self.assertFalse(series.add(None, 1.0))
+        self.assertIn('values', series)
+        self.assertEqual(dict(series), {'values': [{'date': '2024-06-01 13:00:00', 'value': 12.5}]})
+        self.assertEqual(list(series.rows(7)), [(7, to_epoch('2024-06-01 13:00:00'), 12.5)])
+        self.assertEqual(series.nbytes(), 16)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import random
+import unittest
+from app.spatial_index import SpatialIndex, haversine_km, parse_coordinates
+
+
+def random_stations(count, seed=7):
+    generator = random.Random(seed)
+    stations = [{'id': i, 'gegrLat': f'{generator.uniform(49.0, 54.9):.6f}', 'gegrLon': f'{generator.uniform(14.1, 24.2):.6f}'}
+                for i in range(count)]
+    stations.append({'id': count, 'gegrLat': None, 'gegrLon': '19.0'})  # Skipped: no coordinates
+    return stations
+
+
+class TestSpatialIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.stations = random_stations(500)
+        self.index = SpatialIndex(self.stations)
+
+    def brute_force(self, lat, lon):
+        return sorted((haversine_km(lat, lon, float(s['gegrLat']), float(s['gegrLon'])), s['id'])
+                      for s in self.stations if s['gegrLat'] is not None)
+
+    def test_haversine_between_cities(self):
+        self.assertAlmostEqual(haversine_km(50.0614, 19.9366, 52.2297, 21.0122), 252.1, delta=0.5)
+
+    def test_nearest_matches_brute_force(self):
+        self.assertEqual(len(self.index), 500)
+        for lat, lon in ((50.06, 19.94), (54.35, 18.65), (60.0, 10.0)):
+            expected = self.brute_force(lat, lon)[:7]
+            found = self.index.nearest(lat, lon, k=7)
+            self.assertEqual([station['id'] for station, _ in found], [station_id for _, station_id in expected])
+            for (_, distance), (expected_distance, _) in zip(found, expected):
+                self.assertAlmostEqual(distance, expected_distance, places=6)
+
+    def test_nearest_respects_max_distance(self):
+        self.assertEqual(self.index.nearest(0.0, 0.0, k=3, max_km=100), [])
+        self.assertEqual(self.index.nearest(50.0, 19.0, k=0), [])
+
+    def test_within_radius_matches_brute_force(self):
+        found = self.index.within_radius(52.23, 21.01, 75)
+        expected = [station_id for distance, station_id in self.brute_force(52.23, 21.01) if distance <= 75]
+        self.assertEqual([station['id'] for station, _ in found], expected)
+
+    def test_within_bbox(self):
+        found = self.index.within_bbox(50.0, 19.0, 51.0, 20.5)
+        expected = {s['id'] for s in self.stations[:-1]
+                    if 50.0 <= float(s['gegrLat']) <= 51.0 and 19.0 <= float(s['gegrLon']) <= 20.5}
+        self.assertEqual({station['id'] for station in found}, expected)
+
+        antimeridian = SpatialIndex([{'id': 1, 'latitude': -17.7, 'longitude': 178.0},
+                                     {'id': 2, 'latitude': -17.7, 'longitude': -179.0},
+                                     {'id': 3, 'latitude': -17.7, 'longitude': 170.0}])
+        self.assertEqual([s['id'] for s in antimeridian.within_bbox(-20, 175, -15, -175)], [1, 2])
+        self.assertEqual(antimeridian.nearest(-17.7, 179.9, k=1)[0][0]['id'], 2)
+
+    def test_parse_coordinates(self):
+        self.assertEqual(parse_coordinates('50.06, 19.94'), (50.06, 19.94))
+        self.assertEqual(parse_coordinates(' 52.2 21 '), (52.2, 21.0))
+        self.assertIsNone(parse_coordinates('Kraków'))
+        self.assertIsNone(parse_coordinates('95, 19'))
+
+
+if __name__ == '__main__':
+    unittest.main()
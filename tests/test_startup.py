@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import unittest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time budgets in milliseconds, measured with -X importtime. They leave ample room
+# for slow CI machines; loading pandas or matplotlib alone takes several times as long.
+STARTUP_BUDGETS_MS = {
+    'app.main_window': 400,
+    'app.db_manager': 150,
+    'app.cli': 400,
+}
+HEAVY_MODULES = ('pandas', 'numpy', 'matplotlib')
+
+
+def import_times(module):
+    """Return {module name: cumulative import time in ms} for importing module in a fresh interpreter."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_heavy_modules_are_not_imported_at_startup(self):
+        for module in STARTUP_BUDGETS_MS:
+            with self.subTest(module=module):
+                loaded = [name for name in import_times(module) if name.split('.')[0] in HEAVY_MODULES]
+                self.assertEqual(loaded, [])
+
+    def test_import_time_budget(self):
+        for module, budget in STARTUP_BUDGETS_MS.items():
+            with self.subTest(module=module):
+                self.assertLess(import_times(module)[module], budget)
+
+    @unittest.skipUnless(os.environ.get('DISPLAY'), 'requires a display')
+    def test_welcome_frame_is_shown_before_analysis_modules_load(self):
+        code = ("import sys, tkinter as tk\n"
+                "from app.main_window import AirQualityApp\n"
+                "root = tk.Tk()\n"
+                "app = AirQualityApp(root)\n"
+                "root.update()\n"
+                "print(sorted(m for m in ('pandas', 'numpy', 'matplotlib') if m in sys.modules))\n"
+                "root.destroy()\n")
+        result = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True, text=True,
+                                check=True)
+        self.assertEqual(result.stdout.strip(), '[]')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import Mock
+from app.station_catalog import StationCatalog
+
+STATIONS = [
+    {'id': 1, 'stationName': 'Kraków, Aleja Krasińskiego', 'city': {'name': 'Kraków'}, 'gegrLon': 19.92, 'gegrLat': 50.05},
+    {'id': 2, 'stationName': 'Gdańsk, ul. Leczkowa', 'city': {'name': 'Gdańsk'}, 'gegrLon': 18.62, 'gegrLat': 54.38},
+]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestStationCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.fetch = Mock(return_value={'not_modified': False, 'stations': STATIONS, 'etag': '"v1"', 'last_modified': None})
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.tmp_dir.name, 'station_catalog.json')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_repeat_lookups_are_served_from_memory(self):
+        catalog = StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock)
+        self.assertEqual(len(catalog.find_by_city('krak')), 1)
+        self.assertEqual(len(catalog.find_by_city('gda')), 1)
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(catalog.stats()['hits'], 1)
+        self.assertEqual(catalog.stats()['misses'], 1)
+        self.assertEqual(catalog.stats()['refreshes'], 1)
+
+    def test_find_nearest_reuses_the_spatial_index(self):
+        catalog = StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock)
+        nearest = catalog.find_nearest(50.06, 19.94, k=1)
+        self.assertEqual(nearest[0]['id'], 1)
+        self.assertLess(nearest[0]['distance_km'], 5)
+        self.assertNotIn('distance_km', STATIONS[0])
+        self.assertEqual([s['id'] for s in catalog.find_nearest(52.0, 19.0, radius_km=300)], [1, 2])
+        self.assertIs(catalog.get_spatial_index(), catalog.get_spatial_index())
+        self.assertEqual(self.fetch.call_count, 1)
+
+    def test_expired_catalog_is_revalidated_with_etag(self):
+        catalog = StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock)
+        catalog.get_stations()
+        self.clock.now += 61
+        self.fetch.return_value = {'not_modified': True, 'stations': None, 'etag': '"v1"', 'last_modified': None}
+        stations = catalog.get_stations()
+        self.assertEqual(stations, STATIONS)
+        self.fetch.assert_called_with(etag='"v1"', last_modified=None)
+        self.assertEqual(catalog.stats()['revalidations'], 1)
+
+    def test_sidecar_is_reused_by_a_new_catalog(self):
+        StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock).get_stations()
+        catalog = StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock)
+        self.assertEqual(catalog.get_stations(), STATIONS)
+        self.assertEqual(self.fetch.call_count, 1)
+        self.assertEqual(catalog.stats()['disk_loads'], 1)
+
+    def test_stale_copy_is_served_when_fetch_fails(self):
+        catalog = StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock)
+        catalog.get_stations()
+        self.clock.now += 61
+        self.fetch.return_value = None
+        self.assertEqual(catalog.get_stations(), STATIONS)
+        self.assertEqual(catalog.stats()['errors'], 1)
+    def test_cached_index_is_served_while_a_download_runs(self):
+        catalog = StationCatalog(self.cache_path, ttl=60, fetch=self.fetch, clock=self.clock)
+        index = catalog.get_index()
+        self.clock.now += 61
+        started, release = threading.Event(), threading.Event()
+
+        def slow_fetch(**kwargs):
+            started.set()
+            release.wait(5)
+            return {'not_modified': True, 'stations': None, 'etag': '"v1"', 'last_modified': None}
+
+        self.fetch.side_effect = slow_fetch
+        downloads = [threading.Thread(target=catalog.get_stations) for _ in range(2)]
+        for download in downloads:
+            download.start()
+        try:
+            self.assertTrue(started.wait(5))
+            began = time.monotonic()
+            self.assertIs(catalog.get_index(fetch=False), index)
+            self.assertLess(time.monotonic() - began, 1.0)
+        finally:
+            release.set()
+            for download in downloads:
+                download.join()
+        # The second download waited for the first instead of repeating it
+        self.assertEqual(self.fetch.call_count, 2)
+        self.assertEqual(catalog.stats()['revalidations'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
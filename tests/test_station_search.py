@@ -0,0 +1,51 @@
+import unittest
+from app.station_search import StationIndex, normalize
+
+STATIONS = [
+    {'id': 1, 'stationName': 'Łódź, ul. Czernika', 'addressStreet': 'ul. Czernika 1/3',
+     'city': {'name': 'Łódź', 'commune': {'communeName': 'Łódź', 'districtName': 'Łódź', 'provinceName': 'ŁÓDZKIE'}}},
+    {'id': 2, 'stationName': 'Kraków, Aleja Krasińskiego', 'addressStreet': 'al. Krasińskiego',
+     'city': {'name': 'Kraków', 'commune': {'communeName': 'Kraków', 'districtName': 'Kraków', 'provinceName': 'MAŁOPOLSKIE'}}},
+    {'id': 3, 'stationName': 'Zielona Góra, ul. Krótka', 'addressStreet': None,
+     'city': {'name': 'Zielona Góra', 'commune': {'communeName': 'Zielona Góra', 'districtName': 'Zielona Góra',
+                                                  'provinceName': 'LUBUSKIE'}}},
+    {'id': 4, 'stationName': 'Krośno, ul. Ku Słońcu', 'addressStreet': 'ul. Ku Słońcu',
+     'city': {'name': 'Krosno', 'commune': {'communeName': 'Krosno', 'districtName': 'Krosno', 'provinceName': 'PODKARPACKIE'}}},
+]
+
+
+class TestStationSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.index = StationIndex(STATIONS)
+
+    def ids(self, stations):
+        return [station['id'] for station in stations]
+
+    def test_normalize_folds_polish_diacritics(self):
+        self.assertEqual(normalize('Łódź'), 'lodz')
+        self.assertEqual(normalize('  Zielona   GÓRA '), 'zielona gora')
+
+    def test_substring_is_diacritic_insensitive(self):
+        self.assertEqual(self.ids(self.index.search('lodz', fields=('city',))), [1])
+        self.assertEqual(self.ids(self.index.search('ona go', fields=('city',))), [3])
+
+    def test_prefix_requires_every_word(self):
+        self.assertEqual(self.ids(self.index.search('kr', mode='prefix', fields=('city',))), [2, 4])
+        self.assertEqual(self.ids(self.index.search('ziel gor', mode='prefix')), [3])
+        self.assertEqual(self.index.search('ziel xyz', mode='prefix'), [])
+
+    def test_search_covers_addresses_and_communes(self):
+        self.assertEqual(self.ids(self.index.search('slon', fields=('address',))), [4])
+        self.assertEqual(self.ids(self.index.search('malopolskie', fields=('commune',))), [2])
+
+    def test_fuzzy_tolerates_typos(self):
+        self.assertEqual(self.ids(self.index.search('krakw', mode='fuzzy', fields=('city',))), [2])
+
+    def test_suggest_cities_prefers_prefix_matches(self):
+        self.assertEqual(self.index.suggest_cities('kr'), ['Kraków', 'Krosno'])
+        self.assertEqual(self.index.suggest_cities('kow'), ['Kraków'])
+        self.assertEqual(self.index.suggest_cities(''), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import threading
+import time
+import unittest
+from app.task_executor import TaskExecutor
+
+
+class FakeWidget:
+    """Records after() calls instead of running a Tk event loop."""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+
+class TestTaskExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.executor = TaskExecutor(self.widget, max_workers=2)
+        self.events = []
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def run_until_idle(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.executor._pending:
+            self.assertLess(time.monotonic(), deadline, "Tasks did not finish in time")
+            time.sleep(0.005)
+            self.executor.poll()
+
+    def test_success_callback_runs_on_polling_thread(self):
+        self.executor.submit(lambda a, b: a + b, 2, 3,
+                             on_success=lambda result: self.events.append((result, threading.current_thread())),
+                             on_finally=lambda: self.events.append('finally'))
+        self.assertTrue(self.widget.scheduled)
+        self.run_until_idle()
+        self.assertEqual(self.events, [(5, threading.current_thread()), 'finally'])
+
+    def test_error_callback_receives_exception(self):
+        def fail():
+            raise ValueError("boom")
+
+        self.executor.submit(fail, on_success=self.events.append, on_error=self.events.append)
+        self.run_until_idle()
+        self.assertEqual(len(self.events), 1)
+        self.assertIsInstance(self.events[0], ValueError)
+
+    def test_same_key_cancels_previous_task(self):
+        release = threading.Event()
+
+        def slow(task, value):
+            release.wait(5)
+            task.check_cancelled()
+            return value
+
+        self.executor.submit(slow, 'first', key='sensors', pass_task=True, on_success=self.events.append,
+                             on_finally=lambda: self.events.append('first done'))
+        self.executor.submit(slow, 'second', key='sensors', pass_task=True, on_success=self.events.append)
+        release.set()
+        self.run_until_idle()
+        self.assertIn('second', self.events)
+        self.assertIn('first done', self.events)
+        self.assertNotIn('first', self.events)
+
+    def test_progress_is_delivered_before_result(self):
+        def work(task):
+            for step in range(3):
+                task.report_progress(step + 1, 3)
+            return 'done'
+
+        self.executor.submit(work, pass_task=True, on_progress=lambda done, total, message: self.events.append(done),
+                             on_success=self.events.append)
+        self.run_until_idle()
+        self.assertEqual(self.events, [1, 2, 3, 'done'])
+
+    def test_polling_stops_when_idle(self):
+        self.executor.submit(lambda: None)
+        self.run_until_idle()
+        scheduled = len(self.widget.scheduled)
+        self.executor.poll()
+        self.assertEqual(len(self.widget.scheduled), scheduled)
+
+
+if __name__ == '__main__':
+    unittest.main()